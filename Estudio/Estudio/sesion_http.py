@@ -0,0 +1,29 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = 4  # segundos para abrir la conexión TCP+TLS
+READ_TIMEOUT = 10    # segundos de espera de la respuesta
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+
+def crear_sesion(pool_maxsize, pool_connections=1, reintentos=None, headers=None):
+    """
+    Sesión HTTP para compartir dentro de un proceso: las consultas reutilizan
+    conexiones keep-alive en lugar de abrir TCP+TLS en cada una.
+
+    Args:
+        pool_maxsize: Conexiones keep-alive por host (tantas como hilos que consultan en paralelo).
+        pool_connections: Cantidad de hosts distintos cuyo pool se conserva.
+        reintentos: `urllib3.util.retry.Retry` opcional para el adapter.
+        headers: Headers que se envían en todas las consultas.
+    """
+    opciones = {"pool_connections": pool_connections, "pool_maxsize": pool_maxsize}
+    if reintentos is not None:
+        opciones["max_retries"] = reintentos
+    adapter = HTTPAdapter(**opciones)
+    sesion = requests.Session()
+    if headers:
+        sesion.headers.update(headers)
+    sesion.mount("https://", adapter)
+    sesion.mount("http://", adapter)
+    return sesion
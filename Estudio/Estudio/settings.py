@@ -28,7 +28,11 @@ LOCAL_APPS = [
     'tesoreria.apps.TesoreriaConfig',
 ]
 
-INSTALLED_APPS = DJANGO_APPS + LOCAL_APPS + THIRD_PARTY_APPS
+# Comandos solo para desarrollo (benchmarks contra el stub de IOL). Render
+# fuerza DEBUG=False más abajo: ahí tampoco se instalan.
+DEV_APPS = ['desarrollo.apps.DesarrolloConfig'] if DEBUG and 'RENDER' not in os.environ else []
+
+INSTALLED_APPS = DJANGO_APPS + LOCAL_APPS + THIRD_PARTY_APPS + DEV_APPS
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -70,6 +74,10 @@ if DEBUG:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Base de tests en archivo: los tests del cliente de IOL escriben
+            # desde varios hilos y la base en memoria compartida de SQLite
+            # falla ante un lock en lugar de esperarlo.
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 else:
@@ -166,18 +174,26 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@estudio.com')
 if DEBUG and not EMAIL_HOST_USER:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Tope de entradas antes de que la cache descarte claves: el default de Django
+# (300) no alcanza para los cierres por símbolo de IOL (uno por ticker y variante).
+CACHE_MAX_ENTRADAS = 10000
+
 if DEBUG:
     CACHES = {
         'default': {
             'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
             'LOCATION': 'estudio-cache',
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRADAS},
         }
     }
 else:
+    # Cache compartida entre los workers de gunicorn y el comando
+    # refrescar_cotizaciones (requiere `python manage.py createcachetable`).
     CACHES = {
         'default': {
-            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-            'LOCATION': 'estudio-cache',
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'estudio_cache',
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRADAS},
             # TODO: Configurar Redis o Memcached en producción cuando se requiera
             # 'BACKEND': 'django.core.cache.backends.redis.RedisCache',
             # 'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
@@ -216,6 +232,9 @@ IOL_USUARIO = config('IOL_USUARIO', default=None)
 IOL_PASSWORD = config('IOL_PASSWORD', default=None)
 IOL_BASE_URL = 'https://api.invertironline.com'
 IOL_MAX_WORKERS = 10
+# Cupo compartido por todos los workers: ráfaga inicial y llamadas por segundo
+IOL_LIMITE_POR_SEGUNDO = config('IOL_LIMITE_POR_SEGUNDO', default=10, cast=float)
+IOL_RAFAGA = config('IOL_RAFAGA', default=20, cast=int)
 
 import logging as _logging
 _render_logger = _logging.getLogger(__name__)
@@ -300,5 +319,15 @@ LOGGING = {
             'level': 'DEBUG' if DEBUG else 'INFO',
             'propagate': False,
         },
+        'cotizaciones': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if DEBUG else 'INFO',
+            'propagate': False,
+        },
+        'tesoreria': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if DEBUG else 'INFO',
+            'propagate': False,
+        },
     },
 }
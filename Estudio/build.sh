@@ -14,6 +14,9 @@ python manage.py collectstatic --no-input
 # Apply database migrations
 python manage.py migrate
 
+# Create the shared cache table (no-op if it already exists)
+python manage.py createcachetable
+
 # Create superuser (only if it doesn't exist)
 # Note: Requiere variables de entorno: DJANGO_SUPERUSER_EMAIL, DJANGO_SUPERUSER_PASSWORD, 
 # DJANGO_SUPERUSER_NOMBRE, DJANGO_SUPERUSER_APELLIDO
@@ -1 +1,11 @@
-from django.contrib import admin
\ No newline at end of file
+from django.contrib import admin
+from .models import PuntoSerie
+
+
+@admin.register(PuntoSerie)
+class PuntoSerieAdmin(admin.ModelAdmin):
+    list_display = ('serie', 'fecha', 'valor')
+    list_filter = ('serie',)
+    date_hierarchy = 'fecha'
+    ordering = ('serie', '-fecha')
+    list_per_page = 100
@@ -0,0 +1,86 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por proveedor externo (uno por host).
+
+    - cerrado: las consultas pasan; `umbral_fallos` fallos seguidos lo abren.
+    - abierto: las consultas se rechazan sin tocar la red durante `enfriamiento` segundos.
+    - semiabierto: pasado el enfriamiento se deja pasar una sola consulta de prueba;
+      si responde se cierra, si falla vuelve a abrirse.
+
+    El estado vive en memoria del proceso: cada worker aprende por su cuenta que
+    el proveedor está caído, pero sin agregar una consulta a la cache por request.
+    """
+
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+
+    def __init__(self, nombre, umbral_fallos=3, enfriamiento=30):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.estado = self.CERRADO
+        self.fallos_seguidos = 0
+        self.abierto_desde = None
+        self.rechazadas = 0
+        self.aperturas = 0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        """True si la consulta puede salir a la red."""
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO:
+                if time.monotonic() - self.abierto_desde < self.enfriamiento:
+                    self.rechazadas += 1
+                    return False
+                self._cambiar_estado(self.SEMIABIERTO)
+            if self._prueba_en_curso:
+                self.rechazadas += 1
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def registrar_exito(self):
+        with self._lock:
+            self.fallos_seguidos = 0
+            self._prueba_en_curso = False
+            if self.estado != self.CERRADO:
+                self._cambiar_estado(self.CERRADO)
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos_seguidos += 1
+            self._prueba_en_curso = False
+            if self.estado == self.SEMIABIERTO or self.fallos_seguidos >= self.umbral_fallos:
+                if self.estado != self.ABIERTO:
+                    self.aperturas += 1
+                    self._cambiar_estado(self.ABIERTO)
+                self.abierto_desde = time.monotonic()
+
+    def resumen(self):
+        """Estado y métricas del breaker, para logs o diagnóstico."""
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "fallos_seguidos": self.fallos_seguidos,
+                "rechazadas": self.rechazadas,
+                "aperturas": self.aperturas,
+            }
+
+    def _cambiar_estado(self, nuevo):
+        anterior, self.estado = self.estado, nuevo
+        nivel = logging.INFO if nuevo == self.CERRADO else logging.WARNING
+        logger.log(
+            nivel, "Circuit breaker %s: %s -> %s (fallos seguidos: %s)",
+            self.nombre, anterior, nuevo, self.fallos_seguidos,
+        )
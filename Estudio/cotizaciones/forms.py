@@ -0,0 +1,38 @@
+from django import forms
+from django.core.exceptions import ValidationError
+
+
+class RangoSeriesForm(forms.Form):
+    """Rango de fechas y cantidad de puntos para los gráficos del dashboard (parámetros GET)."""
+
+    PUNTOS_MINIMO = 10
+    PUNTOS_MAXIMO = 1000
+    PUNTOS_DEFAULT = 300
+
+    desde = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'input-studio'}),
+    )
+    hasta = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'input-studio'}),
+    )
+    puntos = forms.IntegerField(
+        required=False,
+        min_value=PUNTOS_MINIMO,
+        max_value=PUNTOS_MAXIMO,
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        desde, hasta = cleaned_data.get('desde'), cleaned_data.get('hasta')
+        if desde and hasta and desde > hasta:
+            raise ValidationError('La fecha "desde" no puede ser posterior a "hasta".')
+        if cleaned_data.get('puntos') is None:
+            cleaned_data['puntos'] = self.PUNTOS_DEFAULT
+        return cleaned_data
+
+    @property
+    def rango_activo(self):
+        """True si el usuario pidió un rango; si no, se usan las ventanas por defecto."""
+        return bool(self.is_valid() and (self.cleaned_data['desde'] or self.cleaned_data['hasta']))
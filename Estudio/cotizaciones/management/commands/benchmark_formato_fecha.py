@@ -0,0 +1,77 @@
+import timeit
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand, CommandError
+
+from cotizaciones.templatetags.cotizaciones_tags import TZ_AR, _formatear, formato_fecha_iso
+
+# Valores con la forma de los que renderiza el dashboard
+MUESTRAS = (
+    '2024-05-14T15:32:10.123Z',
+    '2024-05-14T15:32:10Z',
+    '2024-05-14T12:32:10.5',
+    '2024-05-14T12:32:10',
+    '2024-05-14',
+    'sin fecha',
+)
+
+_FORMATOS_UTC = ('%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ')
+_FORMATOS_NAIVE = ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S')
+
+
+def _formato_fecha_iso_strptime(valor):
+    """Implementación anterior (hasta cinco strptime por valor), solo como referencia."""
+    if not valor:
+        return valor
+    try:
+        valor_str = str(valor).strip()
+        for fmt in _FORMATOS_UTC:
+            try:
+                dt = datetime.strptime(valor_str, fmt).replace(tzinfo=timezone.utc)
+                return dt.astimezone(TZ_AR).strftime('%d/%m/%Y %H:%M hs')
+            except ValueError:
+                continue
+        for fmt in _FORMATOS_NAIVE:
+            try:
+                return datetime.strptime(valor_str, fmt).strftime('%d/%m/%Y %H:%M hs')
+            except ValueError:
+                continue
+        return datetime.strptime(valor_str, '%Y-%m-%d').strftime('%d/%m/%Y')
+    except Exception:
+        return valor
+
+
+class Command(BaseCommand):
+    help = "Compara el costo por llamada de formato_fecha_iso contra la implementación con strptime."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeticiones", type=int, default=20000,
+            help="Pasadas sobre el set de muestras (default: 20000).",
+        )
+
+    def handle(self, *args, **options):
+        repeticiones = max(options["repeticiones"], 1)
+
+        for muestra in MUESTRAS:
+            anterior, nuevo = _formato_fecha_iso_strptime(muestra), formato_fecha_iso(muestra)
+            if anterior != nuevo:
+                raise CommandError(f"Resultado distinto para {muestra!r}: {anterior!r} != {nuevo!r}")
+
+        def sin_memo():
+            _formatear.cache_clear()
+            for muestra in MUESTRAS:
+                formato_fecha_iso(muestra)
+
+        casos = (
+            ("strptime (anterior)", lambda: [_formato_fecha_iso_strptime(m) for m in MUESTRAS]),
+            ("fromisoformat sin memo", sin_memo),
+            ("fromisoformat con memo", lambda: [formato_fecha_iso(m) for m in MUESTRAS]),
+        )
+        llamadas = repeticiones * len(MUESTRAS)
+        base = None
+        for nombre, funcion in casos:
+            segundos = min(timeit.repeat(funcion, number=repeticiones, repeat=3))
+            por_llamada = segundos / llamadas * 1e6
+            base = base or por_llamada
+            self.stdout.write(f"{nombre:<24} {por_llamada:8.3f} µs/llamada  (x{base / por_llamada:.1f})")
+        self.stdout.write(f"Memo: {_formatear.cache_info()}")
@@ -0,0 +1,90 @@
+import logging
+import time
+import uuid
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from cotizaciones.services import (
+    CACHE_PREFIX, CONNECT_TIMEOUT, FUENTES_URL, READ_TIMEOUT, REINTENTOS, SERIES_URL,
+    get_estado_proveedores, refrescar_datos,
+)
+
+logger = logging.getLogger(__name__)
+
+CLAVE_TURNO = f"{CACHE_PREFIX}:refresco:turno"
+# Peor caso de un ciclo: todas las fuentes y series agotan timeouts y reintentos
+DURACION_MAXIMA_CICLO = (CONNECT_TIMEOUT + READ_TIMEOUT) * (REINTENTOS + 1) * (len(FUENTES_URL) + len(SERIES_URL))
+
+
+class Command(BaseCommand):
+    help = (
+        "Mantiene caliente la cache de cotizaciones (dólares, otras monedas, "
+        "riesgo país) y el histórico de series. Pensado para correr como "
+        "proceso aparte de los workers web."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intervalo", type=int, default=30,
+            help="Segundos entre ciclos de refresco (default: 30).",
+        )
+        parser.add_argument(
+            "--una-vez", action="store_true",
+            help="Ejecuta un solo ciclo y termina.",
+        )
+
+    def handle(self, *args, **options):
+        intervalo = max(options["intervalo"], 1)
+        self._token = uuid.uuid4().hex
+        try:
+            while True:
+                self._ciclo(intervalo)
+                if options["una_vez"]:
+                    return
+                try:
+                    time.sleep(intervalo)
+                except KeyboardInterrupt:
+                    return
+        finally:
+            self._soltar_turno()
+
+    def _tomar_turno(self, intervalo):
+        """
+        El turno es un lease: quien lo tiene lo renueva en cada ciclo y lo
+        suelta al terminar. Dura más que el peor ciclo más la espera entre
+        ciclos, así no vence mientras el dueño sigue refrescando; si el
+        proceso muere sin soltarlo, otra instancia lo toma al vencer.
+        """
+        duracion = DURACION_MAXIMA_CICLO + intervalo
+        if cache.get(CLAVE_TURNO) == self._token:
+            return cache.touch(CLAVE_TURNO, duracion) or cache.add(CLAVE_TURNO, self._token, timeout=duracion)
+        return cache.add(CLAVE_TURNO, self._token, timeout=duracion)
+
+    def _soltar_turno(self):
+        if cache.get(CLAVE_TURNO) == self._token:
+            cache.delete(CLAVE_TURNO)
+
+    def _ciclo(self, intervalo):
+        # Aunque haya varias instancias del comando, solo refresca la que tiene el turno
+        if not self._tomar_turno(intervalo):
+            logger.debug("Refresco de cotizaciones omitido: otra instancia tiene el turno")
+            return
+        close_old_connections()
+        try:
+            resultado = refrescar_datos(margen=intervalo)
+        except Exception:
+            logger.exception("Error inesperado al refrescar cotizaciones")
+            return
+        finally:
+            close_old_connections()
+
+        if resultado["fallidas"]:
+            logger.warning(
+                "Refresco de cotizaciones con fallas: %s (proveedores: %s)",
+                ", ".join(resultado["fallidas"]), get_estado_proveedores(),
+            )
+        elif resultado["refrescadas"]:
+            logger.info(
+                "Cotizaciones refrescadas: %s", ", ".join(resultado["refrescadas"])
+            )
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoSerie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serie', models.CharField(choices=[('inflacion', 'Inflación mensual'), ('inflacion_ia', 'Inflación interanual'), ('uva', 'UVA'), ('riesgo_pais', 'Riesgo país')], max_length=20)),
+                ('fecha', models.DateField()),
+                ('valor', models.DecimalField(decimal_places=6, max_digits=20)),
+            ],
+            options={
+                'verbose_name': 'Punto de serie',
+                'verbose_name_plural': 'Puntos de series',
+                'ordering': ['serie', 'fecha'],
+                'constraints': [models.UniqueConstraint(fields=('serie', 'fecha'), name='punto_serie_unico')],
+            },
+        ),
+    ]
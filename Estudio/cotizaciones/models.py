@@ -1 +1,31 @@
-from django.db import models
\ No newline at end of file
+from django.db import models
+
+
+class PuntoSerie(models.Model):
+    """
+    Valor diario o mensual de una serie histórica de argentinadatos.
+
+    Se sincroniza de forma incremental desde `services.sincronizar_serie`:
+    solo se agregan los puntos posteriores a la última fecha guardada.
+    """
+
+    class Serie(models.TextChoices):
+        INFLACION = 'inflacion', 'Inflación mensual'
+        INFLACION_IA = 'inflacion_ia', 'Inflación interanual'
+        UVA = 'uva', 'UVA'
+        RIESGO_PAIS = 'riesgo_pais', 'Riesgo país'
+
+    serie = models.CharField(max_length=20, choices=Serie.choices)
+    fecha = models.DateField()
+    valor = models.DecimalField(max_digits=20, decimal_places=6)
+
+    class Meta:
+        verbose_name = 'Punto de serie'
+        verbose_name_plural = 'Puntos de series'
+        ordering = ['serie', 'fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['serie', 'fecha'], name='punto_serie_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_serie_display()} {self.fecha}: {self.valor}"
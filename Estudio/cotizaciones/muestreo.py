@@ -0,0 +1,47 @@
+def reducir_lttb(puntos, objetivo):
+    """
+    Reduce una serie a `objetivo` puntos con Largest-Triangle-Three-Buckets.
+
+    Conserva el primer y el último punto y, de cada bucket intermedio, el que
+    forma el triángulo de mayor área con el punto elegido antes y el promedio
+    del bucket siguiente. Así se mantienen picos y valles que un muestreo
+    uniforme perdería.
+
+    Args:
+        puntos: Secuencia ordenada de tuplas cuyo [0] es x numérico y [1] es y.
+            El resto de los elementos de cada tupla se conserva tal cual.
+        objetivo: Cantidad de puntos deseada.
+
+    Returns:
+        Lista con los puntos elegidos, en el mismo orden.
+    """
+    n = len(puntos)
+    if objetivo >= n or objetivo < 3:
+        return list(puntos)
+
+    elegidos = [puntos[0]]
+    tamanio_bucket = (n - 2) / (objetivo - 2)
+    anterior = 0
+
+    for i in range(objetivo - 2):
+        # Promedio del bucket siguiente (tercer vértice del triángulo)
+        inicio_sig = int((i + 1) * tamanio_bucket) + 1
+        fin_sig = min(int((i + 2) * tamanio_bucket) + 1, n)
+        cantidad_sig = fin_sig - inicio_sig
+        prom_x = sum(p[0] for p in puntos[inicio_sig:fin_sig]) / cantidad_sig
+        prom_y = sum(p[1] for p in puntos[inicio_sig:fin_sig]) / cantidad_sig
+
+        ax, ay = puntos[anterior][0], puntos[anterior][1]
+        inicio = int(i * tamanio_bucket) + 1
+        fin = int((i + 1) * tamanio_bucket) + 1
+        mayor_area, elegido = -1.0, inicio
+        for j in range(inicio, fin):
+            area = abs((ax - prom_x) * (puntos[j][1] - ay) - (ax - puntos[j][0]) * (prom_y - ay))
+            if area > mayor_area:
+                mayor_area, elegido = area, j
+
+        elegidos.append(puntos[elegido])
+        anterior = elegido
+
+    elegidos.append(puntos[-1])
+    return elegidos
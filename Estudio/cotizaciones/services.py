@@ -1,5 +1,21 @@
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlsplit
 import requests
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.db.models import Max
+from urllib3.util.retry import Retry
+
+from Estudio.sesion_http import CONNECT_TIMEOUT, READ_TIMEOUT, TIMEOUT, crear_sesion
+
+from .circuit_breaker import CircuitBreaker
+from .models import PuntoSerie
+from .muestreo import reducir_lttb
 
 logger = logging.getLogger(__name__)
 
@@ -8,56 +24,484 @@ BASE_ARGDATOS = "https://api.argentinadatos.com/v1"
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 compatible",
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+REINTENTOS = 2
+POOL_CONEXIONES = 10  # conexiones keep-alive por host
+
+# Segundos durante los cuales un dato cacheado (o una serie sincronizada) se
+# considera fresco. Vencido ese plazo se sigue sirviendo mientras se revalida
+# en segundo plano.
+CACHE_TTL = {
+    "dolares": 60,
+    "cotizaciones": 60,
+    "inflacion": 6 * 60 * 60,
+    "inflacion_ia": 6 * 60 * 60,
+    "uva": 60 * 60,
+    "riesgo_pais": 15 * 60,
+    "riesgo_ultimo": 5 * 60,
+}
+CACHE_RETENCION = 7 * 24 * 60 * 60  # cuánto se conserva un dato vencido para servirlo
+CACHE_PREFIX = "cotizaciones"
+
+FUENTES_URL = {
+    "dolares": f"{BASE_DOLAR}/dolares",
+    "cotizaciones": f"{BASE_DOLAR}/cotizaciones",
+    "riesgo_ultimo": f"{BASE_ARGDATOS}/finanzas/indices/riesgo-pais/ultimo",
+}
+SERIES_URL = {
+    PuntoSerie.Serie.INFLACION: f"{BASE_ARGDATOS}/finanzas/indices/inflacion",
+    PuntoSerie.Serie.INFLACION_IA: f"{BASE_ARGDATOS}/finanzas/indices/inflacionInteranual",
+    PuntoSerie.Serie.UVA: f"{BASE_ARGDATOS}/finanzas/indices/uva",
+    PuntoSerie.Serie.RIESGO_PAIS: f"{BASE_ARGDATOS}/finanzas/indices/riesgo-pais",
+}
+# Cantidad de puntos que muestra cada gráfico del dashboard
+VENTANAS_DASHBOARD = {
+    PuntoSerie.Serie.INFLACION: 24,
+    PuntoSerie.Serie.INFLACION_IA: 24,
+    PuntoSerie.Serie.UVA: 60,
+    PuntoSerie.Serie.RIESGO_PAIS: 60,
+}
+
+DASHBOARD_DEADLINE = 8  # segundos máximos de espera para armar el dashboard completo
+
+BREAKER_UMBRAL_FALLOS = 3  # fallos seguidos que marcan a un proveedor como caído
+BREAKER_ENFRIAMIENTO = 60  # segundos sin consultarlo antes de volver a probar
+
+# Los contadores de la cache se acumulan en memoria y se vuelcan a la cache
+# compartida cada tantos eventos, para no sumar una escritura por lectura.
+CONTADORES_LOTE = 50
+
+# Validadores HTTP que se guardan junto a cada payload y se reenvían como
+# If-None-Match / If-Modified-Since: un 304 evita bajar y decodificar de nuevo.
+VALIDADORES_HTTP = {
+    "ETag": "If-None-Match",
+    "Last-Modified": "If-Modified-Since",
 }
 
-TIMEOUT = 12  # segundos
+# Marca que devuelve _descargar_json cuando el proveedor responde 304
+NO_MODIFICADO = object()
+
+
+def _crear_sesion():
+    """
+    Sesión HTTP compartida por todo el módulo, hacia dolarapi y argentinadatos.
+    Los GET se reintentan ante errores de red o 429/5xx con backoff exponencial
+    y jitter, respetando `Retry-After`.
+    """
+    reintentos = Retry(
+        total=REINTENTOS,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        backoff_factor=0.5,
+        backoff_jitter=0.25,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    return crear_sesion(POOL_CONEXIONES, pool_connections=2, reintentos=reintentos, headers=HEADERS)
+
+
+_sesion = _crear_sesion()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def _breaker_para(url):
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(
+                host, umbral_fallos=BREAKER_UMBRAL_FALLOS, enfriamiento=BREAKER_ENFRIAMIENTO,
+            )
+        return _breakers[host]
+
 
-def _get_json(url, fallback=None):
-    if fallback is None:
-        fallback = []
+def get_estado_proveedores():
+    """Estado del circuit breaker de cada host consultado en este proceso."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.nombre: b.resumen() for b in breakers}
+
+
+def _descargar_json(url, validadores=None):
+    """
+    Consulta `url` y devuelve `(datos, validadores)`.
+
+    Si se pasan los validadores de una descarga anterior se hace un GET
+    condicional; ante un 304 `datos` es NO_MODIFICADO y quien llama reutiliza
+    el payload que ya tiene. Ante cualquier error `datos` es None (queda en el log).
+
+    Si el proveedor está marcado como caído no se hace la consulta: se
+    devuelve None al instante y quien llama usa el último dato conocido.
+    """
+    breaker = _breaker_para(url)
+    if not breaker.permitir():
+        logger.debug("Circuit breaker abierto para %s: se omite la consulta", breaker.nombre)
+        return None, {}
+    condicionales = {
+        VALIDADORES_HTTP[nombre]: valor
+        for nombre, valor in (validadores or {}).items()
+        if nombre in VALIDADORES_HTTP
+    }
     try:
-        response = requests.get(url, headers=HEADERS, timeout=TIMEOUT)
+        response = _sesion.get(url, timeout=TIMEOUT, headers=condicionales)
         response.raise_for_status()
-        return response.json()
+        nuevos_validadores = {
+            nombre: response.headers[nombre]
+            for nombre in VALIDADORES_HTTP
+            if nombre in response.headers
+        }
+        if response.status_code == 304:
+            breaker.registrar_exito()
+            # Un 304 puede repetir solo parte de los validadores
+            return NO_MODIFICADO, {**(validadores or {}), **nuevos_validadores}
+        datos = response.json()
     except requests.exceptions.Timeout:
         logger.warning("Timeout al consultar %s", url)
     except requests.exceptions.ConnectionError:
         logger.warning("Error de conexión al consultar %s", url)
     except requests.exceptions.HTTPError as exc:
         logger.warning("Error HTTP %s al consultar %s", exc.response.status_code, url)
+        if exc.response.status_code < 500 and exc.response.status_code != 429:
+            # El proveedor respondió: el error es de la consulta, no de su salud
+            breaker.registrar_exito()
+            return None, {}
     except Exception:
         logger.exception("Error inesperado al consultar %s", url)
-    return fallback
+    else:
+        breaker.registrar_exito()
+        return datos, nuevos_validadores
+    breaker.registrar_fallo()
+    return None, {}
+
+
+def _clave_cache(nombre):
+    return f"{CACHE_PREFIX}:datos:{nombre}"
+
+
+EVENTOS_CACHE = ("hit", "stale", "miss")
+_contadores = dict.fromkeys(EVENTOS_CACHE, 0)
+_contadores_lock = threading.Lock()
+
+
+def _volcar_contadores():
+    with _contadores_lock:
+        pendientes = {e: n for e, n in _contadores.items() if n}
+        _contadores.update(dict.fromkeys(pendientes, 0))
+    for evento, cantidad in pendientes.items():
+        clave = f"{CACHE_PREFIX}:stats:{evento}"
+        try:
+            cache.incr(clave, cantidad)
+        except ValueError:
+            if not cache.add(clave, cantidad, timeout=None):
+                cache.incr(clave, cantidad)
+
+
+def _contar(evento):
+    with _contadores_lock:
+        _contadores[evento] += 1
+        volcar = sum(_contadores.values()) >= CONTADORES_LOTE
+    if volcar:
+        _volcar_contadores()
+
+
+def get_cache_stats():
+    """
+    Contadores de aciertos (`hit`), datos vencidos servidos (`stale`) y fallos
+    (`miss`). Incluye lo pendiente de volcar de este proceso; lo de otros
+    procesos aparece cuando vuelcan su lote.
+    """
+    _volcar_contadores()
+    valores = cache.get_many([f"{CACHE_PREFIX}:stats:{e}" for e in EVENTOS_CACHE])
+    return {e: valores.get(f"{CACHE_PREFIX}:stats:{e}", 0) for e in EVENTOS_CACHE}
+
+
+def _refrescar(nombre, url):
+    """
+    Descarga `url` y, si responde, guarda el resultado en la cache compartida.
+
+    Se pide de forma condicional con los validadores de la entrada guardada:
+    ante un 304 se conserva el payload y solo se renueva `obtenido_en`.
+    """
+    anterior = cache.get(_clave_cache(nombre))
+    validadores = anterior.get("validadores") if anterior else None
+    datos, validadores = _descargar_json(url, validadores)
+    if datos is NO_MODIFICADO:
+        datos = anterior["datos"]
+    if datos is not None:
+        cache.set(
+            _clave_cache(nombre),
+            {"datos": datos, "obtenido_en": time.time(), "validadores": validadores},
+            timeout=CACHE_RETENCION,
+        )
+    return datos
+
+
+def _revalidar_en_segundo_plano(nombre, url):
+    # Un solo refresco en vuelo por endpoint: el resto sigue sirviendo el dato vencido
+    clave_lock = f"{CACHE_PREFIX}:revalidando:{nombre}"
+    duracion_maxima = (CONNECT_TIMEOUT + READ_TIMEOUT) * (REINTENTOS + 1)
+    if not cache.add(clave_lock, 1, timeout=duracion_maxima):
+        return
+
+    def _tarea():
+        try:
+            _refrescar(nombre, url)
+        finally:
+            cache.delete(clave_lock)
+            # El hilo abre su propia conexión (DatabaseCache en producción)
+            connection.close()
+
+    threading.Thread(target=_tarea, name=f"revalidar-{nombre}", daemon=True).start()
+
+
+def _get_cacheado(nombre, url, fallback):
+    """
+    Cache con stale-while-revalidate: un dato fresco se devuelve directo; uno
+    vencido se devuelve igual y se refresca en segundo plano. Solo cuando no hay
+    ningún dato guardado la request espera a la API.
+    """
+    entrada = cache.get(_clave_cache(nombre))
+    if entrada is not None:
+        if time.time() - entrada["obtenido_en"] < CACHE_TTL[nombre]:
+            _contar("hit")
+        else:
+            _contar("stale")
+            _revalidar_en_segundo_plano(nombre, url)
+        return entrada["datos"]
+
+    _contar("miss")
+    datos = _refrescar(nombre, url)
+    return fallback if datos is None else datos
+
 
 def get_dolares():
-    return _get_json(f"{BASE_DOLAR}/dolares", fallback=[])
+    return _get_cacheado("dolares", FUENTES_URL["dolares"], fallback=[])
 
 def get_cotizaciones():
-    return _get_json(f"{BASE_DOLAR}/cotizaciones", fallback=[])
+    return _get_cacheado("cotizaciones", FUENTES_URL["cotizaciones"], fallback=[])
 
-def get_inflacion():
-    return _get_json(f"{BASE_ARGDATOS}/finanzas/indices/inflacion", fallback=[])
+def get_riesgo_pais_ultimo():
+    return _get_cacheado("riesgo_ultimo", FUENTES_URL["riesgo_ultimo"], fallback=[])
 
-def get_inflacion_interanual():
-    return _get_json(f"{BASE_ARGDATOS}/finanzas/indices/inflacionInteranual", fallback=[])
+def _parse_fecha(valor):
+    try:
+        return date.fromisoformat(str(valor)[:10])
+    except (TypeError, ValueError):
+        return None
 
-def get_uva():
-    return _get_json(f"{BASE_ARGDATOS}/finanzas/indices/uva", fallback=[])
 
-def get_riesgo_pais():
-    return _get_json(f"{BASE_ARGDATOS}/finanzas/indices/riesgo-pais", fallback=[])
+def sincronizar_serie(serie):
+    """
+    Descarga la serie desde argentinadatos y guarda solo los puntos posteriores
+    a la última fecha almacenada.
 
+    La API no permite pedir un rango, así que se hace un GET condicional con
+    los validadores de la última descarga: si la serie no cambió responde 304
+    y no se baja ni decodifica nada. Si cambió, el payload completo se recorre
+    desde el final y se corta en el primer punto ya conocido.
 
-def get_riesgo_pais_ultimo():
-    return _get_json(f"{BASE_ARGDATOS}/finanzas/indices/riesgo-pais/ultimo", fallback=None)
-
-def get_dashboard_data():
-    return {
-        "dolares": get_dolares(),
-        "cotizaciones": get_cotizaciones(),
-        "inflacion": get_inflacion(),
-        "inflacion_ia": get_inflacion_interanual(),
-        "uva": get_uva(),
-        "riesgo_pais": get_riesgo_pais(),
-        "riesgo_ultimo": get_riesgo_pais_ultimo(),
+    Returns:
+        Cantidad de puntos nuevos, o None si la API no respondió.
+    """
+    ultima = PuntoSerie.objects.filter(serie=serie).aggregate(ultima=Max('fecha'))['ultima']
+    clave_validadores = _clave_validadores_serie(serie)
+    # Sin puntos guardados no sirve un 304: hace falta el payload completo
+    validadores = cache.get(clave_validadores) if ultima is not None else None
+    datos, validadores = _descargar_json(SERIES_URL[serie], validadores)
+    if datos is None:
+        return None
+    if validadores:
+        cache.set(clave_validadores, validadores, timeout=CACHE_RETENCION)
+    if datos is NO_MODIFICADO:
+        return 0
+
+    nuevos = []
+    for item in reversed(datos):
+        fecha = _parse_fecha(item.get("fecha"))
+        if fecha is None:
+            continue
+        if ultima is not None and fecha <= ultima:
+            break
+        try:
+            valor = Decimal(str(item.get("valor")))
+        except InvalidOperation:
+            continue
+        nuevos.append(PuntoSerie(serie=serie, fecha=fecha, valor=valor))
+
+    PuntoSerie.objects.bulk_create(nuevos, batch_size=500, ignore_conflicts=True)
+    if nuevos:
+        logger.info("Serie %s sincronizada: %s puntos nuevos", serie, len(nuevos))
+    return len(nuevos)
+
+
+def obtener_serie(serie, ultimos=None, desde=None, hasta=None, puntos=None):
+    """
+    Puntos de la serie en orden cronológico, como dicts `fecha`/`valor`.
+
+    Args:
+        serie: Valor de PuntoSerie.Serie.
+        ultimos: Si se indica, solo los últimos N puntos del rango.
+        desde, hasta: Rango de fechas inclusivo (consulta sobre el índice serie+fecha).
+        puntos: Máximo de puntos a devolver; si el rango trae más se reduce con LTTB.
+    """
+    queryset = PuntoSerie.objects.filter(serie=serie)
+    if desde:
+        queryset = queryset.filter(fecha__gte=desde)
+    if hasta:
+        queryset = queryset.filter(fecha__lte=hasta)
+    if ultimos is not None:
+        filas = list(queryset.order_by('-fecha').values_list('fecha', 'valor')[:ultimos])
+        filas.reverse()
+    else:
+        filas = list(queryset.order_by('fecha').values_list('fecha', 'valor'))
+
+    if puntos and len(filas) > puntos:
+        muestra = reducir_lttb([(f.toordinal(), float(v), f) for f, v in filas], puntos)
+        filas = [(fecha, valor) for _, valor, fecha in muestra]
+    return [{"fecha": fecha.isoformat(), "valor": float(valor)} for fecha, valor in filas]
+
+
+def _clave_validadores_serie(serie):
+    return f"{CACHE_PREFIX}:validadores:{serie}"
+
+
+def _clave_sincronizacion(serie):
+    return f"{CACHE_PREFIX}:serie_sincronizada:{serie}"
+
+
+def _marcar_sincronizacion(serie):
+    """True si la serie venció y este proceso se quedó con el turno de sincronizarla."""
+    return cache.add(_clave_sincronizacion(serie), 1, timeout=CACHE_TTL[serie])
+
+
+def _sincronizar_en_pool(serie):
+    if sincronizar_serie(serie) is None:
+        # Liberar la marca para que la próxima request vuelva a intentar
+        cache.delete(_clave_sincronizacion(serie))
+
+
+def _en_hilo(funcion, *args):
+    """
+    Corre `funcion` en un hilo del pool. La cache (DatabaseCache) y las series
+    usan la base: como al empezar y terminar una request, se descarta la
+    conexión del hilo si venció o quedó rota.
+    """
+    close_old_connections()
+    try:
+        return funcion(*args)
+    finally:
+        close_old_connections()
+
+
+# Pool compartido: las consultas que superan el deadline terminan en segundo
+# plano (y cargan la cache) sin bloquear a la request que las lanzó.
+_executor = ThreadPoolExecutor(max_workers=7, thread_name_prefix="cotizaciones")
+
+_FUENTES_DASHBOARD = {
+    "dolares": (get_dolares, []),
+    "cotizaciones": (get_cotizaciones, []),
+    "riesgo_ultimo": (get_riesgo_pais_ultimo, []),
+}
+
+
+def get_dashboard_data(deadline=DASHBOARD_DEADLINE, desde=None, hasta=None, puntos=None):
+    """
+    Consulta las fuentes del dashboard en paralelo y lee las series históricas
+    del almacenamiento local.
+
+    Sin `desde`/`hasta` cada gráfico muestra su ventana por defecto
+    (VENTANAS_DASHBOARD); con rango, todos los puntos del rango reducidos a
+    `puntos` como máximo. `ultimos` trae el último punto guardado de cada
+    serie, sin aplicar el rango, para las tarjetas del valor vigente.
+
+    Espera como máximo `deadline` segundos en total; las fuentes que no
+    respondieron a tiempo se devuelven con su valor vacío. Las series vencidas
+    se sincronizan en segundo plano; solo se espera a las que aún no tienen
+    ningún punto guardado.
+    """
+    futuros = {
+        _executor.submit(_en_hilo, funcion): clave
+        for clave, (funcion, _) in _FUENTES_DASHBOARD.items()
     }
+    series_a_sincronizar = [serie for serie in SERIES_URL if _marcar_sincronizacion(serie)]
+    if series_a_sincronizar:
+        con_datos = set(PuntoSerie.objects.order_by().values_list('serie', flat=True).distinct())
+        for serie in series_a_sincronizar:
+            futuro = _executor.submit(_en_hilo, _sincronizar_en_pool, serie)
+            if serie not in con_datos:
+                futuros[futuro] = serie
+    terminados, pendientes = wait(futuros, timeout=deadline)
+
+    data = {clave: vacio for clave, (_, vacio) in _FUENTES_DASHBOARD.items()}
+    for futuro in terminados:
+        clave = futuros[futuro]
+        try:
+            resultado = futuro.result()
+        except Exception:
+            logger.exception("Error inesperado al obtener %s para el dashboard", clave)
+            continue
+        if clave in _FUENTES_DASHBOARD:
+            data[clave] = resultado
+    if pendientes:
+        logger.warning(
+            "Dashboard económico armado sin %s: superaron el deadline de %ss",
+            ", ".join(sorted(futuros[f] for f in pendientes)), deadline,
+        )
+
+    con_rango = bool(desde or hasta)
+    for serie, ultimos in VENTANAS_DASHBOARD.items():
+        data[serie] = obtener_serie(
+            serie, ultimos=None if con_rango else ultimos,
+            desde=desde, hasta=hasta, puntos=puntos,
+        )
+    data["ultimos"] = {serie: next(iter(obtener_serie(serie, ultimos=1)), None) for serie in VENTANAS_DASHBOARD}
+    return data
+
+
+def refrescar_datos(margen=0):
+    """
+    Precalienta la cache y el histórico local para que ninguna request tenga
+    que esperar a las APIs. Lo usa el comando `refrescar_cotizaciones`.
+
+    Refresca cada fuente a la que le queden menos de `margen` segundos de
+    frescura y sincroniza las series cuyo intervalo de sincronización venció.
+
+    Returns:
+        {'refrescadas': [str], 'fallidas': [str]}
+    """
+    refrescadas, fallidas = [], []
+    ahora = time.time()
+    for nombre, url in FUENTES_URL.items():
+        entrada = cache.get(_clave_cache(nombre))
+        if entrada is not None and ahora - entrada["obtenido_en"] + margen < CACHE_TTL[nombre]:
+            continue
+        (refrescadas if _refrescar(nombre, url) is not None else fallidas).append(nombre)
+
+    for serie in SERIES_URL:
+        if not _marcar_sincronizacion(serie):
+            continue
+        if sincronizar_serie(serie) is None:
+            cache.delete(_clave_sincronizacion(serie))
+            fallidas.append(str(serie))
+        else:
+            refrescadas.append(str(serie))
+
+    if not fallidas:
+        cache.set(f"{CACHE_PREFIX}:refresco:ultimo_ok", time.time(), timeout=None)
+    # Los breakers viven en memoria: se publica el estado del proceso que refresca
+    cache.set(f"{CACHE_PREFIX}:refresco:proveedores", get_estado_proveedores(), timeout=None)
+    return {"refrescadas": refrescadas, "fallidas": fallidas}
+
+
+def get_ultimo_refresco_ok():
+    """Timestamp (epoch) del último ciclo de refresco sin errores, o None."""
+    return cache.get(f"{CACHE_PREFIX}:refresco:ultimo_ok")
+
+
+def get_estado_proveedores_refresco():
+    """Estado de los breakers del proceso de refresco al terminar su último ciclo."""
+    return cache.get(f"{CACHE_PREFIX}:refresco:proveedores", {})
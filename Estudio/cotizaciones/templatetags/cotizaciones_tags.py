@@ -1,4 +1,6 @@
-from datetime import datetime, timezone
+import re
+from datetime import datetime
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 from django import template
 
@@ -6,38 +8,44 @@ register = template.Library()
 
 TZ_AR = ZoneInfo("America/Argentina/Buenos_Aires")
 
-_FORMATOS_UTC = (
-    '%Y-%m-%dT%H:%M:%S.%fZ',
-    '%Y-%m-%dT%H:%M:%SZ',
-)
+# Los valores que llegan son pocos y se repiten en cada render (fechaActualizacion
+# de las cards, últimos puntos de las series): con este tope entran todos.
+FECHAS_EN_MEMORIA = 512
 
-_FORMATOS_NAIVE = (
-    '%Y-%m-%dT%H:%M:%S.%f',
-    '%Y-%m-%dT%H:%M:%S',
-)
+_LARGO_FECHA = len('2024-01-31')
 
+# Formas aceptadas: las mismas que la versión con strptime ('aaaa-mm-dd' o
+# 'aaaa-mm-ddThh:mm:ss' con fracción y 'Z' opcionales). fromisoformat admite
+# más ('20240514', offsets, separador espacio), que se siguen devolviendo tal cual.
+_FORMA_ISO = re.compile(r'\d{4}-\d{2}-\d{2}(T\d{2}:\d{2}:\d{2}(\.\d{1,6})?Z?)?')
 
-@register.filter(name='formato_fecha_iso')
-def formato_fecha_iso(valor):
-    if not valor:
-        return valor
+
+@lru_cache(maxsize=FECHAS_EN_MEMORIA)
+def _formatear(valor_str):
+    """
+    Una sola pasada con `fromisoformat` sobre las formas de `_FORMA_ISO`.
+
+    - Solo fecha -> 'dd/mm/aaaa'.
+    - Con zona horaria -> convertida a hora argentina.
+    - Sin zona horaria -> se muestra tal cual.
+    Devuelve None si el texto no es una fecha ISO aceptada.
+    """
+    if not _FORMA_ISO.fullmatch(valor_str):
+        return None
     try:
-        valor_str = str(valor).strip()
-        for fmt in _FORMATOS_UTC:
-            try:
-                dt = datetime.strptime(valor_str, fmt).replace(tzinfo=timezone.utc)
-                dt_ar = dt.astimezone(TZ_AR)
-                return dt_ar.strftime('%d/%m/%Y %H:%M hs')
-            except ValueError:
-                continue
-        for fmt in _FORMATOS_NAIVE:
-            try:
-                dt = datetime.strptime(valor_str, fmt)
-                return dt.strftime('%d/%m/%Y %H:%M hs')
-            except ValueError:
-                continue
-        dt = datetime.strptime(valor_str, '%Y-%m-%d')
+        dt = datetime.fromisoformat(valor_str)
+    except ValueError:
+        return None
+    if len(valor_str) == _LARGO_FECHA:
         return dt.strftime('%d/%m/%Y')
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(TZ_AR)
+    return dt.strftime('%d/%m/%Y %H:%M hs')
+
 
-    except Exception:
+@register.filter(name='formato_fecha_iso')
+def formato_fecha_iso(valor):
+    if not valor:
         return valor
+    formateado = _formatear(str(valor).strip())
+    return valor if formateado is None else formateado
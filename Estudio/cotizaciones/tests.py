@@ -0,0 +1,456 @@
+import json
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from usuarios.models import Usuario
+
+from . import services
+from .circuit_breaker import CircuitBreaker
+from .management.commands import refrescar_cotizaciones
+from .management.commands.benchmark_formato_fecha import _formato_fecha_iso_strptime
+from .models import PuntoSerie
+from .muestreo import reducir_lttb
+from .templatetags.cotizaciones_tags import formato_fecha_iso
+from .views import _armar_secciones
+
+
+class ArmarSeccionesTests(SimpleTestCase):
+    def _como_template(self, valor):
+        return Template("{{ valor }}").render(Context({"valor": valor}))
+
+    def test_numeros_con_el_formato_del_template(self):
+        data = {
+            "riesgo_ultimo": {"valor": 1234.5, "fecha": "2024-05-14"},
+            "dolares": [{"casa": "blue", "compra": 1180.25, "venta": 1200, "fechaActualizacion": None}],
+        }
+        secciones = _armar_secciones(data)
+
+        self.assertEqual(secciones["indicadores"]["riesgo"]["valor"], self._como_template(1234.5))
+        self.assertEqual(secciones["dolares"][0]["compra"], self._como_template(1180.25))
+        self.assertEqual(secciones["dolares"][0]["venta"], self._como_template(1200))
+        self.assertEqual(secciones["indicadores"]["riesgo"]["valor"], "1234,5")
+
+    def test_sin_valor_queda_en_none(self):
+        secciones = _armar_secciones({"dolares": [{"casa": "oficial", "compra": None, "venta": None}]})
+
+        self.assertIsNone(secciones["indicadores"]["riesgo"]["valor"])
+        self.assertIsNone(secciones["dolares"][0]["compra"])
+
+
+class ContadoresCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        services._contadores.update(dict.fromkeys(services.EVENTOS_CACHE, 0))
+
+    def test_vuelca_a_la_cache_por_lote(self):
+        with mock.patch.object(services.cache, "incr", wraps=cache.incr) as incr:
+            for _ in range(services.CONTADORES_LOTE - 1):
+                services._contar("hit")
+            self.assertEqual(incr.call_count, 0)
+            services._contar("miss")
+
+        self.assertEqual(cache.get(f"{services.CACHE_PREFIX}:stats:hit"), services.CONTADORES_LOTE - 1)
+        self.assertEqual(cache.get(f"{services.CACHE_PREFIX}:stats:miss"), 1)
+
+    def test_stats_incluyen_lo_pendiente(self):
+        services._contar("stale")
+        services._contar("stale")
+
+        self.assertEqual(services.get_cache_stats(), {"hit": 0, "stale": 2, "miss": 0})
+
+
+class TurnoRefrescoTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _comando(self):
+        comando = refrescar_cotizaciones.Command()
+        comando._token = f"token-{id(comando)}"
+        return comando
+
+    def test_el_dueno_renueva_y_los_demas_esperan(self):
+        dueno, otro = self._comando(), self._comando()
+
+        self.assertTrue(dueno._tomar_turno(30))
+        self.assertFalse(otro._tomar_turno(30))
+        self.assertTrue(dueno._tomar_turno(30))
+
+    def test_soltar_libera_el_turno(self):
+        dueno, otro = self._comando(), self._comando()
+        dueno._tomar_turno(30)
+
+        otro._soltar_turno()
+        self.assertFalse(otro._tomar_turno(30))
+        dueno._soltar_turno()
+        self.assertTrue(otro._tomar_turno(30))
+
+    def test_el_turno_dura_mas_que_el_peor_ciclo(self):
+        with mock.patch.object(refrescar_cotizaciones.cache, "add", return_value=True) as add:
+            self._comando()._tomar_turno(30)
+
+        self.assertGreater(add.call_args.kwargs["timeout"], refrescar_cotizaciones.DURACION_MAXIMA_CICLO)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.ahora = 1000.0
+        reloj = mock.patch("cotizaciones.circuit_breaker.time.monotonic", side_effect=lambda: self.ahora)
+        reloj.start()
+        self.addCleanup(reloj.stop)
+        self.breaker = CircuitBreaker("api.test", umbral_fallos=3, enfriamiento=30)
+
+    def _fallar(self, veces):
+        for _ in range(veces):
+            self.assertTrue(self.breaker.permitir())
+            self.breaker.registrar_fallo()
+
+    def test_abre_al_llegar_al_umbral(self):
+        self._fallar(2)
+        self.assertEqual(self.breaker.estado, CircuitBreaker.CERRADO)
+        self._fallar(1)
+
+        self.assertEqual(self.breaker.estado, CircuitBreaker.ABIERTO)
+        self.assertFalse(self.breaker.permitir())
+        self.assertEqual(self.breaker.resumen()["rechazadas"], 1)
+
+    def test_un_exito_reinicia_los_fallos_seguidos(self):
+        self._fallar(2)
+        self.breaker.registrar_exito()
+        self._fallar(2)
+
+        self.assertEqual(self.breaker.estado, CircuitBreaker.CERRADO)
+
+    def test_semiabierto_deja_pasar_una_sola_prueba(self):
+        self._fallar(3)
+        self.ahora += 30
+
+        self.assertTrue(self.breaker.permitir())
+        self.assertEqual(self.breaker.estado, CircuitBreaker.SEMIABIERTO)
+        self.assertFalse(self.breaker.permitir())
+
+    def test_prueba_exitosa_cierra(self):
+        self._fallar(3)
+        self.ahora += 30
+        self.breaker.permitir()
+        self.breaker.registrar_exito()
+
+        self.assertEqual(self.breaker.estado, CircuitBreaker.CERRADO)
+        self.assertTrue(self.breaker.permitir())
+
+    def test_prueba_fallida_reabre_y_reinicia_el_enfriamiento(self):
+        self._fallar(3)
+        self.ahora += 30
+        self.breaker.permitir()
+        self.breaker.registrar_fallo()
+
+        self.assertEqual(self.breaker.estado, CircuitBreaker.ABIERTO)
+        self.ahora += 29
+        self.assertFalse(self.breaker.permitir())
+        self.assertEqual(self.breaker.resumen()["aperturas"], 2)
+
+
+class EstadoProveedoresTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_refresco_publica_el_estado_de_sus_breakers(self):
+        with mock.patch.object(services, "FUENTES_URL", {}), mock.patch.object(services, "SERIES_URL", {}), \
+                mock.patch.object(services, "get_estado_proveedores", return_value={"api.test": {"estado": "abierto"}}):
+            services.refrescar_datos()
+
+        self.assertEqual(services.get_estado_proveedores_refresco(), {"api.test": {"estado": "abierto"}})
+
+
+class ReducirLttbTests(SimpleTestCase):
+    def _serie(self, n):
+        return [(x, float(x % 7)) for x in range(n)]
+
+    def test_series_cortas_quedan_igual(self):
+        puntos = self._serie(10)
+
+        self.assertEqual(reducir_lttb(puntos, 10), puntos)
+        self.assertEqual(reducir_lttb(puntos, 50), puntos)
+        self.assertEqual(reducir_lttb(puntos, 2), puntos)
+
+    def test_devuelve_la_cantidad_pedida_con_extremos_y_en_orden(self):
+        puntos = self._serie(1000)
+        reducidos = reducir_lttb(puntos, 60)
+
+        self.assertEqual(len(reducidos), 60)
+        self.assertEqual(reducidos[0], puntos[0])
+        self.assertEqual(reducidos[-1], puntos[-1])
+        self.assertEqual(reducidos, sorted(reducidos))
+
+    def test_conserva_picos_y_valles(self):
+        puntos = [(x, 10.0) for x in range(500)]
+        puntos[123] = (123, 90.0)
+        puntos[377] = (377, -40.0)
+
+        reducidos = reducir_lttb(puntos, 20)
+
+        self.assertIn((123, 90.0), reducidos)
+        self.assertIn((377, -40.0), reducidos)
+
+    def test_conserva_los_elementos_extra_de_cada_punto(self):
+        puntos = [(x, float(x), f"2024-01-{x % 28 + 1:02d}") for x in range(100)]
+
+        for punto in reducir_lttb(puntos, 10):
+            self.assertIn(punto, puntos)
+
+
+class FormatoFechaIsoTests(SimpleTestCase):
+    def test_formatos_aceptados(self):
+        self.assertEqual(formato_fecha_iso("2024-05-14"), "14/05/2024")
+        self.assertEqual(formato_fecha_iso("2024-05-14T15:32:10Z"), "14/05/2024 12:32 hs")
+        self.assertEqual(formato_fecha_iso("2024-05-14T15:32:10.123Z"), "14/05/2024 12:32 hs")
+        self.assertEqual(formato_fecha_iso("2024-05-14T12:32:10.5"), "14/05/2024 12:32 hs")
+
+    def test_lo_que_no_es_una_fecha_aceptada_queda_igual(self):
+        for valor in ("20240514", "2024-05-14 10:00:00", "2024-05-14T10:00", "2024-05-14T10:00:00+00:00",
+                      "2024-W20", "2024-13-01", "Sin datos", ""):
+            with self.subTest(valor=valor):
+                self.assertEqual(formato_fecha_iso(valor), valor)
+
+    def test_coincide_con_la_implementacion_con_strptime(self):
+        for valor in ("2024-05-14", "2024-05-14T15:32:10Z", "2024-05-14T15:32:10.123456Z",
+                      "2024-05-14T15:32:10", "2024-05-14T15:32:10.1", "20240514", "2024-05-14T15:32",
+                      "2024-05-14T15:32:10+03:00", None):
+            with self.subTest(valor=valor):
+                self.assertEqual(formato_fecha_iso(valor), _formato_fecha_iso_strptime(valor))
+
+
+class DashboardMixin:
+    """Usuario logueado y fuentes del dashboard sin red: las series salen de PuntoSerie."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        usuario = Usuario.objects.create_user(
+            email="cotizaciones@test.com", nombre="Test", apellido="Cotizaciones", password="x", rol="Administrador",
+        )
+        self.client.force_login(usuario)
+        for parche in (
+            mock.patch.dict(services._FUENTES_DASHBOARD, {
+                "dolares": (lambda: [], []),
+                "cotizaciones": (lambda: [], []),
+                "riesgo_ultimo": (lambda: None, []),
+            }),
+            mock.patch.object(services, "_marcar_sincronizacion", return_value=False),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+
+class DashboardUltimosTests(DashboardMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for serie, valor_viejo, valor_nuevo in (
+            (PuntoSerie.Serie.INFLACION, "3.5", "2.1"),
+            (PuntoSerie.Serie.INFLACION_IA, "50", "30"),
+            (PuntoSerie.Serie.UVA, "40", "1400"),
+            (PuntoSerie.Serie.RIESGO_PAIS, "1800", "700"),
+        ):
+            PuntoSerie.objects.create(serie=serie, fecha=date(2019, 12, 1), valor=Decimal(valor_viejo))
+            PuntoSerie.objects.create(serie=serie, fecha=date(2024, 6, 1), valor=Decimal(valor_nuevo))
+
+    def test_las_cards_ignoran_el_rango_de_los_graficos(self):
+        respuesta = self.client.get(reverse("cotizaciones:dashboard_economico"), {"hasta": "2020-01-01"})
+
+        self.assertEqual(respuesta.context["infl_labels"], '["2019-12-01"]')
+        self.assertEqual(respuesta.context["ultima_inflacion"], {"fecha": "2024-06-01", "valor": 2.1})
+        self.assertEqual(respuesta.context["ultima_inflacion_ia"]["fecha"], "2024-06-01")
+        self.assertEqual(respuesta.context["ultimo_uva"]["fecha"], "2024-06-01")
+        self.assertEqual(respuesta.context["riesgo_ultimo"]["fecha"], "2024-06-01")
+
+    def test_datos_con_rango_informan_el_ultimo_valor(self):
+        respuesta = self.client.get(reverse("cotizaciones:dashboard_datos"), {"hasta": "2020-01-01"}).json()
+
+        indicadores = respuesta["secciones"]["indicadores"]
+        self.assertEqual(indicadores["inflacion"]["fecha"], "01/06/2024")
+        self.assertEqual(indicadores["uva"]["fecha"], "01/06/2024")
+        self.assertEqual(respuesta["secciones"]["uva"]["labels"], ["2019-12-01"])
+
+    def test_riesgo_pais_usa_su_fuente_si_respondio(self):
+        actual = {"fecha": "2024-06-15", "valor": 650}
+        with mock.patch.dict(services._FUENTES_DASHBOARD, {"riesgo_ultimo": (lambda: actual, [])}):
+            respuesta = self.client.get(reverse("cotizaciones:dashboard_economico"))
+
+        self.assertEqual(respuesta.context["riesgo_ultimo"], actual)
+
+
+class ConexionesPoolTests(DashboardMixin, TestCase):
+    def test_en_hilo_cierra_conexiones_vencidas_antes_y_despues(self):
+        llamadas = []
+        with mock.patch.object(services, "close_old_connections", side_effect=lambda: llamadas.append("cerrar")):
+            with self.assertRaises(ValueError):
+                services._en_hilo(lambda: llamadas.append("funcion") or int("x"))
+
+        self.assertEqual(llamadas, ["cerrar", "funcion", "cerrar"])
+
+    def test_el_dashboard_consulta_cada_fuente_en_en_hilo(self):
+        with mock.patch.object(services, "close_old_connections") as cerrar:
+            services.get_dashboard_data()
+
+        self.assertEqual(cerrar.call_count, 2 * len(services._FUENTES_DASHBOARD))
+
+
+class SincronizarSerieTests(TestCase):
+    serie = PuntoSerie.Serie.UVA
+
+    def setUp(self):
+        cache.clear()
+
+    def _payload(self, *dias):
+        return [{"fecha": f"2024-01-{dia:02d}", "valor": 100 + dia} for dia in dias]
+
+    def _sincronizar(self, datos, validadores=None):
+        with mock.patch.object(services, "_descargar_json", return_value=(datos, validadores or {})) as descargar:
+            resultado = services.sincronizar_serie(self.serie)
+        return resultado, descargar
+
+    def _guardados(self):
+        return list(PuntoSerie.objects.filter(serie=self.serie).order_by("fecha").values_list("fecha", "valor"))
+
+    def test_la_primera_sincronizacion_inserta_todo(self):
+        resultado, descargar = self._sincronizar(self._payload(1, 2, 3), {"ETag": '"v1"'})
+
+        self.assertEqual(resultado, 3)
+        descargar.assert_called_once_with(services.SERIES_URL[self.serie], None)
+        self.assertEqual(self._guardados(), [(date(2024, 1, d), Decimal(100 + d)) for d in (1, 2, 3)])
+
+    def test_la_segunda_solo_agrega_lo_posterior_a_la_ultima_fecha(self):
+        self._sincronizar(self._payload(1, 2, 3), {"ETag": '"v1"'})
+        PuntoSerie.objects.filter(serie=self.serie, fecha=date(2024, 1, 2)).update(valor=Decimal("1"))
+
+        resultado, descargar = self._sincronizar(self._payload(1, 2, 3, 4, 5), {"ETag": '"v2"'})
+
+        self.assertEqual(resultado, 2)
+        # GET condicional con los validadores de la descarga anterior
+        descargar.assert_called_once_with(services.SERIES_URL[self.serie], {"ETag": '"v1"'})
+        guardados = dict(self._guardados())
+        self.assertEqual(sorted(guardados), [date(2024, 1, d) for d in range(1, 6)])
+        # Los puntos ya guardados no se reescriben
+        self.assertEqual(guardados[date(2024, 1, 2)], Decimal("1"))
+
+    def test_sin_cambios_no_inserta(self):
+        self._sincronizar(self._payload(1, 2))
+
+        resultado, _ = self._sincronizar(services.NO_MODIFICADO)
+
+        self.assertEqual(resultado, 0)
+        self.assertEqual(len(self._guardados()), 2)
+
+    def test_sin_respuesta_devuelve_none(self):
+        resultado, _ = self._sincronizar(None)
+
+        self.assertIsNone(resultado)
+        self.assertEqual(self._guardados(), [])
+
+    def test_descarta_puntos_invalidos(self):
+        datos = self._payload(1) + [{"fecha": "no es fecha", "valor": 1}, {"fecha": "2024-01-02", "valor": "x"}]
+
+        resultado, _ = self._sincronizar(datos)
+
+        self.assertEqual(resultado, 1)
+
+    def test_obtener_serie_por_rango_y_ultimos(self):
+        self._sincronizar(self._payload(*range(1, 11)))
+
+        self.assertEqual(
+            services.obtener_serie(self.serie, ultimos=2),
+            [{"fecha": "2024-01-09", "valor": 109.0}, {"fecha": "2024-01-10", "valor": 110.0}],
+        )
+        rango = services.obtener_serie(self.serie, desde=date(2024, 1, 3), hasta=date(2024, 1, 5))
+        self.assertEqual([p["fecha"] for p in rango], ["2024-01-03", "2024-01-04", "2024-01-05"])
+        self.assertEqual(len(services.obtener_serie(self.serie, puntos=4)), 4)
+
+
+def _respuesta(status, datos=None, headers=None):
+    respuesta = services.requests.Response()
+    respuesta.status_code = status
+    respuesta.headers.update(headers or {})
+    respuesta._content = b"" if datos is None else json.dumps(datos).encode()
+    return respuesta
+
+
+class DescargaCondicionalTests(SimpleTestCase):
+    url = "https://condicional.test/serie"
+
+    def setUp(self):
+        cache.clear()
+
+    def _descargar(self, respuesta, validadores=None):
+        with mock.patch.object(services._sesion, "get", return_value=respuesta) as get:
+            resultado = services._descargar_json(self.url, validadores)
+        return resultado, get
+
+    def test_envia_los_validadores_como_headers_condicionales(self):
+        _, get = self._descargar(
+            _respuesta(200, []), {"ETag": '"v1"', "Last-Modified": "Tue, 14 May 2024 10:00:00 GMT"},
+        )
+
+        self.assertEqual(get.call_args.kwargs["headers"], {
+            "If-None-Match": '"v1"', "If-Modified-Since": "Tue, 14 May 2024 10:00:00 GMT",
+        })
+
+    def test_sin_validadores_no_es_condicional(self):
+        (datos, validadores), get = self._descargar(_respuesta(200, [1, 2], {"ETag": '"v1"'}))
+
+        self.assertEqual(get.call_args.kwargs["headers"], {})
+        self.assertEqual(datos, [1, 2])
+        self.assertEqual(validadores, {"ETag": '"v1"'})
+
+    def test_304_conserva_los_validadores_que_no_repite(self):
+        (datos, validadores), _ = self._descargar(
+            _respuesta(304, headers={"ETag": '"v2"'}), {"ETag": '"v1"', "Last-Modified": "ayer"},
+        )
+
+        self.assertIs(datos, services.NO_MODIFICADO)
+        self.assertEqual(validadores, {"ETag": '"v2"', "Last-Modified": "ayer"})
+
+    def test_refrescar_con_304_mantiene_el_dato_guardado(self):
+        clave = services._clave_cache("dolares")
+        cache.set(clave, {"datos": [{"casa": "blue"}], "obtenido_en": 0, "validadores": {"ETag": '"v1"'}})
+
+        with mock.patch.object(services._sesion, "get", return_value=_respuesta(304)) as get:
+            datos = services._refrescar("dolares", self.url)
+
+        self.assertEqual(get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+        self.assertEqual(datos, [{"casa": "blue"}])
+        entrada = cache.get(clave)
+        self.assertEqual(entrada["datos"], [{"casa": "blue"}])
+        self.assertGreater(entrada["obtenido_en"], 0)
+
+
+class DashboardDatosEtagTests(DashboardMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        PuntoSerie.objects.create(serie=PuntoSerie.Serie.UVA, fecha=date(2024, 6, 1), valor=Decimal("1400"))
+        self.url = reverse("cotizaciones:dashboard_datos")
+
+    def test_responde_304_sin_cuerpo_si_el_etag_coincide(self):
+        primera = self.client.get(self.url)
+        etag = primera["ETag"]
+        self.assertTrue(primera.json()["completo"])
+
+        segunda = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(segunda.content, b"")
+        self.assertEqual(segunda["ETag"], etag)
+
+    def test_devuelve_solo_las_secciones_que_cambiaron(self):
+        etag = self.client.get(self.url)["ETag"]
+        PuntoSerie.objects.create(serie=PuntoSerie.Serie.UVA, fecha=date(2024, 6, 2), valor=Decimal("1401"))
+
+        respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(respuesta.json()["completo"])
+        self.assertEqual(set(respuesta.json()["secciones"]), {"indicadores", "uva"})
+        self.assertNotEqual(respuesta["ETag"], etag)
@@ -5,4 +5,6 @@ app_name = "cotizaciones"
 
 urlpatterns = [
     path("", views.dashboard_economico_view, name="dashboard_economico"),
+    path("datos/", views.dashboard_datos_view, name="dashboard_datos"),
+    path("estado/", views.estado_view, name="estado"),
 ]
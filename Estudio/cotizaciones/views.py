@@ -1,20 +1,119 @@
+import hashlib
 import json
 import logging
+from datetime import datetime, timezone
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseNotModified, JsonResponse
 from django.shortcuts import render
-from .services import get_dashboard_data
+from django.utils.formats import localize
+from django.views.decorators.http import require_GET
+from .forms import RangoSeriesForm
+from .services import (
+    get_cache_stats, get_dashboard_data, get_estado_proveedores,
+    get_estado_proveedores_refresco, get_ultimo_refresco_ok,
+)
+from .templatetags.cotizaciones_tags import formato_fecha_iso
 
 logger = logging.getLogger(__name__)
 
 ROLES_PERMITIDOS = ('Administrador', 'Colaborador')
 
+# Orden fijo de las secciones: define la posición de cada hash dentro del ETag
+SECCIONES = ("indicadores", "dolares", "cotizaciones", "inflacion", "inflacion_ia", "uva", "riesgo_pais")
+
+
+def _extraer_labels_valores(datos):
+    """Extrae listas de fechas y valores de una lista de dicts."""
+    labels = [item.get("fecha", "") for item in datos]
+    valores = [item.get("valor", 0) for item in datos]
+    return labels, valores
+
+
+def _numero(valor):
+    """Número como lo muestra el template (separador decimal del idioma activo)."""
+    return None if valor is None else localize(valor)
+
+
+def _indicador(item):
+    if not item or item.get("valor") is None:
+        return {"valor": None, "fecha": formato_fecha_iso((item or {}).get("fecha"))}
+    return {"valor": _numero(item["valor"]), "fecha": formato_fecha_iso(item.get("fecha"))}
+
+
+def _moneda(item, clave):
+    return {
+        "clave": item.get(clave),
+        "compra": _numero(item.get("compra")),
+        "venta": _numero(item.get("venta")),
+        "fecha": formato_fecha_iso(item.get("fechaActualizacion")),
+    }
+
+
+def _ultimos(data):
+    """
+    Valor vigente de cada indicador: el último punto guardado de la serie, no
+    el último del rango del gráfico. Riesgo país viene de su propia fuente y
+    usa la serie solo si esa fuente no respondió.
+    """
+    ultimos = data.get("ultimos") or {}
+    return {
+        "riesgo": data.get("riesgo_ultimo") or ultimos.get("riesgo_pais"),
+        "inflacion": ultimos.get("inflacion"),
+        "inflacion_ia": ultimos.get("inflacion_ia"),
+        "uva": ultimos.get("uva"),
+    }
+
+
+def _armar_secciones(data):
+    """Datos del dashboard agrupados en las secciones que el JS actualiza en el lugar."""
+    secciones = {
+        "indicadores": {clave: _indicador(item) for clave, item in _ultimos(data).items()},
+        "dolares": [_moneda(d, "casa") for d in data.get("dolares") or []],
+        "cotizaciones": [_moneda(c, "moneda") for c in data.get("cotizaciones") or []],
+    }
+    for serie in ("inflacion", "inflacion_ia", "uva", "riesgo_pais"):
+        labels, valores = _extraer_labels_valores(data.get(serie) or [])
+        secciones[serie] = {"labels": labels, "valores": valores}
+    return secciones
+
+
+def _hash_seccion(contenido):
+    serializado = json.dumps(contenido, sort_keys=True, default=str).encode()
+    return hashlib.sha1(serializado).hexdigest()[:12]
+
+
+def _version(hashes):
+    """ETag compuesto: un hash por sección, en el orden de SECCIONES."""
+    return '"' + ".".join(hashes[s] for s in SECCIONES) + '"'
+
+
+def _hashes_cliente(if_none_match):
+    partes = if_none_match.strip().removeprefix("W/").strip('"').split(".")
+    if len(partes) != len(SECCIONES):
+        return {}
+    return dict(zip(SECCIONES, partes))
+
+
+def _parametros_rango(form):
+    """Argumentos de get_dashboard_data según el rango pedido; vacío si no es válido."""
+    if not form.is_valid():
+        return {}
+    return {
+        "desde": form.cleaned_data["desde"],
+        "hasta": form.cleaned_data["hasta"],
+        "puntos": form.cleaned_data["puntos"],
+    }
+
+
 @login_required
 def dashboard_economico_view(request):
     if request.user.rol not in ROLES_PERMITIDOS:
         raise PermissionDenied
 
-    data = get_dashboard_data()
+    form_rango = RangoSeriesForm(request.GET or None)
+    data = get_dashboard_data(**_parametros_rango(form_rango))
+    secciones = _armar_secciones(data)
 
     # Preparar datos de dólares para las cards
     dolares = data.get("dolares") or []
@@ -22,52 +121,98 @@ def dashboard_economico_view(request):
     # Preparar cotizaciones de otras monedas
     cotizaciones = data.get("cotizaciones") or []
 
-    # Últimos valores de inflación mensual e interanual
-    inflacion_lista = data.get("inflacion") or []
-    inflacion_ia_lista = data.get("inflacion_ia") or []
-    uva_lista = data.get("uva") or []
-    riesgo_pais_lista = data.get("riesgo_pais") or []
-    riesgo_ultimo = data.get("riesgo_ultimo")
-
-    # Obtener últimos valores para las cards de resumen
-    ultima_inflacion = inflacion_lista[-1] if inflacion_lista else None
-    ultima_inflacion_ia = inflacion_ia_lista[-1] if inflacion_ia_lista else None
-    ultimo_uva = uva_lista[-1] if uva_lista else None
-
-    # Datos para gráficos: últimos 24 meses (inflación), últimos 60 (UVA y riesgo)
-    inflacion_chart = inflacion_lista[-24:] if inflacion_lista else []
-    inflacion_ia_chart = inflacion_ia_lista[-24:] if inflacion_ia_lista else []
-    uva_chart = uva_lista[-60:] if uva_lista else []
-    riesgo_chart = riesgo_pais_lista[-60:] if riesgo_pais_lista else []
-
-    # Serializar datos de gráficos a JSON para Chart.js
-    def extraer_labels_valores(datos):
-        """Extrae listas de fechas y valores de una lista de dicts."""
-        labels = [item.get("fecha", "") for item in datos]
-        valores = [item.get("valor", 0) for item in datos]
-        return labels, valores
-
-    infl_labels, infl_valores = extraer_labels_valores(inflacion_chart)
-    infl_ia_labels, infl_ia_valores = extraer_labels_valores(inflacion_ia_chart)
-    uva_labels, uva_valores = extraer_labels_valores(uva_chart)
-    riesgo_labels, riesgo_valores = extraer_labels_valores(riesgo_chart)
+    # Las series históricas vienen recortadas al rango de cada gráfico; las
+    # cards de resumen muestran el último valor guardado, sin importar el rango
+    ultimos = _ultimos(data)
 
     contexto = {
+        "form_rango": form_rango,
+        "rango_activo": form_rango.rango_activo,
         "dolares": dolares,
         "cotizaciones": cotizaciones,
-        "ultima_inflacion": ultima_inflacion,
-        "ultima_inflacion_ia": ultima_inflacion_ia,
-        "ultimo_uva": ultimo_uva,
-        "riesgo_ultimo": riesgo_ultimo,
+        "ultima_inflacion": ultimos["inflacion"],
+        "ultima_inflacion_ia": ultimos["inflacion_ia"],
+        "ultimo_uva": ultimos["uva"],
+        "riesgo_ultimo": ultimos["riesgo"],
         # Datos JSON para Chart.js
-        "infl_labels": json.dumps(infl_labels),
-        "infl_valores": json.dumps(infl_valores),
-        "infl_ia_labels": json.dumps(infl_ia_labels),
-        "infl_ia_valores": json.dumps(infl_ia_valores),
-        "uva_labels": json.dumps(uva_labels),
-        "uva_valores": json.dumps(uva_valores),
-        "riesgo_labels": json.dumps(riesgo_labels),
-        "riesgo_valores": json.dumps(riesgo_valores),
+        "infl_labels": json.dumps(secciones["inflacion"]["labels"]),
+        "infl_valores": json.dumps(secciones["inflacion"]["valores"]),
+        "infl_ia_labels": json.dumps(secciones["inflacion_ia"]["labels"]),
+        "infl_ia_valores": json.dumps(secciones["inflacion_ia"]["valores"]),
+        "uva_labels": json.dumps(secciones["uva"]["labels"]),
+        "uva_valores": json.dumps(secciones["uva"]["valores"]),
+        "riesgo_labels": json.dumps(secciones["riesgo_pais"]["labels"]),
+        "riesgo_valores": json.dumps(secciones["riesgo_pais"]["valores"]),
+        # Versión inicial para que el primer refresco pueda responder 304
+        "version": json.dumps(_version({s: _hash_seccion(c) for s, c in secciones.items()})),
     }
 
-    return render(request, "cotizaciones/dashboard.html", contexto)
\ No newline at end of file
+    return render(request, "cotizaciones/dashboard.html", contexto)
+
+
+@login_required
+@require_GET
+def dashboard_datos_view(request):
+    """
+    Endpoint JSON para el refresco en el lugar del dashboard.
+
+    El ETag lleva un hash por sección. Si coincide con `If-None-Match` responde
+    304; si no, devuelve solo las secciones cuyo hash cambió respecto de la
+    versión que tiene el cliente.
+    Acepta los mismos parámetros de rango que el dashboard (`desde`, `hasta`, `puntos`).
+    Contrato: {'ok': bool, 'version': str, 'completo': bool, 'secciones': dict}
+    """
+    if request.user.rol not in ROLES_PERMITIDOS:
+        raise PermissionDenied
+
+    form_rango = RangoSeriesForm(request.GET or None)
+    if request.GET and not form_rango.is_valid():
+        return JsonResponse({"ok": False, "error": form_rango.errors.get_json_data()}, status=400)
+
+    secciones = _armar_secciones(get_dashboard_data(**_parametros_rango(form_rango)))
+    hashes = {s: _hash_seccion(c) for s, c in secciones.items()}
+    version = _version(hashes)
+
+    if_none_match = request.headers.get("If-None-Match", "")
+    if if_none_match == version:
+        respuesta = HttpResponseNotModified()
+        respuesta["ETag"] = version
+        return respuesta
+
+    conocidos = _hashes_cliente(if_none_match)
+    cambiadas = {s: c for s, c in secciones.items() if conocidos.get(s) != hashes[s]}
+    respuesta = JsonResponse({
+        "ok": True,
+        "version": version,
+        "completo": len(cambiadas) == len(secciones),
+        "secciones": cambiadas,
+    })
+    respuesta["ETag"] = version
+    respuesta["Cache-Control"] = "private, no-cache"
+    return respuesta
+
+
+@login_required
+@require_GET
+def estado_view(request):
+    """
+    Estado de la cache de cotizaciones y de los proveedores para monitoreo.
+
+    `proveedores` son los circuit breakers de este worker y `proveedores_refresco`
+    los del comando refrescar_cotizaciones en su último ciclo.
+    Contrato: {'ok': bool, 'cache': {'hit', 'stale', 'miss'}, 'ultimo_refresco_ok': str | None,
+               'proveedores': dict, 'proveedores_refresco': dict}
+    """
+    if request.user.rol not in ROLES_PERMITIDOS:
+        raise PermissionDenied
+
+    ultimo_ok = get_ultimo_refresco_ok()
+    return JsonResponse({
+        "ok": True,
+        "cache": get_cache_stats(),
+        "ultimo_refresco_ok": (
+            datetime.fromtimestamp(ultimo_ok, tz=timezone.utc).isoformat() if ultimo_ok else None
+        ),
+        "proveedores": get_estado_proveedores(),
+        "proveedores_refresco": get_estado_proveedores_refresco(),
+    })
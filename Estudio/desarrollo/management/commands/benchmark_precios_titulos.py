@@ -0,0 +1,105 @@
+import math
+import time
+from statistics import median
+from urllib.parse import urlsplit
+from unittest import mock
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from tesoreria import services
+from tesoreria.iol_client import CACHE_PREFIJO_CIERRE
+from tesoreria.iol_stub import ConfiguracionStub, iniciar_stub
+from tesoreria.management.benchmark import titulos_benchmark
+from tesoreria.models import LimitadorIOL, SimboloNoEncontrado, TituloON
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la actualización de precios de títulos contra el stub local de IOL: símbolos/s, "
+        "latencia p50/p95 del refresco y llamadas HTTP por refresco para distintas "
+        "cantidades de TituloON. Los títulos se crean al empezar y se borran al "
+        "terminar, junto con su histórico y sus registros de símbolos no encontrados. "
+        "Solo para desarrollo: escribe en la base configurada y la app desarrollo "
+        "solo se instala con DEBUG."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", default="10,100,1000", help="Cantidades de TituloON separadas por coma.")
+        parser.add_argument("--repeticiones", type=int, default=5, help="Refrescos forzados por cantidad (default: 5).")
+        parser.add_argument("--latencia-ms", type=float, default=50)
+        parser.add_argument("--tasa-error", type=float, default=0.0)
+        parser.add_argument("--tasa-404", type=float, default=0.1)
+        parser.add_argument(
+            "--limite-stub", type=int, default=0,
+            help="Llamadas por segundo que acepta el stub antes de responder 429 (0: sin límite).",
+        )
+        parser.add_argument(
+            "--cobertura-panel", type=float, default=0.8,
+            help="Fracción de los símbolos que el stub publica en el panel de bonos (default: 0.8).",
+        )
+
+    def handle(self, *args, **options):
+        configuracion = ConfiguracionStub(
+            latencia=options["latencia_ms"] / 1000,
+            tasa_error=options["tasa_error"],
+            tasa_404=options["tasa_404"],
+            limite_por_segundo=options["limite_stub"],
+        )
+        servidor = iniciar_stub(configuracion)
+
+        def refrescar(titulos, forzar):
+            servidor.reiniciar_contadores()
+            inicio = time.perf_counter()
+            resultado = services.actualizar_precios(forzar=forzar, titulos=titulos)
+            return time.perf_counter() - inicio, sum(servidor.llamadas.values()), resultado
+
+        self.stdout.write(
+            f"{'filas':>6} {'símbolos':>9} {'símb/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'HTTP/refresco':>14} {'HTTP con cache':>15} {'429':>5}"
+        )
+        try:
+            with override_settings(IOL_BASE_URL=servidor.url), \
+                    mock.patch.object(services, "get_dolar_mep", return_value={"venta": 1000}):
+                for filas in [int(f) for f in options["filas"].split(",") if f.strip()]:
+                    self._medir(filas, options, servidor, refrescar)
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+            LimitadorIOL.objects.filter(host=urlsplit(servidor.url).netloc).delete()
+
+    def _medir(self, filas, options, servidor, refrescar):
+        titulos, simbolos = titulos_benchmark(filas)
+        publicados = int(len(simbolos) * options["cobertura_panel"])
+        servidor.configuracion.paneles = {"bonos": simbolos[:publicados]}
+
+        # Se confirman (no una transacción revertida): los hilos del cliente de
+        # IOL escriben el limitador con su propia conexión y, en SQLite, una
+        # transacción abierta aquí los bloquearía.
+        # Solo los títulos del benchmark: los cargados en la base no se consultan ni se modifican.
+        creados = TituloON.objects.filter(pk__in=[t.pk for t in TituloON.objects.bulk_create(titulos)])
+        try:
+            duraciones, llamadas, rechazos = [], [], 0
+            for _ in range(max(options["repeticiones"], 1)):
+                duracion, http, _ = refrescar(creados, forzar=True)
+                duraciones.append(duracion)
+                llamadas.append(http)
+                rechazos += servidor.rechazadas_429
+            _, http_con_cache, _ = refrescar(creados, forzar=False)
+        finally:
+            # Un solo recálculo del resumen, no uno por título borrado
+            with services.resumen_diferido():
+                creados.delete()
+                SimboloNoEncontrado.objects.filter(simbolo__in=simbolos).delete()
+            cache.delete_many([CACHE_PREFIJO_CIERRE + s for s in simbolos])
+
+        p50 = median(duraciones)
+        self.stdout.write(
+            f"{filas:>6} {len(simbolos):>9} {len(simbolos) / p50:>9.0f} {p50 * 1000:>9.0f} "
+            f"{_percentil(duraciones, 95) * 1000:>9.0f} {median(llamadas):>14.0f} {http_con_cache:>15} {rechazos:>5}"
+        )
@@ -138,17 +138,123 @@ function crearGrafico(canvasId, labels, data, color, suffixY, useDayFormat) {
         options: buildChartOptions(theme, suffixY, useDayFormat || false),
     });
 }
+// Gráficos activos, por sección del endpoint de datos
+const GRAFICOS = {};
+
+/**
+ * @param {string} selector
+ * @param {string} texto
+ * @param {Element} [raiz]
+ */
+function setTexto(selector, texto, raiz) {
+    const el = (raiz || document).querySelector(selector);
+    if (el) el.textContent = texto;
+}
+
 /**
- * @param {number} segundos - Tiempo total de espera (por defecto 300)
+ * @param {{ riesgo, inflacion, inflacion_ia, uva }} indicadores - valores ya formateados por el servidor
  */
-function iniciarAutoRefresh(segundos) {
+function actualizarIndicadores(indicadores) {
+    Object.keys(indicadores).forEach(function (clave) {
+        const dato  = indicadores[clave];
+        const valor = document.querySelector('[data-indicador="' + clave + '"]');
+        if (valor) {
+            valor.textContent = dato.valor !== null ? dato.valor + (valor.dataset.sufijo || '') : '—';
+        }
+        setTexto('[data-indicador-fecha="' + clave + '"]', dato.fecha || 'Sin datos');
+    });
+}
+
+/**
+ * Actualiza las cards de una sección de monedas.
+ * @param {string} seccion - 'dolares' o 'cotizaciones'
+ * @param {Array<{clave, compra, venta, fecha}>} monedas - compra/venta ya formateadas por el servidor
+ * @returns {boolean} false si el HTML no tiene alguna de las cards (hay que recargar)
+ */
+function actualizarMonedas(seccion, monedas) {
+    const contenedor = document.querySelector('[data-seccion="' + seccion + '"]');
+    if (!contenedor) return monedas.length === 0;
+
+    return monedas.every(function (m) {
+        const card = contenedor.querySelector('[data-moneda="' + m.clave + '"]');
+        if (!card) return false;
+        setTexto('.currency-buy',  m.compra !== null ? '$' + m.compra : '—', card);
+        setTexto('.currency-sell', m.venta  !== null ? '$' + m.venta  : '—', card);
+        const fecha = card.querySelector('.currency-updated');
+        if (fecha && m.fecha) {
+            // La fecha viene del proveedor: va como texto, igual que en el template
+            const icono = document.createElement('i');
+            icono.className = 'bi bi-clock';
+            fecha.replaceChildren(icono, document.createTextNode(' ' + m.fecha));
+        }
+        return true;
+    });
+}
+
+/**
+ * @param {string} seccion
+ * @param {{ labels: string[], valores: number[] }} serie
+ */
+function actualizarGrafico(seccion, serie) {
+    const grafico = GRAFICOS[seccion];
+    if (!grafico) return;
+    grafico.data.labels = serie.labels;
+    grafico.data.datasets[0].data = serie.valores;
+    grafico.update('none');
+}
+
+/**
+ * Pide al servidor solo las secciones que cambiaron desde la última versión.
+ * Un 304 significa que no hay nada nuevo.
+ * @param {{ urlDatos: string, version: string }} estado
+ */
+async function refrescarDatos(estado) {
+    try {
+        const response = await fetch(estado.urlDatos, {
+            headers: { 'If-None-Match': estado.version, 'Accept': 'application/json' },
+            cache: 'no-store',
+        });
+        if (response.status === 304) return;
+        if (!response.ok) throw new Error('HTTP ' + response.status);
+
+        const resultado = await response.json();
+        const secciones = resultado.secciones;
+        let completo = true;
+
+        if (secciones.indicadores) actualizarIndicadores(secciones.indicadores);
+        if (secciones.dolares) completo = actualizarMonedas('dolares', secciones.dolares) && completo;
+        if (secciones.cotizaciones) completo = actualizarMonedas('cotizaciones', secciones.cotizaciones) && completo;
+        ['inflacion', 'inflacion_ia', 'uva', 'riesgo_pais'].forEach(function (s) {
+            if (secciones[s]) actualizarGrafico(s, secciones[s]);
+        });
+
+        // Apareció una moneda que la página no tiene: única situación que requiere recargar
+        if (!completo) {
+            location.reload();
+            return;
+        }
+        estado.version = resultado.version;
+    } catch (error) {
+        console.error('[cotizaciones] Error al refrescar datos:', error);
+    }
+}
+
+/**
+ * @param {{ urlDatos: string, version: string }} estado
+ * @param {number} segundos - Tiempo entre refrescos (por defecto 300)
+ */
+function iniciarAutoRefresh(estado, segundos) {
     segundos = segundos || 300;
+    let restantes = segundos;
     const el = document.getElementById('countdown-seconds');
 
     setInterval(function () {
-        segundos--;
-        if (el) el.textContent = segundos;
-        if (segundos <= 0) location.reload();
+        restantes--;
+        if (restantes <= 0) {
+            restantes = segundos;
+            refrescarDatos(estado);
+        }
+        if (el) el.textContent = restantes;
     }, 1000);
 }
 
@@ -160,10 +266,14 @@ document.addEventListener('DOMContentLoaded', function () {
         return;
     }
 
-    crearGrafico('chart-inflacion',    d.inflLabels,    d.inflValores,   'rgb(255, 193, 7)',  '%', false);
-    crearGrafico('chart-inflacion-ia', d.inflIaLabels,  d.inflIaValores, 'rgb(253, 126, 20)', '%', false);
-    crearGrafico('chart-uva',          d.uvaLabels,     d.uvaValores,    'rgb(140, 79, 159)', '',  true);
-    crearGrafico('chart-riesgo',       d.riesgoLabels,  d.riesgoValores, 'rgb(220, 53, 69)',  '',  true);
+    GRAFICOS.inflacion    = crearGrafico('chart-inflacion',    d.inflLabels,    d.inflValores,   'rgb(255, 193, 7)',  '%', false);
+    GRAFICOS.inflacion_ia = crearGrafico('chart-inflacion-ia', d.inflIaLabels,  d.inflIaValores, 'rgb(253, 126, 20)', '%', false);
+    GRAFICOS.uva          = crearGrafico('chart-uva',          d.uvaLabels,     d.uvaValores,    'rgb(140, 79, 159)', '',  true);
+    GRAFICOS.riesgo_pais  = crearGrafico('chart-riesgo',       d.riesgoLabels,  d.riesgoValores, 'rgb(220, 53, 69)',  '',  true);
+
+    const estado = { urlDatos: d.urlDatos, version: d.version };
+    const boton = document.getElementById('btn-refresh');
+    if (boton) boton.addEventListener('click', function () { refrescarDatos(estado); });
 
-    iniciarAutoRefresh(300);
+    iniciarAutoRefresh(estado, 300);
 });
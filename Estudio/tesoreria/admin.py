@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Caja, Banco, MonedaExtranjera, ValorADepositar, ValorADepositarEmpresa, PlazoFijo, FCI, TituloON
+from .models import (
+    Caja, Banco, MonedaExtranjera, ValorADepositar, ValorADepositarEmpresa, PlazoFijo, FCI, TituloON,
+    SimboloNoEncontrado, LimitadorIOL, ActualizacionPrecios, PrecioTitulo, ResumenTesoreria,
+)
 
 @admin.register(Caja)
 class CajaAdmin(admin.ModelAdmin):
@@ -49,7 +52,8 @@ class TituloONAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'ticker', 'tipo', 'precio_manual', 'fecha',
                     'cuotapartes_actual', 'valor_cierre_pesos', 'valor_cierre_usd',
                     'saldo_pesos_actual', 'saldo_usd_actual')
-    list_filter = ('tipo', 'precio_manual', 'fecha')
+    list_filter = ('tipo', 'precio_manual', 'fecha', 'regla_valuacion')
+    readonly_fields = ('simbolo_pesos', 'simbolo_usd', 'regla_valuacion')
 
     # Campos que siempre son readonly (IOL los calcula automáticamente para
     # títulos normales). Para precio_manual=True se quitan del readonly en
@@ -94,3 +98,44 @@ class TituloONAdmin(admin.ModelAdmin):
             'classes': ('collapse',),
         }),
     )
+
+
+@admin.register(SimboloNoEncontrado)
+class SimboloNoEncontradoAdmin(admin.ModelAdmin):
+    list_display = ('simbolo', 'intentos', 'proximo_reintento', 'ultimo_error', 'actualizado')
+    search_fields = ('simbolo',)
+
+
+@admin.register(LimitadorIOL)
+class LimitadorIOLAdmin(admin.ModelAdmin):
+    list_display = ('host', 'tat_us', 'pausa_hasta_us')
+
+
+@admin.register(ActualizacionPrecios)
+class ActualizacionPreciosAdmin(admin.ModelAdmin):
+    list_display = ('creada', 'estado', 'forzar', 'simbolos_hechos', 'simbolos_total',
+                    'simbolos_con_error', 'iniciada', 'terminada')
+    list_filter = ('estado',)
+    readonly_fields = ('creada',)
+
+
+@admin.register(PrecioTitulo)
+class PrecioTituloAdmin(admin.ModelAdmin):
+    list_display = ('titulo', 'fecha', 'fuente', 'valor_cierre_pesos', 'valor_cierre_usd',
+                    'saldo_pesos', 'saldo_usd', 'registrado')
+    list_filter = ('fuente', 'fecha')
+    search_fields = ('titulo__nombre', 'titulo__ticker')
+    list_select_related = ('titulo',)
+    date_hierarchy = 'fecha'
+
+
+@admin.register(ResumenTesoreria)
+class ResumenTesoreriaAdmin(admin.ModelAdmin):
+    list_display = ('actualizado', 'total_caja', 'total_bancos_cc', 'total_me', 'total_vad',
+                    'total_pf', 'total_fci', 'total_titulos_pesos')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
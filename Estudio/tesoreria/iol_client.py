@@ -1,25 +1,289 @@
+import asyncio
+import logging
+import math
+import os
 import time
 import threading
 import requests
-from urllib.parse import quote
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, time as dtime, timedelta
+from email.utils import parsedate_to_datetime
+from statistics import median
+from urllib.parse import quote, urlsplit
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from Estudio.sesion_http import CONNECT_TIMEOUT, READ_TIMEOUT, TIMEOUT, crear_sesion
+
+from .models import LimitadorIOL, SimboloNoEncontrado
+
+logger = logging.getLogger(__name__)
 
-BASE_URL = settings.IOL_BASE_URL
 MAX_WORKERS = getattr(settings, 'IOL_MAX_WORKERS', 10)
+LIMITE_POR_SEGUNDO = getattr(settings, 'IOL_LIMITE_POR_SEGUNDO', 10)
+RAFAGA = getattr(settings, 'IOL_RAFAGA', 20)
+
+# Tokens compartidos entre requests y workers a través de la cache (una
+# entrada por host, para que un servidor de prueba no pise los reales)
+CACHE_CLAVE_TOKENS = "iol:tokens:{host}"
+CACHE_CLAVE_LOCK = "iol:tokens:{host}:lock"
+MARGEN_EXPIRACION = 90        # segundos antes del vencimiento en que un token se da por vencido
+REFRESH_DURACION_DEFAULT = 30 * 60  # si IOL no informa '.refreshexpires'
+LOCK_DURACION = 30            # tope de vida del lock si el worker que lo tiene muere
+LOCK_ESPERA = 10              # segundos máximos esperando a que otro worker renueve
+LOCK_INTERVALO = 0.1
+
+REINTENTOS_429 = 2
+RETRY_AFTER_DEFAULT = 5   # segundos, si el 429 no trae Retry-After
+RETRY_AFTER_MAXIMO = 60
+
+PRESUPUESTO_LOTE = 45  # segundos para todo el lote, por debajo del timeout de gunicorn (60 s)
+
+# Paneles de cotizaciones de IOL que cubren los títulos de la cartera: una
+# llamada trae todos los bonos (u ONs) del panel.
+PANELES = ("bonos", "obligacionesNegociables")
+
+# Campos de una cotización de IOL (por símbolo o de panel) que se toman como
+# cierre, en orden de preferencia.
+CAMPOS_CIERRE = ("ultimoCierre", "ultimoPrecio", "cierreAnterior")
+
+# Cache de cierres por símbolo. Con el mercado abierto el precio se mueve y
+# vence rápido; cerrado, el último cierre vale hasta la próxima apertura.
+TZ_AR = ZoneInfo("America/Argentina/Buenos_Aires")
+BYMA_APERTURA = dtime(11, 0)
+BYMA_CIERRE = dtime(17, 0)
+TTL_MERCADO_ABIERTO = 60
+CACHE_PREFIJO_CIERRE = "iol:cierre:"
+
+# Espera antes de volver a consultar un símbolo que dio 404: se duplica con
+# cada 404 seguido, hasta el máximo.
+REINTENTO_NO_ENCONTRADO_BASE = timedelta(hours=6)
+REINTENTO_NO_ENCONTRADO_MAXIMO = timedelta(days=30)
+
+
+def mercado_abierto(ahora: datetime = None) -> bool:
+    """True en el horario de negociación de BYMA (días hábiles de 11 a 17 hs, hora argentina)."""
+    ahora = (ahora or datetime.now(TZ_AR)).astimezone(TZ_AR)
+    return ahora.weekday() < 5 and BYMA_APERTURA <= ahora.time() < BYMA_CIERRE
+
+
+def ttl_cotizacion(ahora: datetime = None) -> int:
+    """
+    Segundos de validez de un cierre consultado `ahora`: TTL_MERCADO_ABIERTO
+    durante la rueda; si no, hasta la próxima apertura. No contempla feriados:
+    en un feriado el cierre se vuelve a consultar una vez, a las 11 hs.
+    """
+    ahora = (ahora or datetime.now(TZ_AR)).astimezone(TZ_AR)
+    if mercado_abierto(ahora):
+        return TTL_MERCADO_ABIERTO
+    apertura = datetime.combine(ahora.date(), BYMA_APERTURA, tzinfo=TZ_AR)
+    if ahora >= apertura:
+        apertura += timedelta(days=1)
+    while apertura.weekday() >= 5:
+        apertura += timedelta(days=1)
+    return max(int((apertura - ahora).total_seconds()), TTL_MERCADO_ABIERTO)
+
+
+# Sesión compartida por todos los IOLClient del proceso: una conexión
+# keep-alive por worker en lugar de una conexión TLS nueva por símbolo.
+_sesion = crear_sesion(MAX_WORKERS)
+
+
+class ErrorHTTPIOL(RuntimeError):
+    """Respuesta de IOL con un código distinto de 200."""
+
+    def __init__(self, status_code: int, url: str = ""):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.url = url
+
+
+def _ahora_us() -> int:
+    return time.time_ns() // 1000
+
+
+class LimitadorCompartido:
+    """
+    Token bucket para el tráfico hacia IOL, compartido entre procesos a través
+    de la base (GCRA: LimitadorIOL guarda el instante teórico de la próxima
+    llamada).
+
+    Permite ráfagas de `rafaga` llamadas y luego `tasa` por segundo. Quien
+    excede el cupo no falla: reserva el próximo turno y espera. Un 429 pausa
+    a todos los workers durante lo que indique `Retry-After`.
+    """
+
+    def __init__(self, host: str, tasa: float = LIMITE_POR_SEGUNDO, rafaga: int = RAFAGA):
+        self.host = host
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self.intervalo = 1 / tasa
+        self._intervalo_us = round(self.intervalo * 1_000_000)
+
+    def _fila(self) -> dict:
+        fila = LimitadorIOL.objects.filter(host=self.host).values("tat_us", "pausa_hasta_us").first()
+        if fila is None:
+            LimitadorIOL.objects.get_or_create(host=self.host)
+            fila = {"tat_us": 0, "pausa_hasta_us": 0}
+        return fila
+
+    def reservar(self, hasta: float = None):
+        """
+        Reserva un turno y devuelve cuántos segundos hay que esperar para usarlo.
+
+        La reserva es un compare-and-set sobre la fila del host: el UPDATE solo
+        avanza el TAT si nadie lo movió desde la lectura; si otro worker ganó,
+        se relee y se reintenta. Con `hasta` (epoch) no se reserva un turno
+        posterior: devuelve None sin consumir cupo.
+        """
+        while True:
+            fila = self._fila()
+            ahora = _ahora_us()
+            inicio = max(ahora, fila["pausa_hasta_us"])
+            tat = max(fila["tat_us"], inicio)
+            permitido_en = max(tat - (self.rafaga - 1) * self._intervalo_us, inicio)
+            if hasta is not None and permitido_en > hasta * 1_000_000:
+                return None
+            reservado = (
+                LimitadorIOL.objects
+                .filter(host=self.host, tat_us=fila["tat_us"])
+                .update(tat_us=tat + self._intervalo_us)
+            )
+            if reservado:
+                return max(permitido_en - ahora, 0) / 1_000_000
+
+    def esperar_turno(self, deadline: float = None):
+        """
+        Reserva un turno y lo espera. Con `deadline` (monotonic) la espera
+        admitida depende del lugar en la cola: si el turno cae después, no se
+        reserva y se levanta requests.exceptions.Timeout.
+        """
+        hasta = None if deadline is None else time.time() + deadline - time.monotonic()
+        espera = self.reservar(hasta)
+        if espera is None:
+            raise requests.exceptions.Timeout("sin turno en el limitador antes del deadline")
+        if espera > 0:
+            logger.debug("Limitador IOL: esperando %.2fs por cupo", espera)
+            time.sleep(espera)
+
+    def pausar(self, segundos: float):
+        """Frena todo el tráfico `segundos` (p. ej. por un Retry-After)."""
+        hasta = _ahora_us() + round(segundos * 1_000_000)
+        self._fila()
+        LimitadorIOL.objects.filter(host=self.host, pausa_hasta_us__lt=hasta).update(pausa_hasta_us=hasta)
+
+    def estado(self) -> dict:
+        """Cupo actual: llamadas disponibles sin esperar y pausa vigente, si hay."""
+        fila = self._fila()
+        ahora = _ahora_us() / 1_000_000
+        pausa_hasta = fila["pausa_hasta_us"] / 1_000_000
+        tat = max(fila["tat_us"] / 1_000_000, ahora)
+        disponibles = math.floor((ahora + self.rafaga * self.intervalo - tat) / self.intervalo)
+        return {
+            "disponibles": 0 if pausa_hasta > ahora else max(min(disponibles, self.rafaga), 0),
+            "rafaga": self.rafaga,
+            "por_segundo": self.tasa,
+            "pausado_por": round(max(pausa_hasta - ahora, 0), 1),
+        }
+
+
+def _segundos_retry_after(valor) -> float:
+    """Retry-After en segundos o como fecha HTTP; acotado a RETRY_AFTER_MAXIMO."""
+    if not valor:
+        return RETRY_AFTER_DEFAULT
+    try:
+        segundos = float(valor)
+    except ValueError:
+        try:
+            segundos = parsedate_to_datetime(valor).timestamp() - time.time()
+        except (TypeError, ValueError):
+            segundos = RETRY_AFTER_DEFAULT
+    return min(max(segundos, 0), RETRY_AFTER_MAXIMO)
+
+
+def _timeout_hasta(deadline: float = None):
+    """TIMEOUT de requests recortado a lo que falta hasta `deadline` (monotonic)."""
+    if deadline is None:
+        return TIMEOUT
+    restante = deadline - time.monotonic()
+    if restante <= 0:
+        raise requests.exceptions.Timeout("deadline vencido antes de enviar la consulta")
+    return (min(CONNECT_TIMEOUT, restante), min(READ_TIMEOUT, restante))
+
+
+def _vencimiento(data: dict, campo: str, default: float) -> float:
+    """Epoch de vencimiento a partir de '.expires'/'.refreshexpires' (RFC 1123)."""
+    try:
+        return parsedate_to_datetime(data[campo]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time() + default
+
+
+def _vigente(tokens, rechazado=None) -> bool:
+    return bool(
+        tokens
+        and tokens["access_token"] != rechazado
+        and time.time() < tokens["expira_en"]
+    )
+
 
 class IOLClient:
-    def __init__(self):
+    """
+    Cliente de la API de IOL.
+
+    El access token y el refresh token viven en la cache compartida con sus
+    vencimientos, así que todas las requests y workers usan el mismo par. La
+    renovación se hace bajo un lock en la cache: un solo worker renueva y el
+    resto espera el token nuevo. El login con usuario y contraseña solo se
+    hace cuando no hay refresh token vigente.
+
+    Todas las llamadas pasan por un LimitadorCompartido por host, así que
+    el conjunto de workers respeta el cupo de IOL.
+
+    `base_url` permite apuntar a otro servidor (por ejemplo el de
+    `iol_stub`); por defecto es settings.IOL_BASE_URL.
+    """
+
+    def __init__(self, base_url: str = None):
+        self.base_url = (base_url or settings.IOL_BASE_URL).rstrip("/")
         self.usuario = settings.IOL_USUARIO
         self.password = settings.IOL_PASSWORD
-        self.access_token = None
-        self.refresh_token = None
-        self.token_expira_en = 0
+        host = urlsplit(self.base_url).netloc
+        self._clave_tokens = CACHE_CLAVE_TOKENS.format(host=host)
+        self._clave_lock = CACHE_CLAVE_LOCK.format(host=host)
+        self.limitador = LimitadorCompartido(host)
+        self._tokens = None
         self._lock = threading.Lock()
 
+    @property
+    def access_token(self):
+        return self._tokens["access_token"] if self._tokens else None
+
+    def _pedir(self, metodo: str, url: str, deadline: float = None, **kwargs):
+        """
+        Request con turno en el limitador; ante un 429 pausa a todos y reintenta.
+
+        Con `deadline` (time.monotonic) la espera de turno y los timeouts de
+        cada intento se recortan para que el hilo termine a tiempo: si no
+        alcanza, se levanta requests.exceptions.Timeout.
+        """
+        for intento in range(REINTENTOS_429 + 1):
+            self.limitador.esperar_turno(deadline)
+            resp = _sesion.request(metodo, url, timeout=_timeout_hasta(deadline), **kwargs)
+            if resp.status_code != 429 or intento == REINTENTOS_429:
+                return resp
+            espera = _segundos_retry_after(resp.headers.get("Retry-After"))
+            logger.warning("IOL respondió 429: se pausa el tráfico %.1fs", espera)
+            self.limitador.pausar(espera)
+        return resp
+
     def login(self):
-        resp = requests.post(
-            f"{BASE_URL}/token",
+        resp = self._pedir(
+            "POST",
+            f"{self.base_url}/token",
             data={
                 "username": self.usuario,
                 "password": self.password,
@@ -33,11 +297,12 @@ class IOLClient:
             )
         self._guardar_tokens(resp.json())
 
-    def _renovar(self):
-        resp = requests.post(
-            f"{BASE_URL}/token",
+    def _renovar(self, refresh_token: str):
+        resp = self._pedir(
+            "POST",
+            f"{self.base_url}/token",
             data={
-                "refresh_token": self.refresh_token,
+                "refresh_token": refresh_token,
                 "grant_type": "refresh_token",
             },
             headers={"Content-Type": "application/x-www-form-urlencoded"},
@@ -45,60 +310,321 @@ class IOLClient:
         if resp.status_code == 200:
             self._guardar_tokens(resp.json())
         else:
+            logger.warning("Renovación de token IOL rechazada (HTTP %s): login con contraseña", resp.status_code)
             self.login()
 
     def _guardar_tokens(self, data: dict):
-        self.access_token = data["access_token"]
-        self.refresh_token = data["refresh_token"]
-        self.token_expira_en = time.time() + data.get("expires_in", 1200) - 90
+        ahora = time.time()
+        tokens = {
+            "access_token": data["access_token"],
+            "refresh_token": data["refresh_token"],
+            "expira_en": _vencimiento(data, ".expires", data.get("expires_in", 1200)) - MARGEN_EXPIRACION,
+            "refresh_expira_en": _vencimiento(data, ".refreshexpires", REFRESH_DURACION_DEFAULT) - MARGEN_EXPIRACION,
+        }
+        cache.set(self._clave_tokens, tokens, timeout=max(int(tokens["refresh_expira_en"] - ahora), 1))
+        self._tokens = tokens
 
-    def _headers(self) -> dict:
-        with self._lock:
-            if self.access_token is None:
+    def _conseguir_tokens(self, rechazado=None):
+        """Renueva (o hace login) bajo el lock compartido, salvo que otro worker ya lo haya hecho."""
+        inicio = time.monotonic()
+        tengo_lock = cache.add(self._clave_lock, os.getpid(), timeout=LOCK_DURACION)
+        while not tengo_lock:
+            tokens = cache.get(self._clave_tokens)
+            if _vigente(tokens, rechazado):
+                self._tokens = tokens
+                return
+            if time.monotonic() - inicio >= LOCK_ESPERA:
+                logger.warning("Timeout esperando la renovación del token IOL de otro worker")
+                break
+            time.sleep(LOCK_INTERVALO)
+            tengo_lock = cache.add(self._clave_lock, os.getpid(), timeout=LOCK_DURACION)
+        try:
+            tokens = cache.get(self._clave_tokens)
+            if _vigente(tokens, rechazado):
+                self._tokens = tokens
+            elif tokens and time.time() < tokens["refresh_expira_en"]:
+                self._renovar(tokens["refresh_token"])
+            else:
                 self.login()
-            elif time.time() >= self.token_expira_en:
-                self._renovar()
-        return {"Authorization": f"Bearer {self.access_token}"}
+        finally:
+            if tengo_lock:
+                cache.delete(self._clave_lock)
 
-    def get(self, url: str):
-        resp = requests.get(url, headers=self._headers())
+    def _headers(self, rechazado=None) -> dict:
+        with self._lock:
+            if not _vigente(self._tokens, rechazado):
+                tokens = cache.get(self._clave_tokens)
+                if _vigente(tokens, rechazado):
+                    self._tokens = tokens
+                else:
+                    self._conseguir_tokens(rechazado)
+            return {"Authorization": f"Bearer {self.access_token}"}
+
+    def get(self, url: str, deadline: float = None):
+        headers = self._headers()
+        resp = self._pedir("GET", url, deadline=deadline, headers=headers)
         if resp.status_code == 401:
-            with self._lock:
-                self.login()
-            resp = requests.get(url, headers=self._headers())
+            # El token fue revocado: se descarta aunque no haya vencido
+            rechazado = headers["Authorization"].removeprefix("Bearer ")
+            resp = self._pedir("GET", url, deadline=deadline, headers=self._headers(rechazado=rechazado))
         if resp.status_code != 200:
-            raise RuntimeError(f"HTTP {resp.status_code}")
+            raise ErrorHTTPIOL(resp.status_code, url)
         return resp.json()
 
 
-def consultar_titulo(iol: IOLClient, simbolo: str) -> dict:
+def _cierre_de(cotizacion: dict):
+    """Primer campo de CAMPOS_CIERRE presente en `cotizacion`, o None."""
+    return next((cotizacion[c] for c in CAMPOS_CIERRE if cotizacion.get(c) is not None), None)
+
+
+def consultar_titulo(iol: IOLClient, simbolo: str, deadline: float = None) -> dict:
+    inicio = time.perf_counter()
     try:
         d = iol.get(
-            f"{BASE_URL}/api/v2/bCBA/Titulos/{quote(simbolo)}/Cotizacion"
+            f"{iol.base_url}/api/v2/bCBA/Titulos/{quote(simbolo)}/Cotizacion",
+            deadline=deadline,
         )
-        cierre = d.get("ultimoCierre", d.get("cierreAnterior", None))
-        return {"simbolo": simbolo, "ok": True, "cierre": cierre, "error": None}
+        resultado = {"simbolo": simbolo, "ok": True, "cierre": _cierre_de(d), "error": None}
+    except requests.exceptions.Timeout:
+        resultado = {"simbolo": simbolo, "ok": False, "cierre": None, "error": "timeout"}
     except Exception as e:
-        return {
+        # Solo un 404 del endpoint del símbolo lo marca como inexistente
+        no_encontrado = isinstance(e, ErrorHTTPIOL) and e.status_code == 404
+        resultado = {
             "simbolo": simbolo,
             "ok": False,
             "cierre": None,
-            "error": "no encontrado (404)" if "404" in str(e) else str(e),
+            "error": "no encontrado (404)" if no_encontrado else str(e),
+            "no_encontrado": no_encontrado,
         }
+    resultado["latencia_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    logger.debug("IOL %s: %s ms (%s)", simbolo, resultado["latencia_ms"], "ok" if resultado["ok"] else resultado["error"])
+    return resultado
+
+
+# Pool global del proceso: acota la concurrencia hacia IOL aunque haya varias
+# actualizaciones en curso, y evita crear un pool por llamada.
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="iol")
+
+
+def _en_hilo(funcion, *args):
+    """
+    Corre `funcion` en un hilo del executor. El limitador usa la base: al
+    empezar y al terminar se cierra la conexión del hilo si venció, como en una request.
+    """
+    close_old_connections()
+    try:
+        return funcion(*args)
+    finally:
+        close_old_connections()
+
+
+def _sin_cierre(simbolo: str, error: str, latencia_ms: float) -> dict:
+    return {"simbolo": simbolo, "ok": False, "cierre": None, "error": error, "latencia_ms": latencia_ms}
+
+
+def _sin_avance(cantidad: int, fallidos: int = 0):
+    pass
+
+
+async def _consultar_lote(iol: IOLClient, simbolos: list, presupuesto: float, al_avanzar=_sin_avance) -> list:
+    """
+    Consulta los símbolos con a lo sumo MAX_WORKERS en vuelo (semáforo).
 
+    El fin del presupuesto viaja como deadline hasta IOLClient._pedir: la
+    espera de turno se admite según el lugar en la cola del limitador y los
+    timeouts de requests se recortan, así que el hilo termina solo y el
+    semáforo se libera recién entonces: nunca hay más consultas en vuelo que
+    hilos en el executor. Al agotarse el
+    presupuesto se cancelan las que siguen esperando turno, que no llegan a
+    salir a la red. `al_avanzar(1, fallidos)` se llama (en el hilo del loop)
+    cada vez que termina un símbolo.
+    """
+    loop = asyncio.get_running_loop()
+    semaforo = asyncio.Semaphore(MAX_WORKERS)
+    fin = time.monotonic() + presupuesto
 
-def consultar_titulos_paralelo(iol: IOLClient, simbolos: list) -> dict:
-    resultados = {}
+    async def _consultar(simbolo):
+        async with semaforo:
+            resultado = await loop.run_in_executor(_executor, _en_hilo, consultar_titulo, iol, simbolo, fin)
+        al_avanzar(1, 0 if resultado["ok"] else 1)
+        return resultado
+
+    tareas = {asyncio.create_task(_consultar(s)): s for s in simbolos}
+    if not tareas:
+        return []
+    terminadas, pendientes = await asyncio.wait(tareas, timeout=presupuesto)
+    for tarea in pendientes:
+        tarea.cancel()
+    await asyncio.gather(*pendientes, return_exceptions=True)
+    if pendientes:
+        logger.warning(
+            "IOL: presupuesto de %.1fs agotado, %s de %s símbolos sin consultar",
+            presupuesto, len(pendientes), len(tareas),
+        )
+    return [t.result() for t in terminadas] + [
+        _sin_cierre(tareas[t], "sin respuesta dentro del tiempo máximo", presupuesto * 1000)
+        for t in pendientes
+    ]
+
+
+def _resumir(resultados: list, **extra) -> dict:
+    cierres = {}
     errores = []
-    workers = min(MAX_WORKERS, len(simbolos)) if simbolos else 1
-
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futuros = {executor.submit(consultar_titulo, iol, s): s for s in simbolos}
-        for futuro in as_completed(futuros):
-            r = futuro.result()
-            if r["ok"] and r["cierre"] is not None:
-                resultados[r["simbolo"]] = r["cierre"]
-            else:
-                errores.append(f"{r['simbolo']}: {r['error']}")
+    latencias = {}
+    for r in resultados:
+        latencias[r["simbolo"]] = r["latencia_ms"]
+        if r["ok"] and r["cierre"] is not None:
+            cierres[r["simbolo"]] = r["cierre"]
+        else:
+            errores.append(f"{r['simbolo']}: {r['error']}")
+
+    if latencias:
+        logger.info(
+            "IOL: %s símbolos consultados, latencia mediana %s ms, máxima %s ms (%s)",
+            len(latencias), round(median(latencias.values()), 1),
+            max(latencias.values()), max(latencias, key=latencias.get),
+        )
+    return {"cierres": cierres, "errores": errores, "latencias": latencias, **extra}
+
+
+def consultar_titulos_paralelo(iol: IOLClient, simbolos: list, presupuesto: float = PRESUPUESTO_LOTE) -> dict:
+    return _resumir(asyncio.run(_consultar_lote(iol, simbolos, presupuesto)))
+
+
+def consultar_panel(iol: IOLClient, instrumento: str, deadline: float = None) -> dict:
+    """Cierres de todo un panel de IOL indexados por símbolo."""
+    d = iol.get(f"{iol.base_url}/api/v2/Cotizaciones/{instrumento}/todos/argentina", deadline=deadline)
+    panel = {}
+    for item in d.get("titulos") or []:
+        simbolo = (item.get("simbolo") or "").upper()
+        cierre = _cierre_de(item)
+        if simbolo and cierre is not None:
+            panel[simbolo] = cierre
+    return panel
+
+
+async def _consultar_paneles(iol: IOLClient, presupuesto: float) -> tuple:
+    """Descarga los PANELES en paralelo. Devuelve (índice simbolo->cierre, latencia en ms)."""
+    loop = asyncio.get_running_loop()
+    inicio = time.perf_counter()
+    deadline = time.monotonic() + presupuesto
+    respuestas = await asyncio.gather(
+        *(loop.run_in_executor(_executor, _en_hilo, consultar_panel, iol, instrumento, deadline) for instrumento in PANELES),
+        return_exceptions=True,
+    )
+    indice = {}
+    for instrumento, respuesta in zip(PANELES, respuestas):
+        if isinstance(respuesta, BaseException):
+            logger.warning("IOL: no se pudo obtener el panel %s (%s)", instrumento, respuesta or "timeout")
+        else:
+            indice.update(respuesta)
+    return indice, round((time.perf_counter() - inicio) * 1000, 1)
+
+
+async def _consultar_con_paneles(iol: IOLClient, simbolos: list, presupuesto: float, al_avanzar=_sin_avance) -> tuple:
+    inicio = time.monotonic()
+    indice, latencia_panel = await _consultar_paneles(iol, presupuesto)
+    resultados = [
+        {"simbolo": s, "ok": True, "cierre": indice[s], "error": None, "latencia_ms": latencia_panel}
+        for s in simbolos if s in indice
+    ]
+    al_avanzar(len(resultados))
+    faltantes = [s for s in simbolos if s not in indice]
+    restante = max(presupuesto - (time.monotonic() - inicio), 0)
+    resultados += await _consultar_lote(iol, faltantes, restante, al_avanzar)
+    return resultados, len(simbolos) - len(faltantes)
+
+
+def simbolos_descartados(simbolos) -> set:
+    """Símbolos de `simbolos` que dieron 404 y todavía no deben reintentarse."""
+    return set(
+        SimboloNoEncontrado.objects
+        .filter(simbolo__in=list(simbolos), proximo_reintento__gt=timezone.now())
+        .values_list("simbolo", flat=True)
+    )
+
+
+def _registrar_no_encontrados(resultados: list):
+    """Actualiza la cache negativa: agrega o posterga los 404 y libera los que volvieron a cotizar."""
+    encontrados = [r["simbolo"] for r in resultados if r["ok"]]
+    errores = {r["simbolo"]: r["error"] for r in resultados if r.get("no_encontrado")}
+    if encontrados:
+        SimboloNoEncontrado.objects.filter(simbolo__in=encontrados).delete()
+    if not errores:
+        return
+
+    ahora = timezone.now()
+    existentes = {s.simbolo: s for s in SimboloNoEncontrado.objects.filter(simbolo__in=list(errores))}
+    nuevos = []
+    for simbolo, error in errores.items():
+        registro = existentes.get(simbolo) or SimboloNoEncontrado(simbolo=simbolo, intentos=0)
+        registro.intentos += 1
+        registro.ultimo_error = error[:200]
+        espera = min(
+            REINTENTO_NO_ENCONTRADO_BASE * 2 ** (registro.intentos - 1),
+            REINTENTO_NO_ENCONTRADO_MAXIMO,
+        )
+        registro.proximo_reintento = ahora + espera
+        registro.actualizado = ahora
+        if registro.pk is None:
+            nuevos.append(registro)
+    SimboloNoEncontrado.objects.bulk_create(nuevos)
+    SimboloNoEncontrado.objects.bulk_update(
+        existentes.values(), ["intentos", "ultimo_error", "proximo_reintento", "actualizado"],
+    )
+    logger.info("IOL: %s símbolos no encontrados, se reintentarán más adelante: %s", len(errores), ", ".join(sorted(errores)))
+
+
+def consultar_titulos(iol: IOLClient, simbolos: list, presupuesto: float = PRESUPUESTO_LOTE,
+                      forzar: bool = False, progreso=None) -> dict:
+    """
+    Cierres de `simbolos` en pocas llamadas.
+
+    Los símbolos con un cierre en cache (ver ttl_cotizacion) no se consultan,
+    salvo con `forzar`. Para el resto se bajan primero los PANELES completos
+    de IOL, indexados en memoria; el endpoint por símbolo queda solo para los
+    que no aparecen en ningún panel. Los 404 se registran en
+    SimboloNoEncontrado (ver simbolos_descartados).
+
+    `progreso(hechos, total, con_error)`, si se indica, se llama a medida que
+    se resuelven símbolos. Corre dentro del loop de asyncio: tiene que ser
+    barato y no puede usar el ORM.
+    """
+    hechos = con_error = 0
+
+    def _avanzar(cantidad, fallidos=0):
+        nonlocal hechos, con_error
+        hechos += cantidad
+        con_error += fallidos
+        if progreso and cantidad:
+            progreso(hechos, len(simbolos), con_error)
+
+    cacheados = {} if forzar else cache.get_many([CACHE_PREFIJO_CIERRE + s for s in simbolos])
+    resultados = [
+        {"simbolo": s, "ok": True, "cierre": cacheados[CACHE_PREFIJO_CIERRE + s], "error": None, "latencia_ms": 0}
+        for s in simbolos if CACHE_PREFIJO_CIERRE + s in cacheados
+    ]
+    _avanzar(len(resultados))
+    a_consultar = [s for s in simbolos if CACHE_PREFIJO_CIERRE + s not in cacheados]
+
+    desde_panel = 0
+    consultas_http = 0
+    if a_consultar:
+        consultados, desde_panel = asyncio.run(_consultar_con_paneles(iol, a_consultar, presupuesto, _avanzar))
+        consultas_http = len(PANELES) + len(a_consultar) - desde_panel
+        nuevos = {
+            CACHE_PREFIJO_CIERRE + r["simbolo"]: r["cierre"]
+            for r in consultados if r["ok"] and r["cierre"] is not None
+        }
+        if nuevos:
+            cache.set_many(nuevos, timeout=ttl_cotizacion())
+        _registrar_no_encontrados(consultados)
+        resultados += consultados
 
-    return {"cierres": resultados, "errores": errores}
\ No newline at end of file
+    return _resumir(
+        resultados,
+        desde_cache=len(resultados) - len(a_consultar),
+        desde_panel=desde_panel,
+        consultas_http=consultas_http,
+    )
@@ -0,0 +1,189 @@
+"""
+Servidor local que imita los endpoints de IOL que usa `iol_client`, para
+medir y probar la actualización de precios sin credenciales reales.
+
+Endpoints:
+- POST /token (grant_type password y refresh_token)
+- GET  /api/v2/bCBA/Titulos/{simbolo}/Cotizacion
+- GET  /api/v2/Cotizaciones/{instrumento}/todos/argentina
+
+Se levanta con el comando `iol_stub` o, desde código, con `iniciar_stub()`.
+"""
+import json
+import random
+import secrets
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+@dataclass
+class ConfiguracionStub:
+    latencia: float = 0.05        # segundos por respuesta
+    tasa_error: float = 0.0       # fracción de consultas que responden 500
+    tasa_404: float = 0.0         # fracción de símbolos inexistentes (siempre los mismos)
+    duracion_token: int = 1200    # segundos de vida del access token
+    duracion_refresh: int = 1800  # segundos de vida del refresh token
+    limite_por_segundo: int = 0   # por encima responde 429 con Retry-After (0: sin límite)
+    paneles: dict = field(default_factory=dict)  # instrumento -> símbolos publicados
+
+
+class ServidorStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, configuracion: ConfiguracionStub):
+        super().__init__(direccion, _Handler)
+        self.configuracion = configuracion
+        self.llamadas = Counter()
+        self.rechazadas_429 = 0
+        self._tokens = {}
+        self._refresh = {}
+        self._segundo_actual = 0
+        self._llamadas_en_segundo = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def handle_error(self, request, client_address):
+        # El cliente cortó la conexión (p. ej. por su deadline): no es un error del stub
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def reiniciar_contadores(self):
+        with self._lock:
+            self.llamadas.clear()
+            self.rechazadas_429 = 0
+
+    def contar(self, tipo):
+        with self._lock:
+            self.llamadas[tipo] += 1
+
+    def excede_limite(self):
+        limite = self.configuracion.limite_por_segundo
+        if not limite:
+            return False
+        with self._lock:
+            segundo = int(time.time())
+            if segundo != self._segundo_actual:
+                self._segundo_actual, self._llamadas_en_segundo = segundo, 0
+            self._llamadas_en_segundo += 1
+            if self._llamadas_en_segundo > limite:
+                self.rechazadas_429 += 1
+                return True
+            return False
+
+    def emitir_tokens(self):
+        ahora = time.time()
+        access, refresh = secrets.token_hex(16), secrets.token_hex(16)
+        with self._lock:
+            self._tokens[access] = ahora + self.configuracion.duracion_token
+            self._refresh[refresh] = ahora + self.configuracion.duracion_refresh
+        return {
+            "access_token": access,
+            "refresh_token": refresh,
+            "token_type": "bearer",
+            "expires_in": self.configuracion.duracion_token,
+            ".expires": formatdate(ahora + self.configuracion.duracion_token, usegmt=True),
+            ".refreshexpires": formatdate(ahora + self.configuracion.duracion_refresh, usegmt=True),
+        }
+
+    def token_valido(self, token):
+        with self._lock:
+            return self._tokens.get(token, 0) > time.time()
+
+    def consumir_refresh(self, refresh):
+        with self._lock:
+            return self._refresh.pop(refresh, 0) > time.time()
+
+
+def _inexistente(simbolo, tasa):
+    """Determinístico: el mismo símbolo es siempre válido o siempre 404."""
+    return zlib.crc32(simbolo.encode()) % 10_000 < tasa * 10_000
+
+
+def _cierre(simbolo):
+    return round(50 + zlib.crc32(simbolo.encode()) % 150_000 / 100, 2)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como la API real
+
+    def log_message(self, format, *args):
+        pass
+
+    def _responder(self, estado, cuerpo=None, headers=None):
+        datos = json.dumps(cuerpo if cuerpo is not None else {}).encode()
+        self.send_response(estado)
+        for nombre, valor in (headers or {}).items():
+            self.send_header(nombre, valor)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_POST(self):
+        servidor = self.server
+        largo = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(largo).decode())
+        grant = (form.get("grant_type") or [""])[0]
+        servidor.contar(f"token:{grant}")
+        time.sleep(servidor.configuracion.latencia)
+        if servidor.excede_limite():
+            return self._responder(429, {"message": "Too many requests"}, {"Retry-After": "1"})
+
+        if urlsplit(self.path).path != "/token":
+            return self._responder(404)
+        if grant == "refresh_token" and not servidor.consumir_refresh((form.get("refresh_token") or [""])[0]):
+            return self._responder(400, {"error": "invalid_grant"})
+        if grant not in ("password", "refresh_token"):
+            return self._responder(400, {"error": "unsupported_grant_type"})
+        self._responder(200, servidor.emitir_tokens())
+
+    def do_GET(self):
+        servidor = self.server
+        config = servidor.configuracion
+        partes = [unquote(p) for p in urlsplit(self.path).path.strip("/").split("/")]
+        es_titulo = len(partes) == 6 and partes[:3] == ["api", "v2", "bCBA"] and partes[5] == "Cotizacion"
+        es_panel = len(partes) == 6 and partes[:3] == ["api", "v2", "Cotizaciones"]
+        servidor.contar("cotizacion" if es_titulo else "panel" if es_panel else "otro")
+        time.sleep(config.latencia)
+        if servidor.excede_limite():
+            return self._responder(429, {"message": "Too many requests"}, {"Retry-After": "1"})
+
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not servidor.token_valido(token):
+            return self._responder(401, {"message": "Authorization has been denied for this request."})
+        if random.random() < config.tasa_error:
+            return self._responder(500, {"message": "Error simulado"})
+
+        if es_titulo:
+            simbolo = partes[4].upper()
+            if _inexistente(simbolo, config.tasa_404):
+                return self._responder(404, {"message": "No se encontró el título"})
+            cierre = _cierre(simbolo)
+            return self._responder(200, {"ultimoPrecio": cierre, "ultimoCierre": cierre, "cierreAnterior": cierre})
+        if es_panel:
+            simbolos = config.paneles.get(partes[3], ())
+            titulos = [
+                {"simbolo": s, "ultimoPrecio": _cierre(s), "cierreAnterior": _cierre(s)}
+                for s in simbolos if not _inexistente(s, config.tasa_404)
+            ]
+            return self._responder(200, {"titulos": titulos})
+        self._responder(404)
+
+
+def iniciar_stub(configuracion: ConfiguracionStub = None, host: str = "127.0.0.1", puerto: int = 0) -> ServidorStub:
+    """Levanta el servidor en un hilo daemon; `puerto=0` elige uno libre. Detener con `shutdown()`."""
+    servidor = ServidorStub((host, puerto), configuracion or ConfiguracionStub())
+    threading.Thread(target=servidor.serve_forever, name="iol-stub", daemon=True).start()
+    return servidor
@@ -0,0 +1,25 @@
+from decimal import Decimal
+
+from tesoreria.models import TituloON
+
+
+def titulos_benchmark(cantidad, prefijo="BM"):
+    """
+    TituloON sin guardar para los comandos de benchmark: mitad ONs (se
+    consultan base+O y base+D) y mitad bonos (base y base+D).
+
+    Returns:
+        (titulos, simbolos): los títulos y los símbolos de IOL que cubren.
+    """
+    titulos, simbolos = [], []
+    for i in range(cantidad):
+        if i % 2:
+            ticker = f"{prefijo}O{i:04d}"
+            titulos.append(TituloON(nombre=f"Bench ON {i}", ticker=ticker, tipo="ON", cuotapartes_actual=Decimal("1000")))
+        else:
+            ticker = f"{prefijo}B{i:04d}"
+            titulos.append(TituloON(nombre=f"Bench Bono {i}", ticker=ticker, tipo="Bono", cuotapartes_actual=Decimal("1000")))
+    for titulo in titulos:
+        titulo.resolver_simbolos()  # bulk_create no pasa por save()
+        simbolos += titulo.simbolos_iol
+    return titulos, simbolos
@@ -0,0 +1,69 @@
+import random
+import time
+from contextlib import nullcontext
+from decimal import Decimal
+from statistics import median
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from tesoreria.management.benchmark import titulos_benchmark
+from tesoreria.models import TituloON
+from tesoreria.services import CAMPOS_VALUACION, guardar_valuaciones, resumen_diferido, valuar_titulo
+
+
+def _valuar(titulos):
+    cierres = {s: round(random.uniform(50, 1500), 2) for t in titulos for s in t.simbolos_iol}
+    for titulo in titulos:
+        valuar_titulo(titulo, cierres, Decimal("1000"))
+
+
+def _guardar_por_fila(titulos):
+    """Guardado anterior a guardar_valuaciones: un save() por título."""
+    with resumen_diferido():
+        for titulo in titulos:
+            titulo.save(update_fields=CAMPOS_VALUACION)
+
+
+def _con_latencia(segundos):
+    """execute_wrapper que simula la ida y vuelta a una base remota en cada consulta."""
+    def envolver(execute, sql, params, many, context):
+        time.sleep(segundos)
+        return execute(sql, params, many, context)
+    return envolver
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la fase de guardado de la actualización de precios: save() por "
+        "título contra guardar_valuaciones (bulk_update en lotes). Los títulos "
+        "se crean dentro de una transacción que se revierte al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", default="100,1000", help="Cantidades de TituloON separadas por coma.")
+        parser.add_argument("--repeticiones", type=int, default=5, help="Mediciones por cantidad (default: 5).")
+        parser.add_argument(
+            "--latencia-ms", type=float, default=1.0,
+            help="Demora simulada por consulta, como la de una base por red (default: 1; 0 para no simular).",
+        )
+
+    def handle(self, *args, **options):
+        latencia = options["latencia_ms"] / 1000
+        self.stdout.write(f"{'filas':>6} {'modo':<12} {'p50 ms':>9} {'ms/fila':>9} {'consultas':>10}")
+        for filas in [int(f) for f in options["filas"].split(",") if f.strip()]:
+            with transaction.atomic():
+                titulos = TituloON.objects.bulk_create(titulos_benchmark(filas, prefijo="BG")[0])
+                for modo, guardar in (("save()", _guardar_por_fila), ("bulk_update", guardar_valuaciones)):
+                    duraciones, consultas = [], 0
+                    for _ in range(max(options["repeticiones"], 1)):
+                        _valuar(titulos)
+                        envoltura = connection.execute_wrapper(_con_latencia(latencia)) if latencia else nullcontext()
+                        with envoltura, CaptureQueriesContext(connection) as capturadas:
+                            inicio = time.perf_counter()
+                            guardar(titulos)
+                            duraciones.append(time.perf_counter() - inicio)
+                        consultas = len(capturadas)
+                    p50 = median(duraciones) * 1000
+                    self.stdout.write(f"{filas:>6} {modo:<12} {p50:>9.1f} {p50 / filas:>9.3f} {consultas:>10}")
+                transaction.set_rollback(True)
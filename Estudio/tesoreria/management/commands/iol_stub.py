@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+
+from tesoreria.iol_stub import ConfiguracionStub, iniciar_stub
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta un servidor local que imita los endpoints de token y cotizaciones "
+        "de IOL, con latencia, errores, 404 y vencimiento de tokens configurables. "
+        "Para usarlo desde la app: IOL_BASE_URL apuntando a la URL que informa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--puerto", type=int, default=8765)
+        parser.add_argument("--latencia-ms", type=float, default=50, help="Demora por respuesta (default: 50).")
+        parser.add_argument("--tasa-error", type=float, default=0.0, help="Fracción de respuestas 500 (0-1).")
+        parser.add_argument("--tasa-404", type=float, default=0.0, help="Fracción de símbolos inexistentes (0-1).")
+        parser.add_argument("--duracion-token", type=int, default=1200, help="Vida del access token en segundos.")
+        parser.add_argument("--duracion-refresh", type=int, default=1800, help="Vida del refresh token en segundos.")
+        parser.add_argument(
+            "--limite-por-segundo", type=int, default=0,
+            help="Llamadas por segundo antes de responder 429 con Retry-After (0: sin límite).",
+        )
+
+    def handle(self, *args, **options):
+        configuracion = ConfiguracionStub(
+            latencia=options["latencia_ms"] / 1000,
+            tasa_error=options["tasa_error"],
+            tasa_404=options["tasa_404"],
+            duracion_token=options["duracion_token"],
+            duracion_refresh=options["duracion_refresh"],
+            limite_por_segundo=options["limite_por_segundo"],
+        )
+        servidor = iniciar_stub(configuracion, puerto=options["puerto"])
+        self.stdout.write(f"Stub de IOL escuchando en {servidor.url} (Ctrl+C para terminar)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            servidor.shutdown()
+            self.stdout.write(f"Llamadas recibidas: {dict(servidor.llamadas)}")
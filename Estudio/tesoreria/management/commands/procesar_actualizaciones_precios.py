@@ -0,0 +1,60 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tesoreria.services import ejecutar_actualizacion, tomar_actualizacion_pendiente
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa las actualizaciones de precios de títulos encoladas desde "
+        "Inversiones. Pensado para correr como proceso aparte de los workers web."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intervalo", type=int, default=2,
+            help="Segundos de espera cuando no hay actualizaciones pendientes (default: 2).",
+        )
+        parser.add_argument(
+            "--una-vez", action="store_true",
+            help="Procesa las pendientes y termina.",
+        )
+
+    def handle(self, *args, **options):
+        intervalo = max(options["intervalo"], 1)
+        while True:
+            procesadas = self._procesar_pendientes()
+            if options["una_vez"]:
+                return
+            if procesadas:
+                continue
+            try:
+                time.sleep(intervalo)
+            except KeyboardInterrupt:
+                return
+
+    def _procesar_pendientes(self):
+        procesadas = 0
+        while True:
+            close_old_connections()
+            try:
+                trabajo = tomar_actualizacion_pendiente()
+                if trabajo is None:
+                    return procesadas
+                logger.info("Procesando actualización de precios %s", trabajo.pk)
+                trabajo = ejecutar_actualizacion(trabajo)
+            except Exception:
+                logger.exception("Error inesperado al procesar actualizaciones de precios")
+                return procesadas
+            finally:
+                close_old_connections()
+            procesadas += 1
+            logger.info(
+                "Actualización de precios %s: %s (%s/%s símbolos, %s con error)",
+                trabajo.pk, trabajo.estado, trabajo.simbolos_hechos,
+                trabajo.simbolos_total, trabajo.simbolos_con_error,
+            )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tesoreria.services import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula desde cero la fila de ResumenTesoreria que lee el dashboard. "
+        "Usar si se modificaron datos sin pasar por el ORM (SQL directo, restore)."
+    )
+
+    def handle(self, *args, **options):
+        for total, valor in reconstruir_resumen().items():
+            self.stdout.write(f"{total:<30} {valor:>20,.2f}")
+        self.stdout.write(self.style.SUCCESS("Resumen de tesorería reconstruido."))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tesoreria', '0006_add_precio_manual_to_tituloon'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimboloNoEncontrado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('simbolo', models.CharField(max_length=20, unique=True)),
+                ('intentos', models.PositiveIntegerField(default=1)),
+                ('ultimo_error', models.CharField(blank=True, max_length=200)),
+                ('proximo_reintento', models.DateTimeField(db_index=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Símbolo no encontrado en IOL',
+                'verbose_name_plural': 'Símbolos no encontrados en IOL',
+                'ordering': ['simbolo'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-17 18:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tesoreria', '0007_simbolo_no_encontrado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActualizacionPrecios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('terminada', 'Terminada'), ('fallida', 'Fallida')], db_index=True, default='pendiente', max_length=10)),
+                ('forzar', models.BooleanField(default=False)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('iniciada', models.DateTimeField(blank=True, null=True)),
+                ('terminada', models.DateTimeField(blank=True, null=True)),
+                ('simbolos_total', models.PositiveIntegerField(default=0)),
+                ('simbolos_hechos', models.PositiveIntegerField(default=0)),
+                ('simbolos_con_error', models.PositiveIntegerField(default=0)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('solicitada_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Actualización de precios',
+                'verbose_name_plural': 'Actualizaciones de precios',
+                'ordering': ['-creada'],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-17 18:30
+
+from django.db import migrations, models
+
+
+def resolver_simbolos(nombre, ticker, tipo):
+    """Copia de tesoreria.models.resolver_simbolos al crear esta migración (no importar la del modelo)."""
+    ticker = ticker.strip().upper()
+    if 'panama' in nombre.lower():
+        return '', ticker, 'panama'
+    if tipo == 'ON':
+        base = ticker[:-1] if ticker.endswith(('O', 'D')) else ticker
+        return base + 'O', base + 'D', 'on'
+    if ticker.endswith('D'):
+        return ticker[:-1], ticker, 'bono_d'
+    return ticker, ticker + 'D', 'bono_c'
+
+
+def resolver_existentes(apps, schema_editor):
+    TituloON = apps.get_model('tesoreria', 'TituloON')
+    titulos = list(TituloON.objects.all())
+    for t in titulos:
+        t.simbolo_pesos, t.simbolo_usd, t.regla_valuacion = resolver_simbolos(t.nombre, t.ticker, t.tipo)
+    TituloON.objects.bulk_update(titulos, ['simbolo_pesos', 'simbolo_usd', 'regla_valuacion'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tesoreria', '0008_actualizacion_precios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tituloon',
+            name='regla_valuacion',
+            field=models.CharField(choices=[('panama', 'ON Panama (pesos = USD × MEP)'), ('on', 'ON (sin completar)'), ('bono_d', 'Bono D (pesos = USD × MEP)'), ('bono_c', 'Bono C (USD = pesos / MEP)')], default='on', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='tituloon',
+            name='simbolo_pesos',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=21),
+        ),
+        migrations.AddField(
+            model_name='tituloon',
+            name='simbolo_usd',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=21),
+        ),
+        migrations.RunPython(resolver_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 18:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tesoreria', '0009_titulo_simbolos_iol'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecioTitulo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('registrado', models.DateTimeField(auto_now_add=True)),
+                ('fuente', models.CharField(choices=[('iol', 'IOL'), ('manual', 'Manual')], max_length=10)),
+                ('cuotapartes', models.DecimalField(decimal_places=6, max_digits=15)),
+                ('valor_cierre_pesos', models.DecimalField(blank=True, decimal_places=6, max_digits=15, null=True)),
+                ('valor_cierre_usd', models.DecimalField(blank=True, decimal_places=6, max_digits=15, null=True)),
+                ('saldo_pesos', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('saldo_usd', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('titulo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='precios', to='tesoreria.tituloon')),
+            ],
+            options={
+                'verbose_name': 'Precio de título',
+                'verbose_name_plural': 'Precios de títulos',
+                'ordering': ['titulo', 'fecha', 'registrado'],
+                'indexes': [models.Index(fields=['titulo', 'fecha'], name='precio_titulo_fecha_idx'), models.Index(fields=['fecha'], name='precio_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-17 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tesoreria', '0010_precio_titulo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenTesoreria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_caja', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_caja_sem_ant', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_bancos_cc', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_bancos_chq_acred', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_bancos_chq_deb', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_bancos_usd', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_bancos_sem_ant_pesos', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_bancos_sem_ant_usd', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_me', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_me_sem_ant', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_vad', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_vad_sem_ant', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_pf', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_fci', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_fci_sem_ant', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_titulos_pesos', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_titulos_usd', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_titulos_pesos_sem_ant', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_titulos_usd_sem_ant', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen de tesorería',
+                'verbose_name_plural': 'Resumen de tesorería',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-17 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tesoreria', '0011_resumen_tesoreria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LimitadorIOL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('host', models.CharField(max_length=200, unique=True)),
+                ('tat_us', models.BigIntegerField(default=0, help_text='Instante teórico de la próxima llamada (GCRA)')),
+                ('pausa_hasta_us', models.BigIntegerField(default=0, help_text='Tráfico frenado hasta este instante (Retry-After)')),
+            ],
+            options={
+                'verbose_name': 'Limitador de IOL',
+                'verbose_name_plural': 'Limitadores de IOL',
+            },
+        ),
+    ]
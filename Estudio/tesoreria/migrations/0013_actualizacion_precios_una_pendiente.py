@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-17 18:58
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def descartar_pendientes_duplicadas(apps, schema_editor):
+    """Deja solo la pendiente más antigua; las demás se marcan como fallidas."""
+    ActualizacionPrecios = apps.get_model('tesoreria', 'ActualizacionPrecios')
+    pendientes = ActualizacionPrecios.objects.filter(estado='pendiente').order_by('creada')
+    primera = pendientes.values_list('pk', flat=True).first()
+    pendientes.exclude(pk=primera).update(
+        estado='fallida',
+        terminada=timezone.now(),
+        resultado={"errores": ["Descartada: ya había otra actualización pendiente."]},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tesoreria', '0012_limitador_iol'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(descartar_pendientes_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='actualizacionprecios',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado', 'pendiente')), fields=('estado',), name='actualizacion_precios_una_pendiente'),
+        ),
+    ]
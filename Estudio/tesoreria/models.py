@@ -1,12 +1,29 @@
 from datetime import date
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 
 EMPRESA_CHOICES = [
     ('L1', 'L1'),
     ('L2', 'L2'),
 ]
 
-class Caja(models.Model):
+
+class SumadoEnResumen(models.Model):
+    """
+    Base de los modelos sumados en ResumenTesoreria. save() corre en una
+    transacción que incluye el post_save que recalcula el resumen
+    (tesoreria.signals): la fila y el total se confirman juntos. delete() ya
+    envía post_delete dentro de la transacción del borrado.
+    """
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class Caja(SumadoEnResumen):
     fecha = models.DateField(default=date.today)
     empresa = models.CharField(max_length=2, choices=EMPRESA_CHOICES)
     saldo = models.DecimalField(max_digits=15, decimal_places=2, default=0)
@@ -19,7 +36,7 @@ class Caja(models.Model):
     def __str__(self):
         return f"Caja {self.empresa} - {self.fecha}"
 
-class Banco(models.Model):
+class Banco(SumadoEnResumen):
     nombre = models.CharField(max_length=100)
     fecha = models.DateField(default=date.today)
     saldo_cuenta_corriente = models.DecimalField(max_digits=15, decimal_places=2, default=0)
@@ -42,7 +59,7 @@ class Banco(models.Model):
     def __str__(self):
         return f"{self.nombre} - {self.fecha}"
 
-class MonedaExtranjera(models.Model):
+class MonedaExtranjera(SumadoEnResumen):
     fecha = models.DateField(default=date.today)
     empresa = models.CharField(max_length=2, choices=EMPRESA_CHOICES)
     saldo_dolares = models.DecimalField(max_digits=15, decimal_places=2, default=0)
@@ -56,7 +73,7 @@ class MonedaExtranjera(models.Model):
     def __str__(self):
         return f"ME {self.empresa} - {self.fecha}"
 
-class ValorADepositarEmpresa(models.Model):
+class ValorADepositarEmpresa(SumadoEnResumen):
     empresa = models.CharField(max_length=2, choices=EMPRESA_CHOICES, unique=True)
     saldo_sem_ant = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
 
@@ -68,7 +85,7 @@ class ValorADepositarEmpresa(models.Model):
         return f"VAD Empresa {self.empresa}"
 
 
-class ValorADepositar(models.Model):
+class ValorADepositar(SumadoEnResumen):
     fecha_carga = models.DateField(default=date.today)
     empresa = models.CharField(max_length=2, choices=EMPRESA_CHOICES)
     mes_vencimiento = models.CharField(max_length=20)
@@ -82,7 +99,7 @@ class ValorADepositar(models.Model):
     def __str__(self):
         return f"VAD {self.empresa} - {self.mes_vencimiento} {self.anio_vencimiento}"
 
-class PlazoFijo(models.Model):
+class PlazoFijo(SumadoEnResumen):
     banco = models.CharField(max_length=100)
     monto_invertido = models.DecimalField(
         max_digits=15, decimal_places=2, blank=True, null=True
@@ -101,7 +118,7 @@ class PlazoFijo(models.Model):
     def __str__(self):
         return f"PF {self.banco} - {self.monto_invertido}"
 
-class FCI(models.Model):
+class FCI(SumadoEnResumen):
     nombre = models.CharField(max_length=200)
     banco = models.CharField(max_length=100)
     fecha = models.DateField(default=date.today)
@@ -130,7 +147,38 @@ TIPO_TITULO_CHOICES = [
     ('Bono', 'Bono'),
 ]
 
-class TituloON(models.Model):
+def resolver_simbolos(nombre, ticker, tipo):
+    """
+    Símbolos de IOL en pesos y en dólares de un título y la regla con que se
+    valúa. Devuelve (simbolo_pesos, simbolo_usd, regla); '' si no hay símbolo.
+
+    - ON Panama: el ticker es el completo, terminado en C (dólar cable).
+    - ON: el ticker es la base (ej: BYCH) o ya trae O/D -> base+O y base+D.
+    - Bono terminado en D (ej: TX26D): dólares el ticker, pesos sin la D.
+    - Bono (ej: TX26): pesos el ticker, dólares ticker+D.
+    """
+    ticker = ticker.strip().upper()
+    if 'panama' in nombre.lower():
+        return '', ticker, TituloON.ReglaValuacion.PANAMA
+    if tipo == 'ON':
+        base = ticker[:-1] if ticker.endswith(('O', 'D')) else ticker
+        return base + 'O', base + 'D', TituloON.ReglaValuacion.ON
+    if ticker.endswith('D'):
+        return ticker[:-1], ticker, TituloON.ReglaValuacion.BONO_D
+    return ticker, ticker + 'D', TituloON.ReglaValuacion.BONO_C
+
+
+class TituloON(SumadoEnResumen):
+    class ReglaValuacion(models.TextChoices):
+        # Qué saldo se completa con el dólar MEP cuando falta el cierre propio
+        PANAMA = 'panama', 'ON Panama (pesos = USD × MEP)'
+        ON = 'on', 'ON (sin completar)'
+        BONO_D = 'bono_d', 'Bono D (pesos = USD × MEP)'
+        BONO_C = 'bono_c', 'Bono C (USD = pesos / MEP)'
+
+    # Campos que determinan simbolo_pesos, simbolo_usd y regla_valuacion
+    CAMPOS_SIMBOLOS = ('nombre', 'ticker', 'tipo')
+
     nombre = models.CharField(max_length=200)
     ticker = models.CharField(max_length=20)
     tipo = models.CharField(max_length=10, choices=TIPO_TITULO_CHOICES, default='ON')
@@ -161,6 +209,12 @@ class TituloON(models.Model):
         default=False,
         help_text="Marcar si el precio no se obtiene de IOL y debe cargarse manualmente."
     )
+    # Derivados de nombre/ticker/tipo en save() (ver resolver_simbolos)
+    simbolo_pesos = models.CharField(max_length=21, blank=True, editable=False, db_index=True)
+    simbolo_usd = models.CharField(max_length=21, blank=True, editable=False, db_index=True)
+    regla_valuacion = models.CharField(
+        max_length=10, choices=ReglaValuacion.choices, default=ReglaValuacion.ON, editable=False
+    )
     class Meta:
         verbose_name = 'Título / ON'
         verbose_name_plural = 'Títulos / ONs'
@@ -169,6 +223,177 @@ class TituloON(models.Model):
     def __str__(self):
         return f"{self.nombre} ({self.ticker})"
 
+    def resolver_simbolos(self):
+        self.simbolo_pesos, self.simbolo_usd, self.regla_valuacion = resolver_simbolos(
+            self.nombre, self.ticker, self.tipo
+        )
+
+    def save(self, *args, **kwargs):
+        self.resolver_simbolos()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CAMPOS_SIMBOLOS):
+            kwargs['update_fields'] = {*update_fields, 'simbolo_pesos', 'simbolo_usd', 'regla_valuacion'}
+        super().save(*args, **kwargs)
+
+    @property
+    def simbolos_iol(self):
+        return [s for s in (self.simbolo_pesos, self.simbolo_usd) if s]
+
     @property
     def es_panama(self):
-        return 'panama' in self.nombre.lower()
\ No newline at end of file
+        return 'panama' in self.nombre.lower()
+
+class SimboloNoEncontrado(models.Model):
+    """
+    Símbolo que IOL informó como inexistente (404). No se vuelve a consultar
+    hasta `proximo_reintento`; cada nuevo 404 duplica la espera.
+    """
+    simbolo = models.CharField(max_length=20, unique=True)
+    intentos = models.PositiveIntegerField(default=1)
+    ultimo_error = models.CharField(max_length=200, blank=True)
+    proximo_reintento = models.DateTimeField(db_index=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Símbolo no encontrado en IOL'
+        verbose_name_plural = 'Símbolos no encontrados en IOL'
+        ordering = ['simbolo']
+
+    def __str__(self):
+        return f"{self.simbolo} (reintento {self.proximo_reintento:%d/%m/%Y %H:%M})"
+
+
+class LimitadorIOL(models.Model):
+    """
+    Estado del limitador de tráfico hacia IOL, compartido por todos los
+    procesos (ver iol_client.LimitadorCompartido). Una fila por host; los
+    instantes son epoch en microsegundos.
+    """
+    host = models.CharField(max_length=200, unique=True)
+    tat_us = models.BigIntegerField(default=0, help_text='Instante teórico de la próxima llamada (GCRA)')
+    pausa_hasta_us = models.BigIntegerField(default=0, help_text='Tráfico frenado hasta este instante (Retry-After)')
+
+    class Meta:
+        verbose_name = 'Limitador de IOL'
+        verbose_name_plural = 'Limitadores de IOL'
+
+    def __str__(self):
+        return self.host
+
+
+class ActualizacionPrecios(models.Model):
+    """
+    Actualización de precios de títulos encolada desde la web y ejecutada por
+    el comando `procesar_actualizaciones_precios`, fuera del request.
+    """
+
+    class Estado(models.TextChoices):
+        PENDIENTE = 'pendiente', 'Pendiente'
+        EN_CURSO = 'en_curso', 'En curso'
+        TERMINADA = 'terminada', 'Terminada'
+        FALLIDA = 'fallida', 'Fallida'
+
+    estado = models.CharField(max_length=10, choices=Estado.choices, default=Estado.PENDIENTE, db_index=True)
+    forzar = models.BooleanField(default=False)
+    solicitada_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+    )
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+    simbolos_total = models.PositiveIntegerField(default=0)
+    simbolos_hechos = models.PositiveIntegerField(default=0)
+    simbolos_con_error = models.PositiveIntegerField(default=0)
+    resultado = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Actualización de precios'
+        verbose_name_plural = 'Actualizaciones de precios'
+        ordering = ['-creada']
+        constraints = [
+            # A lo sumo una pendiente: encolar dos veces devuelve la misma
+            models.UniqueConstraint(
+                fields=['estado'], condition=models.Q(estado='pendiente'),
+                name='actualizacion_precios_una_pendiente',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Actualización {self.pk} ({self.get_estado_display()}) - {self.creada:%d/%m/%Y %H:%M}"
+
+
+class PrecioTitulo(models.Model):
+    """
+    Histórico de cierres y saldos de un TituloON. Solo se agregan filas: cada
+    actualización de precios inserta una por título (ver
+    services.registrar_precios); si hay varias en el día vale la última.
+    """
+
+    class Fuente(models.TextChoices):
+        IOL = 'iol', 'IOL'
+        MANUAL = 'manual', 'Manual'
+
+    titulo = models.ForeignKey(TituloON, on_delete=models.CASCADE, related_name='precios')
+    fecha = models.DateField()
+    registrado = models.DateTimeField(auto_now_add=True)
+    fuente = models.CharField(max_length=10, choices=Fuente.choices)
+    cuotapartes = models.DecimalField(max_digits=15, decimal_places=6)
+    valor_cierre_pesos = models.DecimalField(max_digits=15, decimal_places=6, null=True, blank=True)
+    valor_cierre_usd = models.DecimalField(max_digits=15, decimal_places=6, null=True, blank=True)
+    saldo_pesos = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    saldo_usd = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Precio de título'
+        verbose_name_plural = 'Precios de títulos'
+        ordering = ['titulo', 'fecha', 'registrado']
+        indexes = [
+            models.Index(fields=['titulo', 'fecha'], name='precio_titulo_fecha_idx'),
+            # Serie de la cartera: todas las filas de un rango de fechas
+            models.Index(fields=['fecha'], name='precio_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.titulo.ticker} {self.fecha:%d/%m/%Y} ({self.get_fuente_display()})"
+
+
+def _total():
+    return models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+
+class ResumenTesoreria(models.Model):
+    """
+    Totales de tesorería ya calculados (una sola fila, pk=ResumenTesoreria.PK),
+    para que el dashboard no agregue las tablas en cada visita. Los campos son
+    los de services.TOTALES; las señales de tesoreria.signals recalculan la
+    sección del modelo que cambia. Se reconstruye con `reconstruir_resumen_tesoreria`.
+    """
+    PK = 1
+
+    total_caja = _total()
+    total_caja_sem_ant = _total()
+    total_bancos_cc = _total()
+    total_bancos_chq_acred = _total()
+    total_bancos_chq_deb = _total()
+    total_bancos_usd = _total()
+    total_bancos_sem_ant_pesos = _total()
+    total_bancos_sem_ant_usd = _total()
+    total_me = _total()
+    total_me_sem_ant = _total()
+    total_vad = _total()
+    total_vad_sem_ant = _total()
+    total_pf = _total()
+    total_fci = _total()
+    total_fci_sem_ant = _total()
+    total_titulos_pesos = _total()
+    total_titulos_usd = _total()
+    total_titulos_pesos_sem_ant = _total()
+    total_titulos_usd_sem_ant = _total()
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Resumen de tesorería'
+        verbose_name_plural = 'Resumen de tesorería'
+
+    def __str__(self):
+        return f"Resumen de tesorería ({self.actualizado:%d/%m/%Y %H:%M})"
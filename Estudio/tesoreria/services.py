@@ -0,0 +1,602 @@
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from django.db import IntegrityError, connection, transaction
+from django.db.backends.utils import format_number
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from cotizaciones.services import get_dolares
+from .iol_client import IOLClient, PRESUPUESTO_LOTE, consultar_titulos, simbolos_descartados
+from .models import (
+    ActualizacionPrecios, Banco, Caja, FCI, MonedaExtranjera, PlazoFijo, PrecioTitulo,
+    ResumenTesoreria, SimboloNoEncontrado, TituloON, ValorADepositar, ValorADepositarEmpresa,
+)
+
+logger = logging.getLogger(__name__)
+
+# Fuera del request no hay timeout de gunicorn: el lote puede tardar más
+PRESUPUESTO_TRABAJO = 15 * 60
+# Una actualización en curso sin terminar pasado este plazo se da por perdida
+# (el worker que la tomó murió)
+DURACION_MAXIMA_TRABAJO = timedelta(minutes=20)
+# Una pendiente que nadie tomó en este plazo, sin otra en curso, indica que
+# no está corriendo procesar_actualizaciones_precios
+ESPERA_MAXIMA_PENDIENTE = timedelta(minutes=2)
+INTERVALO_PROGRESO = 1  # segundos entre escrituras de progreso
+
+# Sección -> (modelo, {total: campo sumado}). Cada sección es un solo
+# aggregate con todas sus sumas.
+TOTALES = {
+    'caja': (Caja, {
+        'total_caja': 'saldo',
+        'total_caja_sem_ant': 'saldo_sem_ant',
+    }),
+    'bancos': (Banco, {
+        'total_bancos_cc': 'saldo_cuenta_corriente',
+        'total_bancos_chq_acred': 'cheque_pendiente_acreditar',
+        'total_bancos_chq_deb': 'cheque_pendiente_debito',
+        'total_bancos_usd': 'saldo_usd',
+        'total_bancos_sem_ant_pesos': 'saldo_sem_ant_pesos',
+        'total_bancos_sem_ant_usd': 'saldo_usd_sem_ant',
+    }),
+    'moneda_extranjera': (MonedaExtranjera, {
+        'total_me': 'saldo_dolares',
+        'total_me_sem_ant': 'saldo_dolares_sem_ant',
+    }),
+    'vad': (ValorADepositar, {
+        'total_vad': 'monto',
+    }),
+    'vad_sem_ant': (ValorADepositarEmpresa, {
+        'total_vad_sem_ant': 'saldo_sem_ant',
+    }),
+    'plazos_fijos': (PlazoFijo, {
+        'total_pf': 'monto_invertido',
+    }),
+    'fci': (FCI, {
+        'total_fci': 'saldo',
+        'total_fci_sem_ant': 'saldo_sem_ant',
+    }),
+    'titulos': (TituloON, {
+        'total_titulos_pesos': 'saldo_pesos_actual',
+        'total_titulos_usd': 'saldo_usd_actual',
+        'total_titulos_pesos_sem_ant': 'saldo_pesos_sem_ant',
+        'total_titulos_usd_sem_ant': 'saldo_usd_sem_ant',
+    }),
+}
+
+# Totales que son suma de otros; se calculan si están todos sus sumandos
+TOTALES_COMBINADOS = {
+    'total_caja_bancos_pesos': ('total_caja', 'total_bancos_cc'),
+    'total_caja_bancos_usd': ('total_bancos_usd', 'total_me'),
+    'total_caja_bancos_sem_ant_pesos': ('total_caja_sem_ant', 'total_bancos_sem_ant_pesos'),
+    'total_caja_bancos_sem_ant_usd': ('total_bancos_sem_ant_usd', 'total_me_sem_ant'),
+    'total_inversiones': ('total_pf', 'total_fci', 'total_titulos_pesos'),
+    'total_inversiones_sem_ant': ('total_fci_sem_ant', 'total_titulos_pesos_sem_ant'),
+}
+
+
+SECCION_POR_MODELO = {modelo: seccion for seccion, (modelo, _) in TOTALES.items()}
+
+
+def _sumar_secciones(secciones):
+    totales = {}
+    for seccion in secciones:
+        modelo, campos = TOTALES[seccion]
+        sumas = modelo.objects.aggregate(**{total: Sum(campo) for total, campo in campos.items()})
+        totales.update({total: valor or Decimal('0') for total, valor in sumas.items()})
+    return totales
+
+
+def _combinar(totales):
+    for total, sumandos in TOTALES_COMBINADOS.items():
+        if all(s in totales for s in sumandos):
+            totales[total] = sum((totales[s] for s in sumandos), Decimal('0'))
+    return totales
+
+
+def calcular_totales(secciones=None):
+    """
+    Totales de tesorería, con una consulta por sección de TOTALES.
+
+    Args:
+        secciones: Claves de TOTALES a calcular (default: todas).
+
+    Returns:
+        dict total -> Decimal (0 si no hay filas), con los TOTALES_COMBINADOS
+        cuyos sumandos se hayan calculado.
+    """
+    return _combinar(_sumar_secciones(secciones or TOTALES))
+
+
+def leer_resumen():
+    """
+    Los mismos totales que calcular_totales(), leídos de la fila de
+    ResumenTesoreria (se crea la primera vez).
+    """
+    campos = [total for _, sumas in TOTALES.values() for total in sumas]
+    fila = ResumenTesoreria.objects.filter(pk=ResumenTesoreria.PK).values(*campos).first()
+    if fila is None:
+        fila = reconstruir_resumen()
+    return _combinar(dict(fila))
+
+
+def _bloquear_resumen():
+    """
+    Toma el lock de la fila del resumen hasta el fin de la transacción; False
+    si la fila no existe. Las sumas se hacen después: con READ COMMITTED cada
+    consulta ve lo que confirmó quien tenía el lock antes, así dos refrescos
+    concurrentes no dejan guardados los totales del que sumó primero.
+    """
+    return ResumenTesoreria.objects.select_for_update().filter(pk=ResumenTesoreria.PK).values('pk').first() is not None
+
+
+def reconstruir_resumen():
+    """Recalcula todas las secciones del resumen desde las tablas."""
+    with transaction.atomic():
+        _bloquear_resumen()
+        totales = _sumar_secciones(TOTALES)
+        ResumenTesoreria.objects.update_or_create(pk=ResumenTesoreria.PK, defaults=totales)
+    return totales
+
+
+def refrescar_resumen(secciones):
+    """Recalcula en el resumen solo las `secciones` indicadas."""
+    with transaction.atomic():
+        if not _bloquear_resumen():
+            reconstruir_resumen()
+            return
+        ResumenTesoreria.objects.filter(pk=ResumenTesoreria.PK).update(
+            actualizado=timezone.now(), **_sumar_secciones(secciones),
+        )
+
+
+_diferidas = threading.local()
+
+
+def resumen_modificado(seccion):
+    """
+    Avisa que cambió una sección. Dentro de resumen_diferido() se acumula;
+    si no, se recalcula en el momento.
+    """
+    pendientes = getattr(_diferidas, 'secciones', None)
+    if pendientes is None:
+        refrescar_resumen([seccion])
+    else:
+        pendientes.add(seccion)
+
+
+@contextmanager
+def resumen_diferido():
+    """
+    Para escrituras en lote: las secciones modificadas se recalculan una sola
+    vez al salir del bloque en lugar de una vez por fila guardada. El bloque
+    y el recálculo van en una transacción.
+    """
+    if getattr(_diferidas, 'secciones', None) is not None:
+        yield
+        return
+    _diferidas.secciones = set()
+    try:
+        with transaction.atomic():
+            yield
+            secciones, _diferidas.secciones = _diferidas.secciones, None
+            if secciones:
+                refrescar_resumen(secciones)
+    finally:
+        _diferidas.secciones = None
+
+
+def _cero():
+    return Value(Decimal('0'), output_field=DecimalField(max_digits=15, decimal_places=2))
+
+
+def _cerrar_vad():
+    """Upsert en un INSERT del total por empresa de los valores a depositar."""
+    totales = ValorADepositar.objects.values('empresa').annotate(total=Sum('monto')).order_by('empresa')
+    filas = ValorADepositarEmpresa.objects.bulk_create(
+        [ValorADepositarEmpresa(empresa=t['empresa'], saldo_sem_ant=t['total']) for t in totales],
+        update_conflicts=True, unique_fields=['empresa'], update_fields=['saldo_sem_ant'],
+    )
+    return len(filas)
+
+
+# Sección de "cerrar semana" -> (sección de TOTALES que modifica, copia a semana anterior).
+# Cada copia es un solo UPDATE columna a columna y devuelve las filas afectadas.
+CIERRES_SEMANA = {
+    'titulos': ('titulos', lambda: TituloON.objects.update(
+        cuotapartes_sem_ant=F('cuotapartes_actual'),
+        saldo_pesos_sem_ant=F('saldo_pesos_actual'),
+        saldo_usd_sem_ant=F('saldo_usd_actual'),
+    )),
+    'fci': ('fci', lambda: FCI.objects.update(
+        cuotapartes_sem_ant=F('cuotapartes'),
+        saldo_sem_ant=F('saldo'),
+    )),
+    'caja': ('caja', lambda: Caja.objects.update(saldo_sem_ant=F('saldo'))),
+    'moneda_extranjera': ('moneda_extranjera', lambda: MonedaExtranjera.objects.update(
+        saldo_dolares_sem_ant=F('saldo_dolares'),
+    )),
+    'bancos': ('bancos', lambda: Banco.objects.update(
+        saldo_sem_ant_pesos=(
+            Coalesce(F('saldo_cuenta_corriente'), _cero())
+            + Coalesce(F('cheque_pendiente_acreditar'), _cero())
+            + Coalesce(F('cheque_pendiente_debito'), _cero())
+        ),
+        saldo_usd_sem_ant=F('saldo_usd'),
+    )),
+    'vad': ('vad_sem_ant', _cerrar_vad),
+}
+
+
+def cerrar_semana(secciones=None):
+    """
+    Copia los saldos actuales a los de semana anterior, en una transacción:
+    si una copia falla no queda ninguna aplicada.
+
+    Args:
+        secciones: Claves de CIERRES_SEMANA a cerrar (default: todas).
+
+    Returns:
+        dict sección -> filas actualizadas.
+    """
+    secciones = list(secciones or CIERRES_SEMANA)
+    with transaction.atomic():
+        resultado = {seccion: CIERRES_SEMANA[seccion][1]() for seccion in secciones}
+        # Los UPDATE en lote no disparan señales
+        refrescar_resumen([CIERRES_SEMANA[seccion][0] for seccion in secciones])
+    logger.info("Semana cerrada: %s", resultado)
+    return resultado
+
+
+def get_dolar_mep():
+    """Obtiene cotización Dólar MEP reutilizando el módulo cotizaciones."""
+    dolares = get_dolares()
+    for d in dolares:
+        if d.get('casa') == 'bolsa' or 'mep' in d.get('nombre', '').lower():
+            return d
+    return None
+
+
+def _cierre(cierres, simbolo):
+    cierre = cierres.get(simbolo) if simbolo else None
+    return None if cierre is None else Decimal(str(cierre))
+
+
+def valuar_titulo(titulo, cierres, dolar_mep_venta):
+    """
+    Asigna cierres y saldos actuales de `titulo` a partir de `cierres`
+    (símbolo -> cierre de IOL). Los cierres cotizan cada 100 nominales:
+    saldo = cuotapartes * (cierre / 100). Si falta un lado, la regla de
+    valuación decide si se completa con el dólar MEP.
+    """
+    Regla = TituloON.ReglaValuacion
+    titulo.valor_cierre_pesos = _cierre(cierres, titulo.simbolo_pesos)
+    titulo.valor_cierre_usd = _cierre(cierres, titulo.simbolo_usd)
+    titulo.saldo_pesos_actual = titulo.saldo_usd_actual = None
+    if titulo.valor_cierre_pesos is not None:
+        titulo.saldo_pesos_actual = titulo.cuotapartes_actual * (titulo.valor_cierre_pesos / Decimal('100'))
+    if titulo.valor_cierre_usd is not None:
+        titulo.saldo_usd_actual = titulo.cuotapartes_actual * (titulo.valor_cierre_usd / Decimal('100'))
+
+    if dolar_mep_venta <= 0:
+        return
+    if titulo.regla_valuacion in (Regla.PANAMA, Regla.BONO_D):
+        if titulo.saldo_pesos_actual is None and titulo.saldo_usd_actual is not None:
+            titulo.saldo_pesos_actual = titulo.saldo_usd_actual * dolar_mep_venta
+    elif titulo.regla_valuacion == Regla.BONO_C:
+        if titulo.saldo_usd_actual is None and titulo.saldo_pesos_actual is not None:
+            titulo.saldo_usd_actual = titulo.saldo_pesos_actual / dolar_mep_venta
+
+
+CAMPOS_VALUACION = ("valor_cierre_pesos", "valor_cierre_usd", "saldo_pesos_actual", "saldo_usd_actual")
+LOTE_GUARDADO = 200  # filas por UPDATE de bulk_update
+
+
+def _valores_en_base(titulo):
+    """Valores de valuación como quedan guardados (redondeados a los decimales de cada campo)."""
+    valores = []
+    for campo in CAMPOS_VALUACION:
+        field = TituloON._meta.get_field(campo)
+        valor = getattr(titulo, campo)
+        valores.append(None if valor is None else format_number(valor, field.max_digits, field.decimal_places))
+    return valores
+
+
+def guardar_valuaciones(titulos):
+    """
+    Guarda CAMPOS_VALUACION de `titulos` con bulk_update en lotes de
+    LOTE_GUARDADO, todo en una transacción. Si un lote falla se reintenta
+    fila por fila, cada una con su savepoint, para que una fila inválida no
+    descarte al resto.
+
+    Returns:
+        dict titulo -> excepción de las filas que no se pudieron guardar.
+    """
+    fallidos = {}
+    with transaction.atomic():
+        for inicio in range(0, len(titulos), LOTE_GUARDADO):
+            lote = titulos[inicio:inicio + LOTE_GUARDADO]
+            try:
+                with transaction.atomic():
+                    TituloON.objects.bulk_update(lote, CAMPOS_VALUACION)
+                continue
+            except Exception:
+                logger.warning("Falló el guardado en lote de %s títulos, se reintenta por fila", len(lote))
+            for t in lote:
+                try:
+                    with transaction.atomic():
+                        TituloON.objects.filter(pk=t.pk).update(**{c: getattr(t, c) for c in CAMPOS_VALUACION})
+                except Exception as e:
+                    fallidos[t] = e
+        # bulk_update no dispara señales
+        if len(fallidos) < len(titulos):
+            resumen_modificado('titulos')
+    return fallidos
+
+
+def actualizar_precios(forzar=False, presupuesto=PRESUPUESTO_LOTE, progreso=None, titulos=None):
+    """
+    Consulta en IOL los cierres de los títulos sin precio manual y recalcula
+    sus saldos.
+
+    Args:
+        forzar: Ignora los cierres cacheados (ver iol_client.consultar_titulos).
+        presupuesto: Segundos máximos para las consultas a IOL.
+        progreso: Callback `(hechos, total, con_error)` por símbolo resuelto.
+        titulos: QuerySet de TituloON a actualizar (default: todos).
+
+    Returns:
+        dict con actualizados, errores, manuales_omitidos, no_encontrados y cupo_iol.
+    """
+    titulos = TituloON.objects.all() if titulos is None else titulos
+    if not titulos.exists():
+        return {"actualizados": 0, "errores": ["No hay títulos cargados."]}
+
+    # Separar los que tienen precio manual (no se consultan en IOL)
+    titulos_iol = [t for t in titulos if not t.precio_manual]
+    tickers_a_consultar = {s for t in titulos_iol for s in t.simbolos_iol}
+
+    # Variantes que IOL ya informó como inexistentes: no se consultan hasta su reintento
+    descartados = simbolos_descartados(tickers_a_consultar)
+    tickers_a_consultar -= descartados
+
+    iol = IOLClient()
+    resultado = consultar_titulos(
+        iol, list(tickers_a_consultar), presupuesto=presupuesto, forzar=forzar, progreso=progreso,
+    )
+    cierres = resultado["cierres"]
+    errores = resultado["errores"]
+    no_encontrados = [
+        {"simbolo": s.simbolo, "intentos": s.intentos, "proximo_reintento": s.proximo_reintento.isoformat()}
+        for s in SimboloNoEncontrado.objects.filter(simbolo__in=descartados | (tickers_a_consultar - set(cierres)))
+    ]
+
+    dolar_mep = get_dolar_mep()
+    dolar_mep_venta = Decimal(str(dolar_mep.get('venta', 0))) if dolar_mep else Decimal('0')
+
+    manuales = [t for t in titulos if t.precio_manual]
+    valuados, cambiados = [], []
+    for t in titulos_iol:
+        try:
+            antes = _valores_en_base(t)
+            valuar_titulo(t, cierres, dolar_mep_venta)
+            if _valores_en_base(t) != antes:
+                cambiados.append(t)
+            valuados.append(t)
+        except (InvalidOperation, Exception) as e:
+            errores.append(f"{t.ticker}: error al guardar — {e}")
+
+    fallidos = guardar_valuaciones(cambiados)
+    errores += [f"{t.ticker}: error al guardar — {e}" for t, e in fallidos.items()]
+    actualizados = [t for t in valuados if t not in fallidos]
+
+    registrar_precios(actualizados + manuales)
+
+    return {
+        "actualizados": len(actualizados),
+        "errores": errores,
+        "manuales_omitidos": len(manuales),
+        "no_encontrados": no_encontrados,
+        "cupo_iol": iol.limitador.estado(),
+    }
+
+
+def registrar_precios(titulos, fecha=None):
+    """
+    Agrega al histórico (PrecioTitulo) los cierres y saldos actuales de
+    `titulos`, en un solo INSERT. La fuente es MANUAL para los títulos con
+    precio manual e IOL para el resto. Se omiten los que no tienen ningún precio.
+    """
+    fecha = fecha or timezone.localdate()
+    filas = [
+        PrecioTitulo(
+            titulo=t,
+            fecha=fecha,
+            fuente=PrecioTitulo.Fuente.MANUAL if t.precio_manual else PrecioTitulo.Fuente.IOL,
+            cuotapartes=t.cuotapartes_actual,
+            valor_cierre_pesos=t.valor_cierre_pesos,
+            valor_cierre_usd=t.valor_cierre_usd,
+            saldo_pesos=t.saldo_pesos_actual,
+            saldo_usd=t.saldo_usd_actual,
+        )
+        for t in titulos
+        if t.valor_cierre_pesos is not None or t.valor_cierre_usd is not None
+    ]
+    return PrecioTitulo.objects.bulk_create(filas)
+
+
+def _ultimos_del_dia(filas):
+    """De filas ordenadas por registrado, la última de cada (título, fecha)."""
+    ultimos = {}
+    for fila in filas:
+        ultimos[(fila["titulo_id"], fila["fecha"])] = fila
+    return ultimos
+
+
+def serie_titulo(titulo, desde=None, hasta=None):
+    """
+    Cierres y saldos diarios de `titulo` entre `desde` y `hasta` (inclusive),
+    desde el histórico: no consulta IOL. Lista de dicts ordenada por fecha.
+    """
+    filas = PrecioTitulo.objects.filter(titulo=titulo)
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+    filas = filas.order_by('fecha', 'registrado', 'pk').values(
+        'titulo_id', 'fecha', 'fuente', 'valor_cierre_pesos', 'valor_cierre_usd', 'saldo_pesos', 'saldo_usd',
+    )
+    return sorted(_ultimos_del_dia(filas).values(), key=lambda f: f["fecha"])
+
+
+def serie_cartera(desde=None, hasta=None):
+    """
+    Valuación diaria de la cartera de títulos entre `desde` y `hasta`: suma de
+    saldos en pesos y en USD del último registro de cada título en el día.
+    Lista de dicts {fecha, saldo_pesos, saldo_usd, titulos} ordenada por fecha.
+    """
+    filas = PrecioTitulo.objects.all()
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+    filas = filas.order_by('fecha', 'registrado', 'pk').values('titulo_id', 'fecha', 'saldo_pesos', 'saldo_usd')
+
+    por_fecha = {}
+    for fila in _ultimos_del_dia(filas).values():
+        dia = por_fecha.setdefault(
+            fila["fecha"],
+            {"fecha": fila["fecha"], "saldo_pesos": Decimal('0'), "saldo_usd": Decimal('0'), "titulos": 0},
+        )
+        dia["saldo_pesos"] += fila["saldo_pesos"] or Decimal('0')
+        dia["saldo_usd"] += fila["saldo_usd"] or Decimal('0')
+        dia["titulos"] += 1
+    return [por_fecha[f] for f in sorted(por_fecha)]
+
+
+ESTADOS_ACTIVOS = (ActualizacionPrecios.Estado.PENDIENTE, ActualizacionPrecios.Estado.EN_CURSO)
+
+
+def _actualizacion_activa():
+    return ActualizacionPrecios.objects.filter(estado__in=ESTADOS_ACTIVOS).order_by('creada').first()
+
+
+def encolar_actualizacion_precios(usuario, forzar=False):
+    """
+    Encola una actualización de precios y la devuelve. Si ya hay una pendiente
+    o en curso se devuelve esa: pedirla dos veces no duplica el trabajo.
+
+    La constraint actualizacion_precios_una_pendiente impide dos pendientes
+    aunque dos requests encolen a la vez: la que pierde devuelve la de la otra.
+    """
+    descartar_actualizaciones_perdidas()
+    activa = _actualizacion_activa()
+    if activa:
+        return activa
+    try:
+        with transaction.atomic():
+            return ActualizacionPrecios.objects.create(solicitada_por=usuario, forzar=forzar)
+    except IntegrityError:
+        activa = _actualizacion_activa()
+        if activa is None:
+            # La constraint solo falla si hay otra pendiente: no reintentar el INSERT
+            raise
+        return activa
+
+
+def descartar_actualizaciones_perdidas():
+    """
+    Marca como fallidas las actualizaciones que no van a terminar: las en
+    curso que superaron DURACION_MAXIMA_TRABAJO (murió el worker) y las
+    pendientes que nadie tomó en ESPERA_MAXIMA_PENDIENTE (no hay worker).
+    """
+    ahora = timezone.now()
+    perdidas = ActualizacionPrecios.objects.filter(
+        estado=ActualizacionPrecios.Estado.EN_CURSO, iniciada__lt=ahora - DURACION_MAXIMA_TRABAJO,
+    ).update(
+        estado=ActualizacionPrecios.Estado.FALLIDA,
+        terminada=ahora,
+        resultado={"errores": ["La actualización no terminó: se interrumpió el proceso que la ejecutaba."]},
+    )
+    if perdidas:
+        logger.warning("%s actualizaciones de precios marcadas como fallidas por exceder %s", perdidas, DURACION_MAXIMA_TRABAJO)
+
+    if ActualizacionPrecios.objects.filter(estado=ActualizacionPrecios.Estado.EN_CURSO).exists():
+        return
+    sin_tomar = ActualizacionPrecios.objects.filter(
+        estado=ActualizacionPrecios.Estado.PENDIENTE, creada__lt=ahora - ESPERA_MAXIMA_PENDIENTE,
+    ).update(
+        estado=ActualizacionPrecios.Estado.FALLIDA,
+        terminada=ahora,
+        resultado={"errores": [
+            "Ningún proceso tomó la actualización: verificar que esté corriendo procesar_actualizaciones_precios."
+        ]},
+    )
+    if sin_tomar:
+        logger.warning("%s actualizaciones de precios sin tomar en %s: no hay worker procesándolas", sin_tomar, ESPERA_MAXIMA_PENDIENTE)
+
+
+def tomar_actualizacion_pendiente():
+    """
+    Marca como en curso la actualización pendiente más antigua y la devuelve
+    (None si no hay). El UPDATE condicionado al estado evita que dos workers
+    tomen la misma.
+    """
+    descartar_actualizaciones_perdidas()
+    for pk in (
+        ActualizacionPrecios.objects
+        .filter(estado=ActualizacionPrecios.Estado.PENDIENTE)
+        .order_by('creada')
+        .values_list('pk', flat=True)[:5]
+    ):
+        tomada = ActualizacionPrecios.objects.filter(
+            pk=pk, estado=ActualizacionPrecios.Estado.PENDIENTE,
+        ).update(estado=ActualizacionPrecios.Estado.EN_CURSO, iniciada=timezone.now())
+        if tomada:
+            return ActualizacionPrecios.objects.get(pk=pk)
+    return None
+
+
+def ejecutar_actualizacion(trabajo):
+    """Corre una actualización ya tomada, registrando el progreso y el resultado."""
+    avance = {}
+    terminado = threading.Event()
+
+    def _progreso(hechos, total, con_error):
+        avance.update(simbolos_hechos=hechos, simbolos_total=total, simbolos_con_error=con_error)
+
+    def _guardar_progreso():
+        # El callback corre dentro del loop de asyncio de iol_client, donde
+        # Django no deja usar el ORM: el avance se persiste desde este hilo.
+        try:
+            while not terminado.wait(INTERVALO_PROGRESO):
+                if avance:
+                    ActualizacionPrecios.objects.filter(pk=trabajo.pk).update(**dict(avance))
+        finally:
+            connection.close()
+
+    hilo = threading.Thread(target=_guardar_progreso, name=f"progreso-precios-{trabajo.pk}", daemon=True)
+    hilo.start()
+    try:
+        resultado = actualizar_precios(
+            forzar=trabajo.forzar, presupuesto=PRESUPUESTO_TRABAJO, progreso=_progreso,
+        )
+    except Exception as e:
+        logger.exception("Error en la actualización de precios %s", trabajo.pk)
+        trabajo.estado = ActualizacionPrecios.Estado.FALLIDA
+        trabajo.resultado = {"errores": [f"Error inesperado: {e}"]}
+    else:
+        trabajo.estado = ActualizacionPrecios.Estado.TERMINADA
+        trabajo.resultado = resultado
+    finally:
+        terminado.set()
+        hilo.join()
+    for campo, valor in avance.items():
+        setattr(trabajo, campo, valor)
+    trabajo.terminada = timezone.now()
+    trabajo.save(update_fields=['estado', 'resultado', 'terminada', *avance])
+    return trabajo
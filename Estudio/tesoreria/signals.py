@@ -1,7 +1,8 @@
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from .models import ValorADepositar, ValorADepositarEmpresa
+from .services import SECCION_POR_MODELO, resumen_modificado
 
 
 @receiver(post_delete, sender=ValorADepositar)
@@ -13,3 +14,16 @@ def limpiar_snapshot_empresa(sender, instance, **kwargs):
     """
     if not ValorADepositar.objects.filter(empresa=instance.empresa).exists():
         ValorADepositarEmpresa.objects.filter(empresa=instance.empresa).delete()
+
+
+def actualizar_resumen(sender, **kwargs):
+    """
+    Recalcula en ResumenTesoreria la sección del modelo guardado o eliminado,
+    dentro de la transacción de la escritura (ver models.SumadoEnResumen).
+    """
+    resumen_modificado(SECCION_POR_MODELO[sender])
+
+
+for modelo in SECCION_POR_MODELO:
+    post_save.connect(actualizar_resumen, sender=modelo, dispatch_uid=f"resumen_save_{modelo.__name__}")
+    post_delete.connect(actualizar_resumen, sender=modelo, dispatch_uid=f"resumen_delete_{modelo.__name__}")
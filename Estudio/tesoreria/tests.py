@@ -0,0 +1,619 @@
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from usuarios.models import Usuario
+from . import iol_client, services, views
+from .iol_stub import ConfiguracionStub, iniciar_stub
+from .models import (
+    ActualizacionPrecios, Banco, Caja, FCI, LimitadorIOL, MonedaExtranjera, PlazoFijo, PrecioTitulo,
+    ResumenTesoreria, SimboloNoEncontrado, TituloON, ValorADepositar, ValorADepositarEmpresa,
+)
+
+
+class IOLStubMixin:
+    """Levanta un iol_stub por clase de test y un IOLClient ya logueado contra él."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = iniciar_stub(ConfiguracionStub(latencia=0))
+        cls.addClassCleanup(cls.stub.shutdown)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.stub.configuracion = ConfiguracionStub(latencia=0)
+        self.stub.reiniciar_contadores()
+        self.iol = iol_client.IOLClient(base_url=self.stub.url)
+        self.iol._headers()
+
+
+class ConsultarLoteTests(IOLStubMixin, TransactionTestCase):
+    def test_timeout_hasta_recorta_al_deadline(self):
+        self.assertEqual(iol_client._timeout_hasta(None), iol_client.TIMEOUT)
+        conectar, leer = iol_client._timeout_hasta(time.monotonic() + 0.5)
+        self.assertLessEqual(leer, 0.5)
+        with self.assertRaises(iol_client.requests.exceptions.Timeout):
+            iol_client._timeout_hasta(time.monotonic() - 1)
+
+    def test_los_hilos_terminan_dentro_del_deadline(self):
+        self.stub.configuracion.latencia = 1.0
+        simbolos = [f"T{i}" for i in range(3)]
+        terminadas = []
+        original = iol_client.consultar_titulo
+
+        def consultar(*args):
+            try:
+                return original(*args)
+            finally:
+                terminadas.append(time.monotonic())
+
+        inicio = time.monotonic()
+        with mock.patch.object(iol_client, "consultar_titulo", consultar):
+            resultado = iol_client.consultar_titulos_paralelo(self.iol, simbolos, presupuesto=0.3)
+            time.sleep(0.2)
+
+        self.assertEqual(resultado["cierres"], {})
+        self.assertEqual(len(resultado["errores"]), 3)
+        # Los hilos no siguieron esperando la respuesta después del presupuesto
+        self.assertEqual(len(terminadas), 3)
+        self.assertLess(max(terminadas) - inicio, 0.45)
+
+    def test_presupuesto_agotado_no_envia_las_pendientes(self):
+        self.stub.configuracion.latencia = 0.3
+        simbolos = [f"T{i}" for i in range(iol_client.MAX_WORKERS * 3)]
+
+        resultado = iol_client.consultar_titulos_paralelo(self.iol, simbolos, presupuesto=0.5)
+
+        self.assertLessEqual(self.stub.llamadas["cotizacion"], iol_client.MAX_WORKERS * 2)
+        self.assertEqual(len(resultado["latencias"]), len(simbolos))
+
+
+class CierreDeTests(SimpleTestCase):
+    def test_respeta_el_orden_de_preferencia(self):
+        self.assertEqual(iol_client._cierre_de({"ultimoCierre": 10, "ultimoPrecio": 11, "cierreAnterior": 12}), 10)
+        self.assertEqual(iol_client._cierre_de({"ultimoCierre": None, "ultimoPrecio": 11, "cierreAnterior": 12}), 11)
+        self.assertEqual(iol_client._cierre_de({"cierreAnterior": 12}), 12)
+        self.assertIsNone(iol_client._cierre_de({}))
+
+    def test_cero_es_un_cierre(self):
+        self.assertEqual(iol_client._cierre_de({"ultimoCierre": 0, "cierreAnterior": 12}), 0)
+
+    def test_panel_y_simbolo_eligen_el_mismo_campo(self):
+        cotizacion = {"simbolo": "AL30", "ultimoCierre": None, "ultimoPrecio": 70.5, "cierreAnterior": 69}
+        iol = mock.Mock(base_url="http://iol")
+        iol.get.side_effect = [cotizacion, {"titulos": [cotizacion]}]
+
+        por_simbolo = iol_client.consultar_titulo(iol, "AL30")["cierre"]
+        por_panel = iol_client.consultar_panel(iol, "bonos")["AL30"]
+
+        self.assertEqual(por_simbolo, 70.5)
+        self.assertEqual(por_panel, por_simbolo)
+
+
+class SimbolosNoEncontradosTests(TestCase):
+    def _consultar(self, error):
+        iol = mock.Mock(base_url="http://iol")
+        iol.get.side_effect = error
+        return iol_client.consultar_titulo(iol, "XX99")
+
+    def _registrar_404(self, ahora):
+        with mock.patch.object(iol_client.timezone, "now", return_value=ahora):
+            iol_client._registrar_no_encontrados([
+                {"simbolo": "XX99", "ok": False, "error": "no encontrado (404)", "no_encontrado": True},
+            ])
+        return SimboloNoEncontrado.objects.get(simbolo="XX99")
+
+    def test_solo_un_404_http_marca_el_simbolo(self):
+        self.assertTrue(self._consultar(iol_client.ErrorHTTPIOL(404))["no_encontrado"])
+        self.assertFalse(self._consultar(iol_client.ErrorHTTPIOL(500))["no_encontrado"])
+        self.assertFalse(self._consultar(ConnectionError("Login IOL fallido HTTP 400: error 404"))["no_encontrado"])
+
+    def test_la_espera_se_duplica_hasta_el_maximo(self):
+        ahora = timezone.now()
+        base = iol_client.REINTENTO_NO_ENCONTRADO_BASE
+
+        esperas = [self._registrar_404(ahora).proximo_reintento - ahora for _ in range(3)]
+        self.assertEqual(esperas, [base, base * 2, base * 4])
+
+        for _ in range(10):
+            registro = self._registrar_404(ahora)
+        self.assertEqual(registro.proximo_reintento - ahora, iol_client.REINTENTO_NO_ENCONTRADO_MAXIMO)
+        self.assertEqual(registro.intentos, 13)
+
+    def test_se_descarta_hasta_que_vence_la_espera(self):
+        registro = self._registrar_404(timezone.now())
+        self.assertEqual(iol_client.simbolos_descartados(["XX99", "AL30"]), {"XX99"})
+
+        registro.proximo_reintento = timezone.now() - timedelta(seconds=1)
+        registro.save()
+        self.assertEqual(iol_client.simbolos_descartados(["XX99"]), set())
+
+    def test_un_cierre_libera_el_simbolo(self):
+        self._registrar_404(timezone.now())
+
+        iol_client._registrar_no_encontrados([{"simbolo": "XX99", "ok": True, "cierre": 10, "error": None}])
+
+        self.assertFalse(SimboloNoEncontrado.objects.exists())
+
+
+class LimitadorCompartidoTests(TestCase):
+    def setUp(self):
+        self.ahora_us = 1_000_000_000_000
+        reloj = mock.patch.object(iol_client, "_ahora_us", side_effect=lambda: self.ahora_us)
+        reloj.start()
+        self.addCleanup(reloj.stop)
+        self.limitador = iol_client.LimitadorCompartido("iol.test", tasa=10, rafaga=3)
+
+    def _esperas(self, cantidad):
+        return [round(self.limitador.reservar(), 3) for _ in range(cantidad)]
+
+    def test_rafaga_sin_espera_y_luego_a_la_tasa(self):
+        self.assertEqual(self._esperas(5), [0, 0, 0, 0.1, 0.2])
+
+    def test_el_cupo_se_recupera_con_el_tiempo(self):
+        self._esperas(3)
+        self.ahora_us += 200_000
+
+        self.assertEqual(self._esperas(3), [0, 0, 0.1])
+
+    def test_una_sola_reserva_por_update(self):
+        self._esperas(2)
+
+        with self.assertNumQueries(2):
+            self.limitador.reservar()
+
+    def test_reintenta_si_otro_worker_movio_el_tat(self):
+        self.limitador.reservar()
+        original = self.limitador._fila
+
+        def fila_con_carrera():
+            fila = original()
+            if not hasattr(fila_con_carrera, "hecha"):
+                # Otro worker reserva entre la lectura y el UPDATE
+                fila_con_carrera.hecha = True
+                LimitadorIOL.objects.filter(host="iol.test").update(tat_us=fila["tat_us"] + 100_000)
+            return fila
+
+        with mock.patch.object(self.limitador, "_fila", side_effect=fila_con_carrera):
+            espera = self.limitador.reservar()
+
+        self.assertEqual(round(espera, 3), 0)
+        self.assertEqual(
+            LimitadorIOL.objects.get(host="iol.test").tat_us,
+            self.ahora_us + 300_000,
+        )
+
+    def test_no_reserva_un_turno_posterior_al_limite(self):
+        self._esperas(3)
+        tat = LimitadorIOL.objects.get(host="iol.test").tat_us
+
+        self.assertIsNone(self.limitador.reservar(hasta=self.ahora_us / 1_000_000 + 0.05))
+        self.assertEqual(LimitadorIOL.objects.get(host="iol.test").tat_us, tat)
+        self.assertEqual(round(self.limitador.reservar(hasta=self.ahora_us / 1_000_000 + 0.1), 3), 0.1)
+
+    def test_pausa_demora_todos_los_turnos(self):
+        self.limitador.pausar(2)
+        self.limitador.pausar(1)  # una pausa más corta no acorta la vigente
+
+        self.assertEqual(self._esperas(1), [2])
+        self.assertEqual(self.limitador.estado()["pausado_por"], 2)
+
+    def test_estado_informa_el_cupo_disponible(self):
+        self._esperas(2)
+
+        self.assertEqual(self.limitador.estado()["disponibles"], 1)
+
+
+class LimitadorConcurrenteTests(TransactionTestCase):
+    def test_hilos_en_paralelo_no_comparten_turno(self):
+        limitador = iol_client.LimitadorCompartido("iol.test", tasa=1, rafaga=1)
+        inicio = time.time()
+        esperas = list(iol_client._executor.map(
+            lambda _: iol_client._en_hilo(limitador.reservar), range(iol_client.MAX_WORKERS),
+        ))
+
+        # Con rafaga=1 y 1 por segundo cada turno es un segundo distinto
+        turnos = sorted(round(inicio + e) for e in esperas)
+        self.assertEqual(len(set(turnos)), len(turnos))
+
+
+class ActualizacionPreciosColaTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email="tesoreria@test.com", nombre="Test", apellido="Tesorería", password="x", rol="Administrador",
+        )
+
+    def test_encolar_dos_veces_devuelve_la_misma(self):
+        primera = services.encolar_actualizacion_precios(self.usuario)
+
+        self.assertEqual(services.encolar_actualizacion_precios(self.usuario), primera)
+        self.assertEqual(ActualizacionPrecios.objects.count(), 1)
+
+    def test_la_base_no_admite_dos_pendientes(self):
+        ActualizacionPrecios.objects.create()
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ActualizacionPrecios.objects.create()
+
+    def test_carrera_al_encolar_devuelve_la_ya_creada(self):
+        existente = ActualizacionPrecios.objects.create()
+
+        # La otra request encoló entre la consulta y el INSERT
+        with mock.patch.object(services, "_actualizacion_activa", side_effect=[None, existente]):
+            trabajo = services.encolar_actualizacion_precios(self.usuario)
+
+        self.assertEqual(trabajo, existente)
+        self.assertEqual(ActualizacionPrecios.objects.count(), 1)
+
+    def test_carrera_sin_activa_visible_no_reintenta_el_insert(self):
+        ActualizacionPrecios.objects.create()
+
+        with mock.patch.object(services, "_actualizacion_activa", return_value=None), \
+                mock.patch.object(ActualizacionPrecios.objects, "create", wraps=ActualizacionPrecios.objects.create) as crear:
+            with self.assertRaises(IntegrityError):
+                services.encolar_actualizacion_precios(self.usuario)
+
+        self.assertEqual(crear.call_count, 1)
+        self.assertEqual(ActualizacionPrecios.objects.count(), 1)
+
+    def test_pendiente_sin_worker_vence_y_el_estado_muestra_el_error(self):
+        trabajo = ActualizacionPrecios.objects.create()
+        ActualizacionPrecios.objects.filter(pk=trabajo.pk).update(
+            creada=timezone.now() - services.ESPERA_MAXIMA_PENDIENTE - timedelta(seconds=1),
+        )
+        self.client.force_login(self.usuario)
+
+        respuesta = self.client.get(reverse("tesoreria:estado_actualizacion_precios", args=[trabajo.pk])).json()
+
+        self.assertFalse(respuesta["ok"])
+        self.assertEqual(respuesta["estado"], ActualizacionPrecios.Estado.FALLIDA)
+        self.assertIn("procesar_actualizaciones_precios", respuesta["resultado"]["errores"][0])
+
+    def test_pendiente_detras_de_una_en_curso_no_vence(self):
+        ActualizacionPrecios.objects.create(estado=ActualizacionPrecios.Estado.EN_CURSO, iniciada=timezone.now())
+        trabajo = ActualizacionPrecios.objects.create()
+        ActualizacionPrecios.objects.filter(pk=trabajo.pk).update(
+            creada=timezone.now() - services.ESPERA_MAXIMA_PENDIENTE * 2,
+        )
+
+        services.descartar_actualizaciones_perdidas()
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, ActualizacionPrecios.Estado.PENDIENTE)
+
+    def test_en_curso_perdida_se_marca_fallida(self):
+        trabajo = ActualizacionPrecios.objects.create(
+            estado=ActualizacionPrecios.Estado.EN_CURSO,
+            iniciada=timezone.now() - services.DURACION_MAXIMA_TRABAJO - timedelta(seconds=1),
+        )
+
+        services.descartar_actualizaciones_perdidas()
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, ActualizacionPrecios.Estado.FALLIDA)
+
+
+class HistoricoTitulosTests(TestCase):
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            email="tesoreria@test.com", nombre="Test", apellido="Tesorería", password="x", rol="Administrador",
+        )
+        self.client.force_login(usuario)
+        self.hoy = timezone.localdate()
+        self.on = TituloON.objects.create(nombre="ON Test", ticker="ONT", tipo="ON", cuotapartes_actual=Decimal("10"))
+        self.bono = TituloON.objects.create(nombre="Bono Test", ticker="BNT", tipo="Bono", cuotapartes_actual=Decimal("5"))
+
+    def _precio(self, titulo, dias_atras, pesos, usd):
+        return PrecioTitulo.objects.create(
+            titulo=titulo, fecha=self.hoy - timedelta(days=dias_atras), fuente=PrecioTitulo.Fuente.MANUAL,
+            cuotapartes=titulo.cuotapartes_actual, saldo_pesos=Decimal(pesos), saldo_usd=Decimal(usd),
+        )
+
+    def test_serie_de_un_titulo_con_el_ultimo_del_dia(self):
+        self._precio(self.on, 1, "100", "1")
+        self._precio(self.on, 0, "110", "1.1")
+        self._precio(self.on, 0, "120", "1.2")
+        self._precio(self.bono, 0, "999", "9")
+        self._precio(self.on, views.DIAS_HISTORICO_TITULOS + 1, "50", "0.5")
+
+        respuesta = self.client.get(reverse("tesoreria:historico_titulo", args=[self.on.pk])).json()
+
+        self.assertEqual(respuesta["titulo"], str(self.on))
+        self.assertEqual(respuesta["labels"], [
+            (self.hoy - timedelta(days=1)).strftime("%d/%m/%Y"), self.hoy.strftime("%d/%m/%Y"),
+        ])
+        self.assertEqual(respuesta["saldo_pesos"], [100.0, 120.0])
+        self.assertEqual(respuesta["saldo_usd"], [1.0, 1.2])
+
+    def test_titulo_inexistente_da_404(self):
+        respuesta = self.client.get(reverse("tesoreria:historico_titulo", args=[self.bono.pk + 100]))
+
+        self.assertEqual(respuesta.status_code, 404)
+
+    def test_inversiones_grafica_la_cartera(self):
+        self._precio(self.on, 1, "100", "1")
+        self._precio(self.on, 0, "120", "1.2")
+        self._precio(self.bono, 0, "80", "0.8")
+
+        with mock.patch.object(views, "get_dolar_mep", return_value=None):
+            respuesta = self.client.get(reverse("tesoreria:inversiones"))
+
+        self.assertEqual(json.loads(respuesta.context["historico_pesos"]), [100.0, 200.0])
+        self.assertEqual(json.loads(respuesta.context["historico_usd"]), [1.0, 2.0])
+        self.assertContains(respuesta, reverse("tesoreria:historico_titulo", args=[self.on.pk]))
+
+
+class ConsultasVistasTests(TestCase):
+    """Las vistas con totales no hacen consultas por fila: la cantidad no crece con los registros."""
+
+    # Consultas por vista, sin contar sesión ni usuario
+    CONSULTAS_POR_VISTA = {
+        'dashboard': 1,
+        'caja_bancos': 6,
+        'inversiones': 7,
+        'exportar_excel': 18,
+    }
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.usuario = Usuario(email="consultas@test.com", rol="Administrador")
+        # Como en producción, la fila del resumen ya existe
+        services.reconstruir_resumen()
+        # El dólar MEP sale de la cache de cotizaciones, no de la base
+        dolar = mock.patch.object(views, "get_dolar_mep", return_value=None)
+        dolar.start()
+        self.addCleanup(dolar.stop)
+
+    def _cargar(self, cantidad):
+        for i in range(cantidad):
+            Caja.objects.create(empresa="L1", saldo=Decimal("100"))
+            Banco.objects.create(nombre=f"Banco {i}", saldo_cuenta_corriente=Decimal("1000"), saldo_usd=Decimal("10"))
+            MonedaExtranjera.objects.create(empresa="L1", saldo_dolares=Decimal("50"))
+            ValorADepositar.objects.create(empresa="L1", mes_vencimiento="Enero", anio_vencimiento=2025, monto=Decimal("10"))
+            PlazoFijo.objects.create(banco=f"Banco {i}", monto_invertido=Decimal("500"), interes=Decimal("5"))
+            FCI.objects.create(nombre=f"FCI {i}", banco=f"Banco {i}", cuotapartes=Decimal("1"), saldo=Decimal("20"))
+            titulo = TituloON.objects.create(
+                nombre=f"ON {i}", ticker=f"ON{i}", tipo="ON", cuotapartes_actual=Decimal("10"),
+                saldo_pesos_actual=Decimal("1000"), saldo_usd_actual=Decimal("1"),
+            )
+            PrecioTitulo.objects.create(
+                titulo=titulo, fecha=timezone.localdate(), fuente=PrecioTitulo.Fuente.MANUAL,
+                cuotapartes=Decimal("10"), saldo_pesos=Decimal("1000"), saldo_usd=Decimal("1"),
+            )
+
+    def _verificar(self):
+        for nombre, consultas in self.CONSULTAS_POR_VISTA.items():
+            with self.subTest(vista=nombre):
+                request = self.factory.get(f"/tesoreria/{nombre}/")
+                request.user = self.usuario
+                with self.assertNumQueries(consultas):
+                    getattr(views, nombre)(request)
+
+    def test_sin_registros(self):
+        self._verificar()
+
+    def test_con_registros(self):
+        self._cargar(3)
+        self._verificar()
+
+
+class ResumenTesoreriaTests(TestCase):
+    def setUp(self):
+        services.reconstruir_resumen()
+
+    def _instancias(self):
+        return [
+            Caja(empresa="L1", saldo=Decimal("100"), saldo_sem_ant=Decimal("90")),
+            Banco(nombre="Banco", saldo_cuenta_corriente=Decimal("1000"), cheque_pendiente_acreditar=Decimal("5"),
+                  cheque_pendiente_debito=Decimal("-3"), saldo_usd=Decimal("10"), saldo_sem_ant_pesos=Decimal("900")),
+            MonedaExtranjera(empresa="L1", saldo_dolares=Decimal("50"), saldo_dolares_sem_ant=Decimal("40")),
+            ValorADepositar(empresa="L1", mes_vencimiento="Enero", anio_vencimiento=2025, monto=Decimal("10")),
+            ValorADepositarEmpresa(empresa="L2", saldo_sem_ant=Decimal("7")),
+            PlazoFijo(banco="Banco", monto_invertido=Decimal("500"), interes=Decimal("5")),
+            FCI(nombre="FCI", banco="Banco", cuotapartes=Decimal("1"), saldo=Decimal("20"), saldo_sem_ant=Decimal("15")),
+            TituloON(nombre="ON", ticker="ONT", tipo="ON", cuotapartes_actual=Decimal("10"),
+                     saldo_pesos_actual=Decimal("1000"), saldo_usd_actual=Decimal("1")),
+        ]
+
+    def test_guardar_y_eliminar_mantiene_el_resumen(self):
+        for instancia in self._instancias():
+            modelo = type(instancia).__name__
+            with self.subTest(modelo=modelo, operacion="alta"):
+                instancia.save()
+                self.assertEqual(services.leer_resumen(), services.calcular_totales())
+            with self.subTest(modelo=modelo, operacion="modificación"):
+                campo = next(iter(services.TOTALES[services.SECCION_POR_MODELO[type(instancia)]][1].values()))
+                setattr(instancia, campo, Decimal("123.45"))
+                instancia.save()
+                self.assertEqual(services.leer_resumen(), services.calcular_totales())
+            with self.subTest(modelo=modelo, operacion="baja"):
+                instancia.delete()
+                self.assertEqual(services.leer_resumen(), services.calcular_totales())
+
+    def test_si_falla_el_resumen_no_se_guarda_la_fila(self):
+        with mock.patch.object(services, "_sumar_secciones", side_effect=RuntimeError("falla")):
+            with self.assertRaises(RuntimeError):
+                Caja.objects.create(empresa="L1", saldo=Decimal("100"))
+
+        self.assertFalse(Caja.objects.exists())
+        self.assertEqual(services.leer_resumen(), services.calcular_totales())
+
+    def test_refrescar_bloquea_la_fila_antes_de_sumar(self):
+        llamadas = []
+        bloquear = services._bloquear_resumen
+        with mock.patch.object(services, "_bloquear_resumen", side_effect=lambda: llamadas.append("lock") or bloquear()), \
+                mock.patch.object(services, "_sumar_secciones", side_effect=lambda s: llamadas.append("suma") or {}):
+            services.refrescar_resumen(["caja"])
+
+        self.assertEqual(llamadas, ["lock", "suma"])
+
+    def test_sin_fila_se_reconstruye(self):
+        Caja.objects.create(empresa="L1", saldo=Decimal("100"))
+        ResumenTesoreria.objects.all().delete()
+
+        services.refrescar_resumen(["caja"])
+
+        self.assertEqual(services.leer_resumen(), services.calcular_totales())
+
+    def test_resumen_diferido_recalcula_una_vez_al_salir(self):
+        with mock.patch.object(services, "refrescar_resumen", wraps=services.refrescar_resumen) as refrescar:
+            with services.resumen_diferido():
+                Caja.objects.create(empresa="L1", saldo=Decimal("100"))
+                Caja.objects.create(empresa="L2", saldo=Decimal("50"))
+                refrescar.assert_not_called()
+
+        refrescar.assert_called_once_with({"caja"})
+        self.assertEqual(services.leer_resumen(), services.calcular_totales())
+
+
+class CerrarSemanaTests(TestCase):
+    def setUp(self):
+        services.reconstruir_resumen()
+
+    def test_titulos(self):
+        titulo = TituloON.objects.create(
+            nombre="ON", ticker="ONT", tipo="ON", cuotapartes_actual=Decimal("10"),
+            saldo_pesos_actual=Decimal("1000"), saldo_usd_actual=Decimal("1"),
+        )
+
+        self.assertEqual(services.cerrar_semana(["titulos"]), {"titulos": 1})
+
+        titulo.refresh_from_db()
+        self.assertEqual(titulo.cuotapartes_sem_ant, Decimal("10"))
+        self.assertEqual(titulo.saldo_pesos_sem_ant, Decimal("1000"))
+        self.assertEqual(titulo.saldo_usd_sem_ant, Decimal("1"))
+
+    def test_fci(self):
+        fci = FCI.objects.create(nombre="FCI", banco="Banco", cuotapartes=Decimal("3"), saldo=Decimal("20"))
+
+        services.cerrar_semana(["fci"])
+
+        fci.refresh_from_db()
+        self.assertEqual(fci.cuotapartes_sem_ant, Decimal("3"))
+        self.assertEqual(fci.saldo_sem_ant, Decimal("20"))
+
+    def test_caja_y_moneda_extranjera(self):
+        caja = Caja.objects.create(empresa="L1", saldo=Decimal("100"))
+        moneda = MonedaExtranjera.objects.create(empresa="L1", saldo_dolares=Decimal("50"))
+
+        self.assertEqual(services.cerrar_semana(["caja", "moneda_extranjera"]), {"caja": 1, "moneda_extranjera": 1})
+
+        caja.refresh_from_db()
+        moneda.refresh_from_db()
+        self.assertEqual(caja.saldo_sem_ant, Decimal("100"))
+        self.assertEqual(moneda.saldo_dolares_sem_ant, Decimal("50"))
+
+    def test_bancos_suman_cheques_nulos_como_cero(self):
+        completo = Banco.objects.create(
+            nombre="Completo", saldo_cuenta_corriente=Decimal("1000"), cheque_pendiente_acreditar=Decimal("200"),
+            cheque_pendiente_debito=Decimal("-50"), saldo_usd=Decimal("10"),
+        )
+        sin_cheques = Banco.objects.create(
+            nombre="Sin cheques", saldo_cuenta_corriente=Decimal("500"),
+            cheque_pendiente_acreditar=None, cheque_pendiente_debito=None, saldo_usd=None,
+        )
+
+        services.cerrar_semana(["bancos"])
+
+        completo.refresh_from_db()
+        sin_cheques.refresh_from_db()
+        self.assertEqual(completo.saldo_sem_ant_pesos, Decimal("1150"))
+        self.assertEqual(completo.saldo_usd_sem_ant, Decimal("10"))
+        self.assertEqual(sin_cheques.saldo_sem_ant_pesos, Decimal("500"))
+        self.assertIsNone(sin_cheques.saldo_usd_sem_ant)
+
+    def test_vad_actualiza_e_inserta_el_total_por_empresa(self):
+        ValorADepositarEmpresa.objects.create(empresa="L1", saldo_sem_ant=Decimal("1"))
+        for empresa, monto in (("L1", "10"), ("L1", "15"), ("L2", "7")):
+            ValorADepositar.objects.create(empresa=empresa, mes_vencimiento="Enero", anio_vencimiento=2025, monto=Decimal(monto))
+
+        self.assertEqual(services.cerrar_semana(["vad"]), {"vad": 2})
+
+        self.assertEqual(
+            dict(ValorADepositarEmpresa.objects.values_list("empresa", "saldo_sem_ant")),
+            {"L1": Decimal("25"), "L2": Decimal("7")},
+        )
+
+    def test_refresca_el_resumen(self):
+        Caja.objects.create(empresa="L1", saldo=Decimal("100"))
+        Banco.objects.create(nombre="Banco", saldo_cuenta_corriente=Decimal("300"), cheque_pendiente_debito=None)
+        ValorADepositar.objects.create(empresa="L2", mes_vencimiento="Enero", anio_vencimiento=2025, monto=Decimal("9"))
+
+        services.cerrar_semana()
+
+        resumen = services.leer_resumen()
+        self.assertEqual(resumen, services.calcular_totales())
+        self.assertEqual(resumen["total_caja_sem_ant"], Decimal("100"))
+        self.assertEqual(resumen["total_bancos_sem_ant_pesos"], Decimal("300"))
+        self.assertEqual(resumen["total_vad_sem_ant"], Decimal("9"))
+
+    def test_una_seccion_que_falla_revierte_las_demas(self):
+        caja = Caja.objects.create(empresa="L1", saldo=Decimal("100"))
+        fci = FCI.objects.create(nombre="FCI", banco="Banco", cuotapartes=Decimal("3"), saldo=Decimal("20"))
+        resumen_antes = services.leer_resumen()
+
+        def fallar():
+            raise RuntimeError("falla")
+
+        with mock.patch.dict(services.CIERRES_SEMANA, {"fci": ("fci", fallar)}):
+            with self.assertRaises(RuntimeError):
+                services.cerrar_semana(["caja", "fci"])
+
+        caja.refresh_from_db()
+        fci.refresh_from_db()
+        self.assertIsNone(caja.saldo_sem_ant)
+        self.assertIsNone(fci.saldo_sem_ant)
+        self.assertEqual(services.leer_resumen(), resumen_antes)
+
+
+class GuardarValuacionesTests(TestCase):
+    def setUp(self):
+        services.reconstruir_resumen()
+        self.titulos = [
+            TituloON.objects.create(nombre=f"ON {i}", ticker=f"ON{i}", tipo="ON", cuotapartes_actual=Decimal("10"))
+            for i in range(3)
+        ]
+        for i, titulo in enumerate(self.titulos):
+            titulo.valor_cierre_pesos = Decimal(100 + i)
+            titulo.saldo_pesos_actual = Decimal(1000 + i)
+            titulo.saldo_usd_actual = Decimal(i + 1)
+
+    def test_guarda_en_lote_y_refresca_el_resumen(self):
+        with mock.patch.object(services, "resumen_modificado", wraps=services.resumen_modificado) as modificado:
+            self.assertEqual(services.guardar_valuaciones(self.titulos), {})
+
+        modificado.assert_called_once_with("titulos")
+        self.assertEqual(services.leer_resumen()["total_titulos_pesos"], Decimal("3003"))
+
+    def test_una_fila_invalida_no_descarta_al_resto(self):
+        invalido = self.titulos[1]
+        invalido.saldo_pesos_actual = "no es un número"
+
+        with mock.patch.object(TituloON.objects, "bulk_update", wraps=TituloON.objects.bulk_update) as bulk_update:
+            fallidos = services.guardar_valuaciones(self.titulos)
+
+        self.assertEqual(bulk_update.call_count, 1)
+        self.assertEqual(list(fallidos), [invalido])
+        self.assertEqual(
+            dict(TituloON.objects.values_list("pk", "saldo_pesos_actual")),
+            {self.titulos[0].pk: Decimal("1000"), invalido.pk: None, self.titulos[2].pk: Decimal("1002")},
+        )
+        self.assertEqual(services.leer_resumen(), services.calcular_totales())
+
+    def test_sin_filas_guardadas_no_refresca_el_resumen(self):
+        with mock.patch.object(TituloON.objects, "bulk_update", side_effect=RuntimeError("falla")), \
+                mock.patch.object(TituloON.objects, "filter", side_effect=RuntimeError("falla")), \
+                mock.patch.object(services, "resumen_modificado") as modificado:
+            fallidos = services.guardar_valuaciones(self.titulos)
+
+        self.assertEqual(set(fallidos), set(self.titulos))
+        modificado.assert_not_called()
@@ -11,6 +11,8 @@ urlpatterns = [
     path('inversiones/', views.inversiones, name='inversiones'),
     # API interna de actualización
     path('actualizar-precios/', views.actualizar_precios_titulos, name='actualizar_precios'),
+    path('actualizar-precios/<int:pk>/', views.estado_actualizacion_precios, name='estado_actualizacion_precios'),
+    path('cerrar-semana/', views.cerrar_semana_view, name='cerrar_semana'),
     path('actualizar-semana/', views.actualizar_semana_titulos, name='actualizar_semana'),
     path('actualizar-semana-fci/', views.actualizar_semana_fci, name='actualizar_semana_fci'),
     path('actualizar-semana-caja/', views.actualizar_semana_caja, name='actualizar_semana_caja'),
@@ -44,4 +46,5 @@ urlpatterns = [
     path('titulo/nuevo/', views.titulo_crear, name='titulo_crear'),
     path('titulo/<int:pk>/editar/', views.titulo_editar, name='titulo_editar'),
     path('titulo/<int:pk>/eliminar/', views.titulo_eliminar, name='titulo_eliminar'),
+    path('titulo/<int:pk>/historico/', views.historico_titulo, name='historico_titulo'),
 ]
\ No newline at end of file
@@ -1,115 +1,52 @@
 import json
 import logging
-from decimal import Decimal, InvalidOperation
+from datetime import timedelta
+from decimal import Decimal
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.db import DatabaseError
 from django.db.models import Sum
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_POST
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
 
-from cotizaciones.services import get_dolares
 from .forms import (
     BancoForm, CajaForm, FCIForm, MonedaExtranjeraForm,
     PlazoFijoForm, TituloONForm, ValorADepositarForm,
 )
 from .models import (
-    Banco, Caja, FCI, MonedaExtranjera, PlazoFijo, TituloON,
+    ActualizacionPrecios, Banco, Caja, FCI, MonedaExtranjera, PlazoFijo, TituloON,
     ValorADepositar, ValorADepositarEmpresa,
 )
+from .services import (
+    calcular_totales, cerrar_semana, descartar_actualizaciones_perdidas, encolar_actualizacion_precios,
+    get_dolar_mep, leer_resumen, serie_cartera, serie_titulo,
+)
 
 logger = logging.getLogger(__name__)
 
+# Días de histórico que muestra el gráfico de títulos en Inversiones
+DIAS_HISTORICO_TITULOS = 90
+
 def _check_rol(user):
     if user.rol not in ('Administrador', 'Colaborador'):
         raise PermissionDenied
 
-def _get_dolar_mep():
-    """Obtiene cotización Dólar MEP reutilizando el módulo cotizaciones."""
-    dolares = get_dolares()
-    for d in dolares:
-        if d.get('casa') == 'bolsa' or 'mep' in d.get('nombre', '').lower():
-            return d
-    return None
-
-def _safe_sum(queryset, field):
-    return queryset.aggregate(total=Sum(field))['total'] or Decimal('0')
-
 
 @login_required
 def dashboard(request):
     _check_rol(request.user)
 
     # Dólar MEP
-    dolar_mep = _get_dolar_mep()
+    dolar_mep = get_dolar_mep()
     dolar_mep_venta = Decimal(str(dolar_mep.get('venta', 0))) if dolar_mep else Decimal('0')
 
-    # Caja
-    cajas = Caja.objects.all()
-    total_caja = _safe_sum(cajas, 'saldo')
-    total_caja_sem_ant = _safe_sum(cajas, 'saldo_sem_ant')
-
-    # Bancos
-    bancos = Banco.objects.all()
-    total_bancos_pesos = _safe_sum(bancos, 'saldo_cuenta_corriente')
-    total_bancos_usd = _safe_sum(bancos, 'saldo_usd')
-    total_bancos_sem_ant_pesos = _safe_sum(bancos, 'saldo_sem_ant_pesos')
-    total_bancos_sem_ant_usd = _safe_sum(bancos, 'saldo_usd_sem_ant')
-
-    # Moneda Extranjera
-    monedas = MonedaExtranjera.objects.all()
-    total_me = _safe_sum(monedas, 'saldo_dolares')
-    total_me_sem_ant = _safe_sum(monedas, 'saldo_dolares_sem_ant')
-
-    # Valores a Depositar
-    total_vad = _safe_sum(ValorADepositar.objects.all(), 'monto')
-    total_vad_sem_ant = _safe_sum(ValorADepositarEmpresa.objects.all(), 'saldo_sem_ant')
-
-    # Inversiones
-    total_pf = _safe_sum(PlazoFijo.objects.all(), 'monto_invertido')
-    fcis = FCI.objects.all()
-    total_fci = _safe_sum(fcis, 'saldo')
-    total_fci_sem_ant = _safe_sum(fcis, 'saldo_sem_ant')
-    titulos = TituloON.objects.all()
-    total_titulos_pesos = _safe_sum(titulos, 'saldo_pesos_actual')
-    total_titulos_usd = _safe_sum(titulos, 'saldo_usd_actual')
-    total_titulos_pesos_sem_ant = _safe_sum(titulos, 'saldo_pesos_sem_ant')
-    total_titulos_usd_sem_ant = _safe_sum(titulos, 'saldo_usd_sem_ant')
-    total_inversiones = total_pf + total_fci + total_titulos_pesos
-    total_inversiones_sem_ant = total_fci_sem_ant + total_titulos_pesos_sem_ant
-
-    # Caja y Bancos total
-    total_caja_bancos_pesos = total_caja + total_bancos_pesos
-    total_caja_bancos_usd = total_bancos_usd + total_me
-    total_caja_bancos_sem_ant_pesos = total_caja_sem_ant + total_bancos_sem_ant_pesos
-    total_caja_bancos_sem_ant_usd = total_bancos_sem_ant_usd + total_me_sem_ant
-
     context = {
         'dolar_mep': dolar_mep,
         'dolar_mep_venta': dolar_mep_venta,
-        'total_caja': total_caja,
-        'total_caja_sem_ant': total_caja_sem_ant,
-        'total_bancos_pesos': total_bancos_pesos,
-        'total_bancos_usd': total_bancos_usd,
-        'total_bancos_sem_ant_pesos': total_bancos_sem_ant_pesos,
-        'total_bancos_sem_ant_usd': total_bancos_sem_ant_usd,
-        'total_me': total_me,
-        'total_me_sem_ant': total_me_sem_ant,
-        'total_vad': total_vad,
-        'total_vad_sem_ant': total_vad_sem_ant,
-        'total_pf': total_pf,
-        'total_fci': total_fci,
-        'total_fci_sem_ant': total_fci_sem_ant,
-        'total_titulos_pesos': total_titulos_pesos,
-        'total_titulos_usd': total_titulos_usd,
-        'total_titulos_pesos_sem_ant': total_titulos_pesos_sem_ant,
-        'total_titulos_usd_sem_ant': total_titulos_usd_sem_ant,
-        'total_inversiones': total_inversiones,
-        'total_inversiones_sem_ant': total_inversiones_sem_ant,
-        'total_caja_bancos_pesos': total_caja_bancos_pesos,
-        'total_caja_bancos_usd': total_caja_bancos_usd,
-        'total_caja_bancos_sem_ant_pesos': total_caja_bancos_sem_ant_pesos,
-        'total_caja_bancos_sem_ant_usd': total_caja_bancos_sem_ant_usd,
+        **leer_resumen(),
         'vista_activa': 'dashboard',
     }
     return render(request, 'tesoreria/dashboard.html', context)
@@ -122,31 +59,11 @@ def caja_bancos(request):
     bancos = Banco.objects.all()
     monedas = MonedaExtranjera.objects.all()
 
-    total_caja = _safe_sum(cajas, 'saldo')
-    total_caja_sem_ant = _safe_sum(cajas, 'saldo_sem_ant')
-    total_bancos_cc = _safe_sum(bancos, 'saldo_cuenta_corriente')
-    total_bancos_chq_acred = _safe_sum(bancos, 'cheque_pendiente_acreditar')
-    total_bancos_chq_deb = _safe_sum(bancos, 'cheque_pendiente_debito')
-    total_bancos_usd = _safe_sum(bancos, 'saldo_usd')
-    total_bancos_sem_ant_pesos = _safe_sum(bancos, 'saldo_sem_ant_pesos')
-    total_bancos_sem_ant_usd = _safe_sum(bancos, 'saldo_usd_sem_ant')
-    total_me = _safe_sum(monedas, 'saldo_dolares')
-    total_me_sem_ant = _safe_sum(monedas, 'saldo_dolares_sem_ant')
-
     context = {
         'cajas': cajas,
         'bancos': bancos,
         'monedas': monedas,
-        'total_caja': total_caja,
-        'total_caja_sem_ant': total_caja_sem_ant,
-        'total_bancos_cc': total_bancos_cc,
-        'total_bancos_chq_acred': total_bancos_chq_acred,
-        'total_bancos_chq_deb': total_bancos_chq_deb,
-        'total_bancos_usd': total_bancos_usd,
-        'total_bancos_sem_ant_pesos': total_bancos_sem_ant_pesos,
-        'total_bancos_sem_ant_usd': total_bancos_sem_ant_usd,
-        'total_me': total_me,
-        'total_me_sem_ant': total_me_sem_ant,
+        **calcular_totales(['caja', 'bancos', 'moneda_extranjera']),
         'vista_activa': 'caja_bancos',
     }
     return render(request, 'tesoreria/caja_bancos.html', context)
@@ -171,7 +88,7 @@ def valores_a_depositar(request):
         .order_by('anio_vencimiento', 'mes_vencimiento')
     )
 
-    total_vad = _safe_sum(valores, 'monto')
+    total_vad = calcular_totales(['vad'])['total_vad']
 
     # Datos para Chart.js
     chart_labels = [f"{r['mes_vencimiento']} {r['anio_vencimiento']}" for r in total_por_mes]
@@ -202,21 +119,17 @@ def inversiones(request):
     fcis = FCI.objects.all()
     titulos = TituloON.objects.all()
 
-    total_pf = _safe_sum(plazos_fijos, 'monto_invertido')
-    total_fci = _safe_sum(fcis, 'saldo')
-    total_titulos_pesos = _safe_sum(titulos, 'saldo_pesos_actual')
-    total_titulos_usd = _safe_sum(titulos, 'saldo_usd_actual')
-    total_inversiones = total_pf + total_fci + total_titulos_pesos
+    # Datos para Chart.js: valuación diaria de la cartera de títulos
+    cartera = serie_cartera(desde=timezone.localdate() - timedelta(days=DIAS_HISTORICO_TITULOS))
 
     context = {
         'plazos_fijos': plazos_fijos,
         'fcis': fcis,
         'titulos': titulos,
-        'total_pf': total_pf,
-        'total_fci': total_fci,
-        'total_titulos_pesos': total_titulos_pesos,
-        'total_titulos_usd': total_titulos_usd,
-        'total_inversiones': total_inversiones,
+        **calcular_totales(['plazos_fijos', 'fci', 'titulos']),
+        'historico_labels': json.dumps([d['fecha'].strftime('%d/%m/%Y') for d in cartera]),
+        'historico_pesos': json.dumps([float(d['saldo_pesos']) for d in cartera]),
+        'historico_usd': json.dumps([float(d['saldo_usd']) for d in cartera]),
         'vista_activa': 'inversiones',
     }
     return render(request, 'tesoreria/inversiones.html', context)
@@ -224,235 +137,122 @@ def inversiones(request):
 @login_required
 @require_POST
 def actualizar_precios_titulos(request):
+    """Encola la actualización de precios; el progreso se consulta en estado_actualizacion_precios."""
     _check_rol(request.user)
 
-    titulos = TituloON.objects.all()
-    if not titulos.exists():
+    try:
+        forzar = bool(json.loads(request.body or b'{}').get('forzar'))
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({'error': 'JSON inválido.'}, status=400)
+
+    if not TituloON.objects.exists():
         return JsonResponse({"actualizados": 0, "errores": ["No hay títulos cargados."]})
 
-    # Separar los que tienen precio manual (no se consultan en IOL)
-    titulos_iol = [t for t in titulos if not t.precio_manual]
-
-    tickers_a_consultar = set()
-    for t in titulos_iol:
-        es_panama = "panama" in t.nombre.lower()
-        ticker = t.ticker.upper()
-        if es_panama:
-            # ON Panama: ticker almacenado es el completo terminado en C (dólar cable)
-            tickers_a_consultar.add(ticker)
-        elif t.tipo == 'ON':
-            # ON normal: ticker es la base (ej: BYCH), o ya trae O/D → normalizar
-            base = ticker[:-1] if ticker.endswith(('O', 'D')) else ticker
-            tickers_a_consultar.add(base + "O")  # pesos
-            tickers_a_consultar.add(base + "D")  # dólares
-        else:
-            if ticker.endswith('D'):
-                # Caso D: ticker ya está en dólares (ej: TX26D)
-                tickers_a_consultar.add(ticker)        # dólares
-                tickers_a_consultar.add(ticker[:-1])   # pesos (ej: TX26)
-            else:
-                # Caso C: ticker en pesos (ej: TX26), dólares = ticker + D
-                tickers_a_consultar.add(ticker)        # pesos
-                tickers_a_consultar.add(ticker + "D")  # dólares
+    trabajo = encolar_actualizacion_precios(request.user, forzar=forzar)
+    return JsonResponse(_estado_actualizacion(trabajo), status=202)
 
-    from .iol_client import IOLClient, consultar_titulos_paralelo
 
-    iol = IOLClient()
-    resultado = consultar_titulos_paralelo(iol, list(tickers_a_consultar))
-    cierres = resultado["cierres"]
-    errores = resultado["errores"]
+def _estado_actualizacion(trabajo):
+    return {
+        "ok": trabajo.estado != ActualizacionPrecios.Estado.FALLIDA,
+        "id": trabajo.pk,
+        "estado": trabajo.estado,
+        "simbolos_total": trabajo.simbolos_total,
+        "simbolos_hechos": trabajo.simbolos_hechos,
+        "simbolos_con_error": trabajo.simbolos_con_error,
+        "resultado": trabajo.resultado,
+        "url_estado": reverse('tesoreria:estado_actualizacion_precios', args=[trabajo.pk]),
+    }
 
-    dolar_mep = _get_dolar_mep()
-    dolar_mep_venta = Decimal(str(dolar_mep.get('venta', 0))) if dolar_mep else Decimal('0')
 
-    manuales_omitidos = len(titulos) - len(titulos_iol)
-    actualizados = 0
-    for t in titulos_iol:
-        es_panama = "panama" in t.nombre.lower()
-        ticker = t.ticker.upper()
-        try:
-            if es_panama:
-                # Panama ON: ticker termina en C → valor en USD
-                # saldo_usd = cuotapartes * (cierre_usd / 100)
-                # saldo_pesos = saldo_usd * dolar_mep
-                cierre_usd = cierres.get(ticker)
-                t.valor_cierre_pesos = None
-                if cierre_usd is not None:
-                    t.valor_cierre_usd = Decimal(str(cierre_usd))
-                    t.saldo_usd_actual = t.cuotapartes_actual * (t.valor_cierre_usd / Decimal('100'))
-                    t.saldo_pesos_actual = t.saldo_usd_actual * dolar_mep_venta
-                else:
-                    t.valor_cierre_usd = None
-                    t.saldo_usd_actual = None
-                    t.saldo_pesos_actual = None
-            elif t.tipo == 'ON':
-                # ON normal: base + O (pesos), base + D (dólares)
-                # saldo = cuotapartes * (cierre / 100)
-                base = ticker[:-1] if ticker.endswith(('O', 'D')) else ticker
-                cierre_pesos = cierres.get(base + "O")
-                cierre_usd   = cierres.get(base + "D")
-                if cierre_pesos is not None:
-                    t.valor_cierre_pesos = Decimal(str(cierre_pesos))
-                    t.saldo_pesos_actual = t.cuotapartes_actual * (t.valor_cierre_pesos / Decimal('100'))
-                else:
-                    t.valor_cierre_pesos = None
-                    t.saldo_pesos_actual = None
-                if cierre_usd is not None:
-                    t.valor_cierre_usd = Decimal(str(cierre_usd))
-                    t.saldo_usd_actual = t.cuotapartes_actual * (t.valor_cierre_usd / Decimal('100'))
-                else:
-                    t.valor_cierre_usd = None
-                    t.saldo_usd_actual = None
-            elif ticker.endswith('D'):
-                # Caso D: ticker ya está en dólares (ej: TX26D)
-                # saldo_usd = cuotapartes * (cierre_usd / 100)
-                # saldo_pesos = cuotapartes * (cierre_pesos / 100), o saldo_usd * MEP si no existe
-                cierre_usd   = cierres.get(ticker)
-                cierre_pesos = cierres.get(ticker[:-1])
-                if cierre_usd is not None:
-                    t.valor_cierre_usd = Decimal(str(cierre_usd))
-                    t.saldo_usd_actual = t.cuotapartes_actual * (t.valor_cierre_usd / Decimal('100'))
-                else:
-                    t.valor_cierre_usd = None
-                    t.saldo_usd_actual = None
-                if cierre_pesos is not None:
-                    t.valor_cierre_pesos = Decimal(str(cierre_pesos))
-                    t.saldo_pesos_actual = t.cuotapartes_actual * (t.valor_cierre_pesos / Decimal('100'))
-                else:
-                    t.valor_cierre_pesos = None
-                    # Sin ticker pesos: equivalente = saldo_usd * dolar_mep
-                    if t.saldo_usd_actual is not None and dolar_mep_venta > 0:
-                        t.saldo_pesos_actual = t.saldo_usd_actual * dolar_mep_venta
-                    else:
-                        t.saldo_pesos_actual = None
-            else:
-                # Caso C: ticker en pesos (ej: TX26), dólares = ticker + D
-                # saldo = cuotapartes * (cierre / 100)
-                cierre_pesos = cierres.get(ticker)
-                cierre_usd   = cierres.get(ticker + "D")
-                if cierre_pesos is not None:
-                    t.valor_cierre_pesos = Decimal(str(cierre_pesos))
-                    t.saldo_pesos_actual = t.cuotapartes_actual * (t.valor_cierre_pesos / Decimal('100'))
-                else:
-                    t.valor_cierre_pesos = None
-                    t.saldo_pesos_actual = None
-                if cierre_usd is not None:
-                    t.valor_cierre_usd = Decimal(str(cierre_usd))
-                    t.saldo_usd_actual = t.cuotapartes_actual * (t.valor_cierre_usd / Decimal('100'))
-                else:
-                    t.valor_cierre_usd = None
-                    # Sin ticker USD: equivalente = saldo_pesos / dolar_mep
-                    if t.saldo_pesos_actual is not None and dolar_mep_venta > 0:
-                        t.saldo_usd_actual = t.saldo_pesos_actual / dolar_mep_venta
-                    else:
-                        t.saldo_usd_actual = None
-
-            t.save(update_fields=[
-                "valor_cierre_pesos", "valor_cierre_usd",
-                "saldo_pesos_actual", "saldo_usd_actual",
-            ])
-            actualizados += 1
-
-        except (InvalidOperation, Exception) as e:
-            errores.append(f"{t.ticker}: error al guardar — {e}")
+@login_required
+@require_GET
+def estado_actualizacion_precios(request, pk):
+    _check_rol(request.user)
+    # Si no hay worker la pendiente vence acá y el navegador ve el error
+    descartar_actualizaciones_perdidas()
+    trabajo = get_object_or_404(ActualizacionPrecios, pk=pk)
+    return JsonResponse(_estado_actualizacion(trabajo))
 
+
+@login_required
+@require_GET
+def historico_titulo(request, pk):
+    """
+    Saldos diarios de un título para el gráfico de Inversiones, desde PrecioTitulo.
+    Contrato: {'titulo': str, 'labels': [str], 'saldo_pesos': [float], 'saldo_usd': [float]}
+    """
+    _check_rol(request.user)
+    titulo = get_object_or_404(TituloON, pk=pk)
+    serie = serie_titulo(titulo, desde=timezone.localdate() - timedelta(days=DIAS_HISTORICO_TITULOS))
     return JsonResponse({
-        "actualizados": actualizados,
-        "errores": errores,
-        "manuales_omitidos": manuales_omitidos,
+        "titulo": str(titulo),
+        "labels": [d["fecha"].strftime('%d/%m/%Y') for d in serie],
+        "saldo_pesos": [float(d["saldo_pesos"] or 0) for d in serie],
+        "saldo_usd": [float(d["saldo_usd"] or 0) for d in serie],
     })
 
+
+def _cerrar_semana_seccion(request, seccion):
+    _check_rol(request.user)
+    try:
+        actualizados = cerrar_semana([seccion])[seccion]
+    except DatabaseError as e:
+        logger.exception("Error al cerrar la semana de %s", seccion)
+        return JsonResponse({"actualizados": 0, "errores": [str(e)]}, status=500)
+    return JsonResponse({"actualizados": actualizados, "errores": []})
+
+
 @login_required
 @require_POST
-def actualizar_semana_titulos(request):
+def cerrar_semana_view(request):
+    """
+    Cierra la semana de todas las secciones de una vez.
+    Contrato: {'ok': bool, 'actualizados': {seccion: filas}, 'total': int, 'error'?: str}
+    """
     _check_rol(request.user)
+    try:
+        actualizados = cerrar_semana()
+    except DatabaseError as e:
+        logger.exception("Error al cerrar la semana")
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+    return JsonResponse({"ok": True, "actualizados": actualizados, "total": sum(actualizados.values())})
 
-    titulos = TituloON.objects.all()
-    actualizados = 0
-    errores = []
-
-    for t in titulos:
-        try:
-            t.cuotapartes_sem_ant = t.cuotapartes_actual
-            t.saldo_pesos_sem_ant = t.saldo_pesos_actual
-            t.saldo_usd_sem_ant = t.saldo_usd_actual
-            t.save(update_fields=[
-                'cuotapartes_sem_ant', 'saldo_pesos_sem_ant', 'saldo_usd_sem_ant',
-            ])
-            actualizados += 1
-        except Exception as e:
-            errores.append(f"{t.ticker}: {e}")
-
-    return JsonResponse({"actualizados": actualizados, "errores": errores})
 
 @login_required
 @require_POST
-def actualizar_semana_fci(request):
-    _check_rol(request.user)
+def actualizar_semana_titulos(request):
+    return _cerrar_semana_seccion(request, 'titulos')
 
-    fcis = FCI.objects.all()
-    actualizados = 0
-    errores = []
 
-    for f in fcis:
-        try:
-            f.cuotapartes_sem_ant = f.cuotapartes
-            f.saldo_sem_ant = f.saldo
-            f.save(update_fields=['cuotapartes_sem_ant', 'saldo_sem_ant'])
-            actualizados += 1
-        except Exception as e:
-            errores.append(f"{f.nombre}: {e}")
+@login_required
+@require_POST
+def actualizar_semana_fci(request):
+    return _cerrar_semana_seccion(request, 'fci')
 
-    return JsonResponse({"actualizados": actualizados, "errores": errores})
 
 @login_required
 @require_POST
 def actualizar_semana_caja(request):
-    _check_rol(request.user)
-    cajas = Caja.objects.all()
-    for c in cajas:
-        c.saldo_sem_ant = c.saldo
-        c.save(update_fields=['saldo_sem_ant'])
-    return JsonResponse({"actualizados": cajas.count()})
+    return _cerrar_semana_seccion(request, 'caja')
 
 
 @login_required
 @require_POST
 def actualizar_semana_me(request):
-    _check_rol(request.user)
-    monedas = MonedaExtranjera.objects.all()
-    for m in monedas:
-        m.saldo_dolares_sem_ant = m.saldo_dolares
-        m.save(update_fields=['saldo_dolares_sem_ant'])
-    return JsonResponse({"actualizados": monedas.count()})
+    return _cerrar_semana_seccion(request, 'moneda_extranjera')
 
 
 @login_required
 @require_POST
 def actualizar_semana_bancos(request):
-    _check_rol(request.user)
-    bancos = Banco.objects.all()
-    for b in bancos:
-        b.saldo_sem_ant_pesos = (
-            (b.saldo_cuenta_corriente or Decimal('0'))
-            + (b.cheque_pendiente_acreditar or Decimal('0'))
-            + (b.cheque_pendiente_debito or Decimal('0'))
-        )
-        b.saldo_usd_sem_ant = b.saldo_usd
-        b.save(update_fields=['saldo_sem_ant_pesos', 'saldo_usd_sem_ant'])
-    return JsonResponse({"actualizados": bancos.count()})
+    return _cerrar_semana_seccion(request, 'bancos')
 
 
 @login_required
 @require_POST
 def actualizar_semana_vad(request):
-    _check_rol(request.user)
-    totales = ValorADepositar.objects.values('empresa').annotate(total=Sum('monto'))
-    for row in totales:
-        obj, _ = ValorADepositarEmpresa.objects.get_or_create(empresa=row['empresa'])
-        obj.saldo_sem_ant = row['total']
-        obj.save(update_fields=['saldo_sem_ant'])
-    return JsonResponse({"actualizados": totales.count()})
+    return _cerrar_semana_seccion(request, 'vad')
 
 
 @login_required
@@ -599,31 +399,32 @@ def exportar_excel(request):
     titulos      = TituloON.objects.all().order_by('nombre')
 
     # Totales
-    t_caja             = _safe_sum(cajas,   'saldo')
-    t_caja_sem         = _safe_sum(cajas,   'saldo_sem_ant')
-    t_bancos_cc        = _safe_sum(bancos,  'saldo_cuenta_corriente')
-    t_bancos_chq_acred = _safe_sum(bancos,  'cheque_pendiente_acreditar')
-    t_bancos_chq_deb   = _safe_sum(bancos,  'cheque_pendiente_debito')
-    t_bancos_usd       = _safe_sum(bancos,  'saldo_usd')
-    t_bancos_sem_pesos = _safe_sum(bancos,  'saldo_sem_ant_pesos')
-    t_bancos_sem_usd   = _safe_sum(bancos,  'saldo_usd_sem_ant')
-    t_me               = _safe_sum(monedas, 'saldo_dolares')
-    t_me_sem           = _safe_sum(monedas, 'saldo_dolares_sem_ant')
-    t_vad              = _safe_sum(valores, 'monto')
-    t_vad_sem          = _safe_sum(ValorADepositarEmpresa.objects.all(), 'saldo_sem_ant')
-    t_pf               = _safe_sum(plazos_fijos, 'monto_invertido')
-    t_fci              = _safe_sum(fcis,    'saldo')
-    t_fci_sem          = _safe_sum(fcis,    'saldo_sem_ant')
-    t_tit_pesos        = _safe_sum(titulos, 'saldo_pesos_actual')
-    t_tit_usd          = _safe_sum(titulos, 'saldo_usd_actual')
-    t_tit_pesos_sem    = _safe_sum(titulos, 'saldo_pesos_sem_ant')
-    t_tit_usd_sem      = _safe_sum(titulos, 'saldo_usd_sem_ant')
-    t_cb_pesos         = t_caja + t_bancos_cc
-    t_cb_usd           = t_bancos_usd + t_me
-    t_cb_sem_pesos     = t_caja_sem + t_bancos_sem_pesos
-    t_cb_sem_usd       = t_bancos_sem_usd + t_me_sem
-    t_inv              = t_pf + t_fci + t_tit_pesos
-    t_inv_sem          = t_fci_sem + t_tit_pesos_sem
+    totales            = calcular_totales()
+    t_caja             = totales['total_caja']
+    t_caja_sem         = totales['total_caja_sem_ant']
+    t_bancos_cc        = totales['total_bancos_cc']
+    t_bancos_chq_acred = totales['total_bancos_chq_acred']
+    t_bancos_chq_deb   = totales['total_bancos_chq_deb']
+    t_bancos_usd       = totales['total_bancos_usd']
+    t_bancos_sem_pesos = totales['total_bancos_sem_ant_pesos']
+    t_bancos_sem_usd   = totales['total_bancos_sem_ant_usd']
+    t_me               = totales['total_me']
+    t_me_sem           = totales['total_me_sem_ant']
+    t_vad              = totales['total_vad']
+    t_vad_sem          = totales['total_vad_sem_ant']
+    t_pf               = totales['total_pf']
+    t_fci              = totales['total_fci']
+    t_fci_sem          = totales['total_fci_sem_ant']
+    t_tit_pesos        = totales['total_titulos_pesos']
+    t_tit_usd          = totales['total_titulos_usd']
+    t_tit_pesos_sem    = totales['total_titulos_pesos_sem_ant']
+    t_tit_usd_sem      = totales['total_titulos_usd_sem_ant']
+    t_cb_pesos         = totales['total_caja_bancos_pesos']
+    t_cb_usd           = totales['total_caja_bancos_usd']
+    t_cb_sem_pesos     = totales['total_caja_bancos_sem_ant_pesos']
+    t_cb_sem_usd       = totales['total_caja_bancos_sem_ant_usd']
+    t_inv              = totales['total_inversiones']
+    t_inv_sem          = totales['total_inversiones_sem_ant']
 
     # ── Libro ───────────────────────────────────────────────────────────────
     wb = Workbook()